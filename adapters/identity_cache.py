@@ -0,0 +1,79 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+class IdentityCache:
+    """Dize anahtarı → birincil anahtar eşlemesi için TTL'li, LRU sınırlı önbellek
+
+    ``connection_id``/``room_id`` gibi anahtarları veritabanı ``id``'sine
+    çevirmek için her seferinde SELECT atılmasını önler. Silme işlemleri
+    kaydı commit'ten sonra ``invalidate`` ile düşürmelidir.
+    """
+
+    def __init__(self, max_size: int = 100_000, ttl: float = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[int]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: int) -> None:
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def put_many(self, mapping: Dict[str, int]) -> None:
+        for key, value in mapping.items():
+            self.put(key, value)
+
+    def get_many(self, keys: Iterable[str]) -> Tuple[Dict[str, int], list]:
+        """Bulunanları ve eksik anahtarları ayrı döndür"""
+        found = {}
+        missing = []
+        for key in keys:
+            value = self.get(key)
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        return found, missing
+
+    def invalidate(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+# Repository'lerin paylaştığı süreç içi önbellekler
+user_ids = IdentityCache()
+room_ids = IdentityCache()
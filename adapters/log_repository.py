@@ -0,0 +1,464 @@
+import asyncio
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from domain.codec import get_codec
+from domain.entities import User as UserEntity, Message as MessageEntity, MessageType
+
+logger = logging.getLogger(__name__)
+
+# Kayıt başlığı: yük uzunluğu, yükün crc32'si
+RECORD_HEADER = struct.Struct("<II")
+# Kayıt yükü: [id, kullanıcı, connection_id, katılma zamanı, içerik, zaman, tür]
+_codec = get_codec("msgpack")
+
+
+def _offsets(data: bytes) -> array:
+    # İndeks dosyası küçük-endian 64 bit ofset dizisidir
+    offsets = array("Q")
+    offsets.frombytes(data[:len(data) - len(data) % offsets.itemsize])
+    if sys.byteorder == "big":
+        offsets.byteswap()
+    return offsets
+
+
+def _offset_bytes(offsets: array) -> bytes:
+    if sys.byteorder == "big":
+        offsets = array("Q", offsets)
+        offsets.byteswap()
+    return offsets.tobytes()
+
+
+class _Segment:
+    """Bir odanın ardışık kimlikli kayıtlarını tutan log + ofset indeksi çifti
+
+    ``<base_id>.log`` kayıtları art arda, ``<base_id>.idx`` her kaydın log
+    içindeki ofsetini sabit 8 baytla tutar; ``base_id + i`` kimlikli kaydın
+    yeri indeksin ``i``'nci girdisidir. Okumalar log dosyasının mmap'i
+    üzerinden yapılır.
+    """
+
+    def __init__(self, directory: str, base_id: int):
+        self.base_id = base_id
+        self.log_path = os.path.join(directory, f"{base_id:020d}.log")
+        self.index_path = os.path.join(directory, f"{base_id:020d}.idx")
+        self.offsets = array("Q")
+        self.size = 0
+        self._log = None
+        self._index = None
+        self._map: Optional[mmap.mmap] = None
+
+    @property
+    def end_id(self) -> int:
+        return self.base_id + len(self.offsets)
+
+    def load(self) -> None:
+        """Kapalı segment: indeksi olduğu gibi oku"""
+        with open(self.index_path, "rb") as index:
+            self.offsets = _offsets(index.read())
+        self.size = os.path.getsize(self.log_path)
+
+    def load_if_clean(self) -> bool:
+        """Son segment düzgün kapanmışsa indekse güvenerek aç
+
+        Yalnızca son kaydın log sonuna denk geldiği ve sağlam olduğu
+        doğrulanır; tutmuyorsa (çökme, eksik indeks) False döner ve
+        ``recover`` gerekir.
+        """
+        try:
+            with open(self.index_path, "rb") as index:
+                data = index.read()
+            size = os.path.getsize(self.log_path)
+        except FileNotFoundError:
+            return False
+        offsets = _offsets(data)
+        if len(data) % offsets.itemsize:
+            return False
+        if not offsets:
+            if size:
+                return False
+        else:
+            if offsets[-1] >= size:
+                return False
+            with open(self.log_path, "rb") as log:
+                log.seek(offsets[-1])
+                tail = log.read(size - offsets[-1])
+            if self._record_end(tail, 0) != len(tail):
+                return False
+        self.offsets = offsets
+        self.size = size
+        return True
+
+    def recover(self) -> None:
+        """Son segment: indeksi log'la karşılaştır, yarım kalmış yazımları (çökme sonrası) kırp"""
+        with open(self.log_path, "ab+") as log:
+            log.seek(0)
+            data = log.read()
+        try:
+            with open(self.index_path, "rb") as index:
+                offsets = _offsets(index.read())
+        except FileNotFoundError:
+            offsets = array("Q")
+
+        # İndeksteki geçerli önek: log'da eksiksiz bulunan kayıtlar
+        valid = 0
+        for offset in offsets:
+            if self._record_end(data, offset) is None:
+                break
+            valid += 1
+        del offsets[valid:]
+        end = self._record_end(data, offsets[-1]) if offsets else 0
+
+        # İndekse yazılamadan kalmış kayıtları log'u tarayarak geri kazan
+        while True:
+            next_end = self._record_end(data, end)
+            if next_end is None:
+                break
+            offsets.append(end)
+            end = next_end
+
+        if end != len(data):
+            logger.warning("%s: %d baytlık yarım kayıt kırpıldı", self.log_path, len(data) - end)
+            with open(self.log_path, "r+b") as log:
+                log.truncate(end)
+        with open(self.index_path, "wb") as index:
+            index.write(_offset_bytes(offsets))
+
+        self.offsets = offsets
+        self.size = end
+
+    def open_for_append(self) -> None:
+        if self._log is None:
+            # Tamponsuz: her kayıt tek bir write çağrısıyla işletim sistemine gider
+            self._log = open(self.log_path, "ab", buffering=0)
+            self._index = open(self.index_path, "ab", buffering=0)
+
+    def append(self, payload: bytes) -> None:
+        offset = self.size
+        self._log.write(RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+        self._index.write(_offset_bytes(array("Q", (offset,))))
+        self.offsets.append(offset)
+        self.size += RECORD_HEADER.size + len(payload)
+
+    def read(self, entry_id: int) -> list:
+        """Kaydı mmap'ten çöz; yalnızca bu kaydın baytları kopyalanır"""
+        view = self._view()
+        offset = self.offsets[entry_id - self.base_id]
+        length = RECORD_HEADER.unpack_from(view, offset)[0]
+        start = offset + RECORD_HEADER.size
+        return _codec.decode(view[start:start + length])
+
+    def sync(self) -> None:
+        if self._log is not None:
+            os.fsync(self._log.fileno())
+            os.fsync(self._index.fileno())
+
+    def seal(self) -> None:
+        """Yazmayı kapat; okuma mmap'i açık kalabilir"""
+        if self._log is not None:
+            self.sync()
+            self._log.close()
+            self._index.close()
+            self._log = None
+            self._index = None
+
+    def close(self) -> None:
+        self.seal()
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def _view(self) -> mmap.mmap:
+        # Aktif segment büyüdükçe yeniden eşlenir; kapalı segmentler bir kez
+        if self._map is None or len(self._map) < self.size:
+            if self._map is not None:
+                self._map.close()
+            with open(self.log_path, "rb") as log:
+                self._map = mmap.mmap(log.fileno(), self.size, access=mmap.ACCESS_READ)
+        return self._map
+
+    @staticmethod
+    def _record_end(data: bytes, offset: int) -> Optional[int]:
+        if offset + RECORD_HEADER.size > len(data):
+            return None
+        length, checksum = RECORD_HEADER.unpack_from(data, offset)
+        start = offset + RECORD_HEADER.size
+        end = start + length
+        if end > len(data) or zlib.crc32(data[start:end]) != checksum:
+            return None
+        return end
+
+
+class RoomLog:
+    """Tek bir odanın segmentli, yalnızca eklenen mesaj günlüğü"""
+
+    def __init__(self, directory: str, segment_bytes: int):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.segments: List[_Segment] = []
+        self._bases: List[int] = []
+        os.makedirs(directory, exist_ok=True)
+
+        bases = sorted(int(name[:-4]) for name in os.listdir(directory) if name.endswith(".log"))
+        for position, base_id in enumerate(bases):
+            segment = _Segment(directory, base_id)
+            if position == len(bases) - 1:
+                # Tam tarama yalnızca düzgün kapanmamış segmentte
+                if not segment.load_if_clean():
+                    segment.recover()
+            else:
+                segment.load()
+            self.segments.append(segment)
+            self._bases.append(base_id)
+
+    @property
+    def next_id(self) -> int:
+        return self.segments[-1].end_id if self.segments else 1
+
+    def append(self, row: list, entry_id: Optional[int] = None) -> int:
+        """Kaydı ekle; ``entry_id`` son kimlikten büyük değilse yeni kimlik verilir"""
+        if entry_id is None or entry_id < self.next_id:
+            entry_id = self.next_id
+        segment = self.segments[-1] if self.segments else None
+        # Kimlik boşluğu ya da dolu segment yeni segment açar (indeks ardışık kalır)
+        if segment is None or segment.end_id != entry_id or segment.size >= self.segment_bytes:
+            if segment is not None:
+                segment.seal()
+            segment = _Segment(self.directory, entry_id)
+            self.segments.append(segment)
+            self._bases.append(entry_id)
+        segment.open_for_append()
+        segment.append(_codec.encode([entry_id] + row))
+        return entry_id
+
+    def before(self, before_id: Optional[int], limit: int) -> List[list]:
+        """``before_id``'den küçük son ``limit`` kaydı eskiden yeniye döndür"""
+        rows: List[list] = []
+        end = self.next_id if before_id is None else min(before_id, self.next_id)
+        position = bisect_right(self._bases, end - 1) - 1
+        while position >= 0 and len(rows) < limit:
+            segment = self.segments[position]
+            stop = min(end, segment.end_id)
+            start = max(segment.base_id, stop - (limit - len(rows)))
+            for entry_id in range(stop - 1, start - 1, -1):
+                rows.append(segment.read(entry_id))
+            end = segment.base_id
+            position -= 1
+        rows.reverse()
+        return rows
+
+    def has_before(self, before_id: int) -> bool:
+        """``before_id``'den küçük kayıt var mı (kimlik boşlukları hesaba katılır)"""
+        return bool(self.segments) and self.segments[0].base_id < before_id
+
+    def sync(self) -> None:
+        if self.segments:
+            self.segments[-1].sync()
+
+    def close(self) -> None:
+        for segment in self.segments:
+            segment.close()
+
+
+class LogMessageRepository:
+    """Postgres'siz tek düğüm kurulumlar için yerel, yalnızca eklenen mesaj deposu
+
+    Her oda ``directory`` altında kendi klasöründe segmentli bir günlük tutar.
+    Yazma sıralı bir ``write`` çağrısıdır (fsync ``sync()`` ile); okumalar
+    ofset indeksinden kaydın yerini bulup mmap üzerinden yerinde çözer.
+    ``PostgresMessageRepository`` ile aynı arayüzü sunar; ayrıca ``enqueue``
+    ile ChatUseCase'in ``message_sink``'i olarak kullanılabilir. Açık oda
+    günlükleri LRU ile ``max_open_rooms``'ta sınırlanır.
+
+    Açık olmayan bir odanın günlüğü (indeks okuma, gerekirse kurtarma)
+    olay döngüsü dışında, havuzda açılır; bu sırada gelen ``enqueue``
+    kayıtları sırayla bekletilip açılınca yazılır.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024, max_open_rooms: int = 256):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_open_rooms = max_open_rooms
+        self.rooms: "OrderedDict[str, RoomLog]" = OrderedDict()
+        # Havuzda açılmakta olan odalar: (açılış, açılınca yazılacak mesajlar)
+        self._opening: Dict[str, Tuple[asyncio.Future, List[MessageEntity]]] = {}
+        self.appended = 0
+        self.read_rows = 0
+        self.failed = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def append(self, message: MessageEntity) -> int:
+        """Mesajı odanın günlüğüne yaz, verilen kimliği ``message.id``'ye işle (döngüde açar)"""
+        return self._append_to(self._room(message.room_id), message)
+
+    def _append_to(self, log: RoomLog, message: MessageEntity) -> int:
+        sender = message.sender
+        message.id = log.append(
+            [
+                sender.username,
+                sender.connection_id,
+                sender.joined_at.timestamp(),
+                message.content,
+                message.timestamp.timestamp(),
+                message.message_type.value,
+            ],
+            message.id
+        )
+        self.appended += 1
+        return message.id
+
+    def enqueue(self, message: MessageEntity) -> bool:
+        """message_sink arayüzü; yazım beklemeden tamamlanır"""
+        log = self._cached(message.room_id)
+        if log is None:
+            opening = self._opening.get(message.room_id)
+            if opening is None:
+                opening = self._start_open(message.room_id)
+            opening[1].append(message)
+            return True
+        try:
+            self._append_to(log, message)
+        except OSError:
+            self.failed += 1
+            logger.exception("Mesaj günlüğe yazılamadı: %s", message.room_id)
+            return False
+        return True
+
+    async def save_message(self, message: MessageEntity) -> None:
+        self._append_to(await self._open(message.room_id), message)
+
+    async def get_room_messages(self, room_id: str, limit: int = 50) -> List[MessageEntity]:
+        return await self.get_room_messages_before(room_id, None, limit)
+
+    async def get_room_messages_before(self, room_id: str, before_id: Optional[int], limit: int = 50) -> List[MessageEntity]:
+        """Kimlik üzerinden keyset sayfalama; eski mesajlar önce"""
+        if limit <= 0 or not self._exists(room_id):
+            return []
+        rows = (await self._open(room_id)).before(before_id, limit)
+        self.read_rows += len(rows)
+        return [
+            MessageEntity(
+                content=content,
+                sender=UserEntity(
+                    username=username,
+                    connection_id=connection_id,
+                    joined_at=datetime.fromtimestamp(joined_at)
+                ),
+                message_type=MessageType(message_type),
+                timestamp=datetime.fromtimestamp(timestamp),
+                room_id=room_id,
+                id=entry_id
+            )
+            for entry_id, username, connection_id, joined_at, content, timestamp, message_type in rows
+        ]
+
+    async def has_messages_before(self, room_id: str, before_id: int) -> bool:
+        if not self._exists(room_id):
+            return False
+        return (await self._open(room_id)).has_before(before_id)
+
+    def sync(self) -> None:
+        """Açık günlükleri diske zorla (kapanışta çağrılır)"""
+        for log in self.rooms.values():
+            log.sync()
+
+    def close(self) -> None:
+        for room_id, (_, pending) in self._opening.items():
+            if pending:
+                self.failed += len(pending)
+                logger.error("Günlüğü açılamadan kapatıldı, %d mesaj yazılmadı: %s", len(pending), room_id)
+        self._opening.clear()
+        for log in self.rooms.values():
+            log.close()
+        self.rooms.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "open_rooms": len(self.rooms),
+            "opening_rooms": len(self._opening),
+            "appended": self.appended,
+            "read_rows": self.read_rows,
+            "failed": self.failed,
+        }
+
+    def _path(self, room_id: str) -> str:
+        # Oda adı dosya sistemine güvenli, sabit uzunlukta bir klasör adına çevrilir
+        return os.path.join(self.directory, hashlib.blake2b(room_id.encode(), digest_size=16).hexdigest())
+
+    def _exists(self, room_id: str) -> bool:
+        return room_id in self.rooms or room_id in self._opening or os.path.isdir(self._path(room_id))
+
+    def _cached(self, room_id: str) -> Optional[RoomLog]:
+        log = self.rooms.get(room_id)
+        if log is not None:
+            self.rooms.move_to_end(room_id)
+        return log
+
+    def _room(self, room_id: str) -> RoomLog:
+        """Senkron açılış; olay döngüsünde çağrılırsa döngüyü bekletir (bkz. ``_open``)"""
+        log = self._cached(room_id)
+        if log is None:
+            log = self._insert(room_id, RoomLog(self._path(room_id), self.segment_bytes))
+        return log
+
+    async def _open(self, room_id: str) -> RoomLog:
+        while True:
+            log = self._cached(room_id)
+            if log is not None:
+                return log
+            opening = self._opening.get(room_id)
+            if opening is None:
+                opening = self._start_open(room_id)
+            # Açılış geri çağrısı bekleyen mesajları yazıp odayı LRU'ya ekler
+            await opening[0]
+
+    def _start_open(self, room_id: str) -> Tuple[asyncio.Future, List[MessageEntity]]:
+        future = asyncio.get_running_loop().run_in_executor(
+            None, RoomLog, self._path(room_id), self.segment_bytes
+        )
+        opening = self._opening[room_id] = (future, [])
+        future.add_done_callback(lambda done: self._opened(room_id, done))
+        return opening
+
+    def _opened(self, room_id: str, future: asyncio.Future) -> None:
+        opening = self._opening.pop(room_id, None)
+        if opening is None or opening[0] is not future:
+            # Depo bu arada kapatıldı
+            if not future.cancelled() and future.exception() is None:
+                future.result().close()
+            return
+        pending = opening[1]
+        if future.cancelled() or future.exception() is not None:
+            self.failed += len(pending)
+            logger.error("Oda günlüğü açılamadı, %d mesaj yazılmadı: %s", len(pending), room_id,
+                         exc_info=None if future.cancelled() else future.exception())
+            return
+        log = self._cached(room_id)
+        if log is None:
+            log = self._insert(room_id, future.result())
+        else:
+            # Oda bu arada senkron yoldan açılmış; iki yazıcı olmasın
+            future.result().close()
+        for message in pending:
+            try:
+                self._append_to(log, message)
+            except OSError:
+                self.failed += 1
+                logger.exception("Mesaj günlüğe yazılamadı: %s", room_id)
+
+    def _insert(self, room_id: str, log: RoomLog) -> RoomLog:
+        self.rooms[room_id] = log
+        self.rooms.move_to_end(room_id)
+        if len(self.rooms) > self.max_open_rooms:
+            _, evicted = self.rooms.popitem(last=False)
+            evicted.close()
+        return log
@@ -0,0 +1,150 @@
+from dataclasses import replace
+from functools import partial
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from domain.entities import User as UserEntity, Room as RoomEntity, Message as MessageEntity
+
+
+class InMemoryStore:
+    """Bellek içi repository'lerin paylaştığı durum (testler ve tek süreç)"""
+
+    def __init__(self):
+        self.users: Dict[str, UserEntity] = {}
+        self.rooms: Dict[str, RoomEntity] = {}
+        # room_id -> connection_id kümesi
+        self.memberships: Dict[str, Set[str]] = {}
+        self.messages: Dict[str, List[MessageEntity]] = {}
+        self.next_message_id = 1
+        self.commits = 0
+
+
+class _InMemoryRepository:
+    """Yazımları hemen ya da (unit of work içinde) commit'te uygular
+
+    ``pending`` verilmişse yazımlar sıraya alınır; okumalar her zaman
+    commit edilmiş durumu görür.
+    """
+
+    def __init__(self, store: InMemoryStore, pending: Optional[List[Callable[[], None]]] = None):
+        self.store = store
+        self.pending = pending
+
+    def _write(self, func, *args) -> None:
+        if self.pending is None:
+            func(*args)
+        else:
+            self.pending.append(partial(func, *args))
+
+
+class InMemoryUserRepository(_InMemoryRepository):
+    async def save_user(self, user: UserEntity) -> None:
+        self._write(self.store.users.__setitem__, user.connection_id, user)
+
+    async def get_user(self, connection_id: str) -> Optional[UserEntity]:
+        return self.store.users.get(connection_id)
+
+    async def delete_user(self, connection_id: str) -> None:
+        self._write(self._delete, connection_id)
+
+    def _delete(self, connection_id: str) -> None:
+        self.store.users.pop(connection_id, None)
+        for members in self.store.memberships.values():
+            members.discard(connection_id)
+
+
+class InMemoryRoomRepository(_InMemoryRepository):
+    async def save_room(self, room: RoomEntity) -> None:
+        # Üyeler ayrıca tutulur; odanın kendi kopyası saklanır
+        self._write(self.store.rooms.__setitem__, room.room_id, replace(room, users={}))
+
+    async def get_room(self, room_id: str) -> Optional[RoomEntity]:
+        room = self.store.rooms.get(room_id)
+        if room is None:
+            return None
+        users = {
+            connection_id: self.store.users[connection_id]
+            for connection_id in self.store.memberships.get(room_id, ())
+            if connection_id in self.store.users
+        }
+        return replace(room, users=users)
+
+    async def delete_room(self, room_id: str) -> None:
+        self._write(self._delete, room_id)
+
+    async def add_user_to_room(self, room_id: str, user: UserEntity) -> None:
+        self._write(self._add, [(room_id, user)])
+
+    async def remove_user_from_room(self, room_id: str, connection_id: str) -> None:
+        self._write(self._remove, [(room_id, connection_id)])
+
+    async def add_memberships(self, memberships: Iterable[Tuple[str, UserEntity]]) -> None:
+        self._write(self._add, list(memberships))
+
+    async def remove_memberships(self, memberships: Iterable[Tuple[str, str]]) -> None:
+        self._write(self._remove, list(memberships))
+
+    async def drop_memberships_for_connections(self, connection_ids: Iterable[str]) -> None:
+        self._write(self._drop, set(connection_ids))
+
+    def _delete(self, room_id: str) -> None:
+        self.store.rooms.pop(room_id, None)
+        self.store.memberships.pop(room_id, None)
+
+    def _add(self, memberships: List[Tuple[str, UserEntity]]) -> None:
+        for room_id, user in memberships:
+            if room_id not in self.store.rooms:
+                continue
+            self.store.users.setdefault(user.connection_id, user)
+            self.store.memberships.setdefault(room_id, set()).add(user.connection_id)
+
+    def _drop(self, connection_ids: Set[str]) -> None:
+        for members in self.store.memberships.values():
+            members -= connection_ids
+
+    def _remove(self, memberships: List[Tuple[str, str]]) -> None:
+        for room_id, connection_id in memberships:
+            members = self.store.memberships.get(room_id)
+            if members is not None:
+                members.discard(connection_id)
+
+
+class InMemoryMessageRepository(_InMemoryRepository):
+    async def save_message(self, message: MessageEntity) -> None:
+        self._write(self._append, message)
+
+    async def get_room_messages(self, room_id: str, limit: int = 50) -> List[MessageEntity]:
+        messages = self.store.messages.get(room_id, [])
+        return messages[-limit:] if limit > 0 else []
+
+    def _append(self, message: MessageEntity) -> None:
+        # Geçmiş tamponundan gelen kimlik korunur
+        if message.id is None:
+            message.id = self.store.next_message_id
+        self.store.next_message_id = max(self.store.next_message_id, message.id + 1)
+        self.store.messages.setdefault(message.room_id, []).append(message)
+
+
+class InMemoryUnitOfWork:
+    """Yazımları commit'e kadar biriktirip tek seferde uygulayan birim"""
+
+    def __init__(self, store: InMemoryStore):
+        self.store = store
+        self.pending: List[Callable[[], None]] = []
+        self.users = InMemoryUserRepository(store, self.pending)
+        self.rooms = InMemoryRoomRepository(store, self.pending)
+        self.messages = InMemoryMessageRepository(store, self.pending)
+
+    async def __aenter__(self) -> "InMemoryUnitOfWork":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.rollback()
+
+    async def commit(self) -> None:
+        for write in self.pending:
+            write()
+        if self.pending:
+            self.store.commits += 1
+        self.pending.clear()
+
+    async def rollback(self) -> None:
+        self.pending.clear()
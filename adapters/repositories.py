@@ -1,15 +1,93 @@
-from typing import Optional, List
+from typing import Optional, List, Iterable, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, delete, and_, exists, values, column, String
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import selectinload
 from domain.models import User, Room, Message, RoomMembership, Session, MessageType
 from domain.entities import User as UserEntity, Room as RoomEntity, Message as MessageEntity, Session as SessionEntity
 from datetime import datetime
+from adapters import identity_cache
+from adapters.identity_cache import IdentityCache
+from infrastructure.token_cache import TokenCache, token_cache, token_digest
 
-class PostgresUserRepository:
-    def __init__(self, session: AsyncSession):
+class _IdentityLookups:
+    """connection_id/room_id → birincil anahtar çözümlemesi (önbellekli)"""
+    
+    def __init__(
+        self,
+        session: AsyncSession,
+        user_ids: Optional[IdentityCache] = None,
+        room_ids: Optional[IdentityCache] = None,
+        autocommit: bool = True,
+        staged: Optional[List[Tuple[IdentityCache, str, Optional[int]]]] = None
+    ):
         self.session = session
+        self.user_ids = user_ids if user_ids is not None else identity_cache.user_ids
+        self.room_ids = room_ids if room_ids is not None else identity_cache.room_ids
+        # Unit of work içinde yazımlar yalnızca flush edilir; commit UoW'nin işi
+        self.autocommit = autocommit
+        # Commit edilmemiş satırların kimlikleri (silinenler için None); önbelleğe
+        # ancak commit'ten sonra yansır
+        self.staged = staged if staged is not None else []
+    
+    async def _commit(self) -> None:
+        if not self.autocommit:
+            await self.session.flush()
+            return
+        try:
+            await self.session.commit()
+        except BaseException:
+            self.staged.clear()
+            raise
+        publish_identities(self.staged)
+    
+    def _remember(self, cache: IdentityCache, key: str, pk: int) -> None:
+        self.staged.append((cache, key, pk))
+    
+    def _forget(self, cache: IdentityCache, key: str) -> None:
+        # Silme geri alınırsa önbellekteki kimlik geçerli kalır
+        self.staged.append((cache, key, None))
     
+    async def _user_pk(self, connection_id: str) -> Optional[int]:
+        user_pk = self.user_ids.get(connection_id)
+        if user_pk is None:
+            result = await self.session.execute(
+                select(User.id).where(User.connection_id == connection_id)
+            )
+            user_pk = result.scalar_one_or_none()
+            if user_pk is not None:
+                # Autocommit'te okunan satır commit edilmiştir; UoW'de aynı transaction'ın eklediği olabilir
+                if self.autocommit:
+                    self.user_ids.put(connection_id, user_pk)
+                else:
+                    self._remember(self.user_ids, connection_id, user_pk)
+        return user_pk
+    
+    async def _room_pk(self, room_id: str) -> Optional[int]:
+        room_pk = self.room_ids.get(room_id)
+        if room_pk is None:
+            result = await self.session.execute(
+                select(Room.id).where(Room.room_id == room_id)
+            )
+            room_pk = result.scalar_one_or_none()
+            if room_pk is not None:
+                # Autocommit'te okunan satır commit edilmiştir; UoW'de aynı transaction'ın eklediği olabilir
+                if self.autocommit:
+                    self.room_ids.put(room_id, room_pk)
+                else:
+                    self._remember(self.room_ids, room_id, room_pk)
+        return room_pk
+
+def publish_identities(staged: List[Tuple[IdentityCache, str, Optional[int]]]) -> None:
+    """Commit'i başarıyla tamamlanan yazımların kimliklerini önbelleğe yansıt"""
+    for cache, key, pk in staged:
+        if pk is None:
+            cache.invalidate(key)
+        else:
+            cache.put(key, pk)
+    staged.clear()
+
+class PostgresUserRepository(_IdentityLookups):
     async def save_user(self, user: UserEntity) -> None:
         db_user = User(
             username=user.username,
@@ -17,7 +95,9 @@ class PostgresUserRepository:
             joined_at=user.joined_at
         )
         self.session.add(db_user)
-        await self.session.commit()
+        await self.session.flush()
+        self._remember(self.user_ids, user.connection_id, db_user.id)
+        await self._commit()
     
     async def get_user(self, connection_id: str) -> Optional[UserEntity]:
         result = await self.session.execute(
@@ -38,14 +118,12 @@ class PostgresUserRepository:
             select(User).where(User.connection_id == connection_id)
         )
         db_user = result.scalar_one_or_none()
+        self._forget(self.user_ids, connection_id)
         if db_user:
             await self.session.delete(db_user)
-            await self.session.commit()
+        await self._commit()
 
-class PostgresRoomRepository:
-    def __init__(self, session: AsyncSession):
-        self.session = session
-    
+class PostgresRoomRepository(_IdentityLookups):
     async def save_room(self, room: RoomEntity) -> None:
         # Önce odayı kontrol et
         result = await self.session.execute(
@@ -66,8 +144,10 @@ class PostgresRoomRepository:
                 is_active=room.is_active
             )
             self.session.add(db_room)
+            await self.session.flush()
         
-        await self.session.commit()
+        self._remember(self.room_ids, room.room_id, db_room.id)
+        await self._commit()
     
     async def get_room(self, room_id: str) -> Optional[RoomEntity]:
         result = await self.session.execute(
@@ -78,14 +158,14 @@ class PostgresRoomRepository:
         
         if db_room:
             # Kullanıcıları topla
-            users = set()
+            users = {}
             for membership in db_room.memberships:
                 user_entity = UserEntity(
                     username=membership.user.username,
                     connection_id=membership.user.connection_id,
                     joined_at=membership.user.joined_at
                 )
-                users.add(user_entity)
+                users[user_entity.connection_id] = user_entity
             
             return RoomEntity(
                 room_id=db_room.room_id,
@@ -101,25 +181,20 @@ class PostgresRoomRepository:
             select(Room).where(Room.room_id == room_id)
         )
         db_room = result.scalar_one_or_none()
+        self._forget(self.room_ids, room_id)
         if db_room:
             await self.session.delete(db_room)
-            await self.session.commit()
+        await self._commit()
     
     async def add_user_to_room(self, room_id: str, user: UserEntity) -> None:
         # Odayı bul
-        result = await self.session.execute(
-            select(Room).where(Room.room_id == room_id)
-        )
-        db_room = result.scalar_one_or_none()
+        room_pk = await self._room_pk(room_id)
         
-        if db_room:
+        if room_pk is not None:
             # Kullanıcıyı bul veya oluştur
-            user_result = await self.session.execute(
-                select(User).where(User.connection_id == user.connection_id)
-            )
-            db_user = user_result.scalar_one_or_none()
+            user_pk = await self._user_pk(user.connection_id)
             
-            if not db_user:
+            if user_pk is None:
                 db_user = User(
                     username=user.username,
                     connection_id=user.connection_id,
@@ -127,79 +202,142 @@ class PostgresRoomRepository:
                 )
                 self.session.add(db_user)
                 await self.session.flush()
+                user_pk = db_user.id
+                self._remember(self.user_ids, user.connection_id, user_pk)
             
-            # Üyelik oluştur
-            membership = RoomMembership(
-                user_id=db_user.id,
-                room_id=db_room.id
+            # Üyelik oluştur; tekil indeks sayesinde tekrar katılım no-op olur
+            await self.session.execute(
+                insert(RoomMembership).values(user_id=user_pk, room_id=room_pk)
+                .on_conflict_do_nothing(index_elements=[RoomMembership.user_id, RoomMembership.room_id])
             )
-            self.session.add(membership)
-            await self.session.commit()
+            await self._commit()
     
     async def remove_user_from_room(self, room_id: str, connection_id: str) -> None:
-        # Kullanıcıyı bul
-        user_result = await self.session.execute(
-            select(User).where(User.connection_id == connection_id)
-        )
-        db_user = user_result.scalar_one_or_none()
+        user_pk = await self._user_pk(connection_id)
+        room_pk = await self._room_pk(room_id)
         
-        if db_user:
-            # Odayı bul
-            room_result = await self.session.execute(
-                select(Room).where(Room.room_id == room_id)
+        if user_pk is not None and room_pk is not None:
+            # Üyeliği tek DELETE ile sil
+            await self.session.execute(
+                delete(RoomMembership).where(
+                    and_(
+                        RoomMembership.user_id == user_pk,
+                        RoomMembership.room_id == room_pk
+                    )
+                )
+            )
+            await self._commit()
+    
+    async def add_memberships(self, memberships: Iterable[Tuple[str, UserEntity]], chunk_size: int = 1000) -> None:
+        """Birçok (room_id, kullanıcı) üyeliğini parça başına üç ifadeyle ekle
+        
+        Eksik kullanıcı ve odalar ON CONFLICT DO NOTHING ile oluşturulur,
+        üyelikler ise VALUES listesi üzerinden tek INSERT ... SELECT ile eklenir.
+        """
+        memberships = list(memberships)
+        for start in range(0, len(memberships), chunk_size):
+            chunk = memberships[start:start + chunk_size]
+            users = {user.connection_id: user for _, user in chunk}
+            
+            await self.session.execute(
+                insert(User).values([
+                    {
+                        "username": user.username,
+                        "connection_id": user.connection_id,
+                        "joined_at": user.joined_at,
+                    }
+                    for user in users.values()
+                ]).on_conflict_do_nothing(index_elements=[User.connection_id])
+            )
+            await self.session.execute(
+                insert(Room).values([{"room_id": room_id} for room_id in {room_id for room_id, _ in chunk}])
+                .on_conflict_do_nothing(index_elements=[Room.room_id])
             )
-            db_room = room_result.scalar_one_or_none()
             
-            if db_room:
-                # Üyeliği sil
-                membership_result = await self.session.execute(
-                    select(RoomMembership).where(
-                        and_(
-                            RoomMembership.user_id == db_user.id,
-                            RoomMembership.room_id == db_room.id
-                        )
+            pairs = _membership_values([(room_id, user.connection_id) for room_id, user in chunk])
+            await self.session.execute(
+                insert(RoomMembership).from_select(
+                    ["user_id", "room_id"],
+                    select(User.id, Room.id)
+                    .join(pairs, pairs.c.connection_id == User.connection_id)
+                    .join(Room, Room.room_id == pairs.c.room_key)
+                    .where(~exists().where(
+                        RoomMembership.user_id == User.id,
+                        RoomMembership.room_id == Room.id
+                    ))
+                    .distinct()
+                ).on_conflict_do_nothing(index_elements=[RoomMembership.user_id, RoomMembership.room_id])
+            )
+        await self._commit()
+    
+    async def remove_memberships(self, memberships: Iterable[Tuple[str, str]], chunk_size: int = 1000) -> None:
+        """Birçok (room_id, connection_id) üyeliğini parça başına tek DELETE ile sil"""
+        memberships = list(memberships)
+        for start in range(0, len(memberships), chunk_size):
+            pairs = _membership_values(memberships[start:start + chunk_size])
+            await self.session.execute(
+                delete(RoomMembership).where(
+                    RoomMembership.id.in_(
+                        select(RoomMembership.id)
+                        .join(User, User.id == RoomMembership.user_id)
+                        .join(Room, Room.id == RoomMembership.room_id)
+                        .join(pairs, and_(
+                            pairs.c.connection_id == User.connection_id,
+                            pairs.c.room_key == Room.room_id
+                        ))
                     )
                 )
-                membership = membership_result.scalar_one_or_none()
-                
-                if membership:
-                    await self.session.delete(membership)
-                    await self.session.commit()
-
-class PostgresMessageRepository:
-    def __init__(self, session: AsyncSession):
-        self.session = session
+            )
+        await self._commit()
     
+    async def drop_memberships_for_connections(self, connection_ids: Iterable[str], chunk_size: int = 5000) -> None:
+        """Verilen bağlantıların tüm oda üyeliklerini sil (örn. düğüm kapanırken)"""
+        connection_ids = list(connection_ids)
+        for start in range(0, len(connection_ids), chunk_size):
+            chunk = connection_ids[start:start + chunk_size]
+            await self.session.execute(
+                delete(RoomMembership).where(
+                    RoomMembership.user_id.in_(
+                        select(User.id).where(User.connection_id.in_(chunk))
+                    )
+                )
+            )
+        await self._commit()
+
+def _membership_values(pairs: List[Tuple[str, str]]):
+    """(room_id, connection_id) çiftlerinden satır içi VALUES tablosu"""
+    return values(
+        column("room_key", String),
+        column("connection_id", String),
+        name="membership_keys"
+    ).data(pairs)
+
+class PostgresMessageRepository(_IdentityLookups):
     async def save_message(self, message: MessageEntity) -> None:
-        # Gönderen kullanıcıyı bul
-        user_result = await self.session.execute(
-            select(User).where(User.connection_id == message.sender.connection_id)
-        )
-        db_user = user_result.scalar_one_or_none()
-        
-        # Odayı bul
-        room_result = await self.session.execute(
-            select(Room).where(Room.room_id == message.room_id)
-        )
-        db_room = room_result.scalar_one_or_none()
+        # Gönderen kullanıcıyı ve odayı çöz
+        user_pk = await self._user_pk(message.sender.connection_id)
+        room_pk = await self._room_pk(message.room_id)
         
-        if db_user and db_room:
+        if user_pk is not None and room_pk is not None:
             db_message = Message(
                 content=message.content,
                 message_type=message.message_type.value,
                 timestamp=message.timestamp,
-                sender_id=db_user.id,
-                room_id=db_room.id
+                sender_id=user_pk,
+                room_id=room_pk
             )
             self.session.add(db_message)
-            await self.session.commit()
+            await self._commit()
     
     async def get_room_messages(self, room_id: str, limit: int = 50) -> List[MessageEntity]:
+        """Odanın son ``limit`` mesajı; (room_id, id) indeksinden okunur"""
+        room_pk = await self._room_pk(room_id)
+        if room_pk is None:
+            return []
         result = await self.session.execute(
             select(Message).options(selectinload(Message.sender))
-            .join(Room).where(Room.room_id == room_id)
-            .order_by(Message.timestamp.desc())
-            .limit(limit)
+            .where(Message.room_id == room_pk)
+            .order_by(Message.id.desc()).limit(limit)
         )
         messages = result.scalars().all()
         
@@ -216,15 +354,18 @@ class PostgresMessageRepository:
                 sender=sender_entity,
                 message_type=MessageType(msg.message_type),
                 timestamp=msg.timestamp,
-                room_id=room_id
+                room_id=room_id,
+                id=msg.id
             )
             message_entities.append(message_entity)
         
         return message_entities[::-1]  # Eski mesajlar önce
 
 class PostgresSessionRepository:
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, cache: Optional[TokenCache] = None):
         self.session = session
+        # Session kimliği JWT'nin kendisidir; iptal doğrulama önbelleğine de işlenir
+        self.cache = cache if cache is not None else token_cache
     
     async def save_session(self, session_entity: SessionEntity) -> None:
         db_session = Session(
@@ -257,6 +398,9 @@ class PostgresSessionRepository:
         return None
     
     async def invalidate_session(self, session_id: str) -> None:
+        # Önbellekteki kayıt hemen düşürülür ve diğer worker'lara duyurulur
+        await self.cache.revoke(token_digest(session_id))
+        
         result = await self.session.execute(
             select(Session).where(Session.session_id == session_id)
         )
@@ -266,12 +410,80 @@ class PostgresSessionRepository:
             db_session.is_active = False
             await self.session.commit()
     
-    async def cleanup_expired_sessions(self) -> None:
-        expired_sessions = await self.session.execute(
-            select(Session).where(Session.expires_at < datetime.now())
-        )
-        
-        for session in expired_sessions.scalars().all():
-            await self.session.delete(session)
+    async def delete_expired_chunk(self, now: datetime, limit: int) -> int:
+        """Süresi dolmuş en fazla ``limit`` session'ı tek DELETE ile sil
         
+        Satırlar Python'a yüklenmez; ``expires_at`` indeksi üzerinden seçilen
+        id'ler kümesi silinir. Aynı anda çalışan başka bir süpürücünün kilitlediği
+        satırlar atlanır.
+        """
+        expired_ids = (
+            select(Session.id)
+            .where(Session.expires_at < now)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await self.session.execute(
+            delete(Session)
+            .where(Session.id.in_(expired_ids.scalar_subquery()))
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.commit()
+        return result.rowcount or 0
+    
+    async def cleanup_expired_sessions(self, chunk_size: int = 5000) -> int:
+        """Süresi dolmuş tüm session'ları parça parça sil, silinen sayıyı döndür"""
+        now = datetime.now()
+        total = 0
+        while True:
+            deleted = await self.delete_expired_chunk(now, chunk_size)
+            total += deleted
+            if deleted < chunk_size:
+                return total
+
+class PostgresUnitOfWork:
+    """Tek session/transaction paylaşan Postgres repository'leri
+    
+    İçerideki repository'ler yalnızca flush eder; birden fazla yazım
+    (kullanıcı, üyelik, oda durumu) tek commit ile veritabanına gider.
+    """
+    
+    def __init__(
+        self,
+        session_factory,
+        user_ids: Optional[IdentityCache] = None,
+        room_ids: Optional[IdentityCache] = None
+    ):
+        self.session_factory = session_factory
+        self.user_ids = user_ids if user_ids is not None else identity_cache.user_ids
+        self.room_ids = room_ids if room_ids is not None else identity_cache.room_ids
+        self.session: Optional[AsyncSession] = None
+        self.committed = False
+    
+    async def __aenter__(self) -> "PostgresUnitOfWork":
+        self.session = self.session_factory()
+        self.staged: List[Tuple[IdentityCache, str, Optional[int]]] = []
+        lookups = dict(user_ids=self.user_ids, room_ids=self.room_ids, autocommit=False, staged=self.staged)
+        self.users = PostgresUserRepository(self.session, **lookups)
+        self.rooms = PostgresRoomRepository(self.session, **lookups)
+        self.messages = PostgresMessageRepository(self.session, **lookups)
+        self.committed = False
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        try:
+            if not self.committed:
+                await self.rollback()
+        finally:
+            await self.session.close()
+            self.session = None
+    
+    async def commit(self) -> None:
         await self.session.commit()
+        self.committed = True
+        publish_identities(self.staged)
+    
+    async def rollback(self) -> None:
+        await self.session.rollback()
+        # Flush edilip geri alınan satırların kimlikleri önbelleğe hiç girmez
+        self.staged.clear()
@@ -0,0 +1,281 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.exc import DBAPIError, OperationalError, TimeoutError as PoolTimeoutError
+from sqlalchemy.dialects.postgresql import insert
+from domain.models import User, Room, Message
+from domain.entities import Message as MessageEntity
+from adapters import identity_cache
+from adapters.identity_cache import IdentityCache
+
+logger = logging.getLogger(__name__)
+
+# asyncpg bir ifadede en fazla 32767 parametre kabul eder; mesaj satırı 5 sütun
+MAX_ROWS_PER_INSERT = 32767 // 5
+
+# Geçici SQLSTATE sınıfları: bağlantı (08), kaynak yetersiz (53, örn. çok fazla
+# bağlantı), yönetici kapatması/başlatılıyor (57P), serileştirme/deadlock (40)
+TRANSIENT_SQLSTATES = ("08", "53", "57P", "40")
+
+class WriteBehindMessageWriter:
+    """Mesajları kuyruğa alıp arka planda çok satırlı INSERT ile yazan aşama
+    
+    Gönderim yolu yalnızca ``enqueue`` çağırır; veritabanı turu beklenmez.
+    Kuyruk ``batch_size`` mesaja ulaştığında ya da ``flush_interval`` saniye
+    geçtiğinde tek transaction içinde toplu yazılır. Gönderen ve oda kimlikleri
+    paylaşılan ``IdentityCache``'ten çözülür; yalnızca eksikler sorgulanır.
+    
+    Bağlantı hataları (havuz zaman aşımı, Postgres yeniden başlıyor, çok
+    fazla bağlantı) aynı grupla, ``max_retry_delay``'e kadar katlanarak
+    artan aralıklarla sınırsız yeniden denenir. Veri kaynaklı
+    hatalarda (örn. NUL karakterli içerik) grup ``max_attempts`` denemeden
+    sonra ikiye bölünür; tek başına da yazılamayan mesaj atılır ve
+    ``dead_letters``'ta tutulur, böylece tek bir bozuk satır kuyruğu kilitlemez.
+    """
+    
+    def __init__(
+        self,
+        session_factory,
+        batch_size: int = 500,
+        flush_interval: float = 0.2,
+        max_queue: int = 100_000,
+        retry_delay: float = 1.0,
+        max_retry_delay: float = 30.0,
+        max_attempts: int = 3,
+        dead_letter_limit: int = 100,
+        user_ids: Optional[IdentityCache] = None,
+        room_ids: Optional[IdentityCache] = None
+    ):
+        self.session_factory = session_factory
+        self.user_ids = user_ids if user_ids is not None else identity_cache.user_ids
+        self.room_ids = room_ids if room_ids is not None else identity_cache.room_ids
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._delay = retry_delay
+        self.max_attempts = max_attempts
+        self.dead_letters: deque = deque(maxlen=dead_letter_limit)
+        # Bozuk satır aranırken küçülen grup boyutu
+        self._split_size = batch_size
+        self._attempts = 0
+        self._clean_since_split = 0
+        self.queue: deque = deque()
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed_batches = 0
+        self.transient_failures = 0
+        self.dead_lettered = 0
+        self.lost_on_stop = 0
+        self.last_flush_seconds = 0.0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+    
+    def enqueue(self, message: MessageEntity) -> bool:
+        """Mesajı yazma kuyruğuna ekle (beklemez)"""
+        if self._stopping or len(self.queue) >= self.max_queue:
+            self.dropped += 1
+            return False
+        self.queue.append(message)
+        self.enqueued += 1
+        if len(self.queue) == 1 or len(self.queue) >= self.batch_size:
+            self._wakeup.set()
+        return True
+    
+    def start(self) -> None:
+        """Arka plan yazıcısını başlat"""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+    
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Yeni mesaj kabulünü durdur ve kuyruğu boşalt"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._task = None
+        if self.queue:
+            self.lost_on_stop += len(self.queue)
+            logger.error("Write-behind kuyruğu boşaltılamadı, %d mesaj kaybedildi", len(self.queue))
+            self.queue.clear()
+    
+    def stats(self) -> Dict[str, float]:
+        return {
+            "queued": len(self.queue),
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed_batches": self.failed_batches,
+            "transient_failures": self.transient_failures,
+            "dead_lettered": self.dead_lettered,
+            "lost_on_stop": self.lost_on_stop,
+            "split_size": self._split_size,
+            "last_flush_ms": self.last_flush_seconds * 1000,
+        }
+    
+    async def _run(self) -> None:
+        while True:
+            if not self.queue:
+                if self._stopping:
+                    return
+                await self._wait_for_wakeup(None)
+                continue
+            
+            if len(self.queue) < self.batch_size and not self._stopping:
+                # Boyut eşiğine ulaşılmadıysa zaman eşiğini bekle
+                await self._wait_for_wakeup(self.flush_interval)
+                if not self.queue:
+                    continue
+            
+            batch = [self.queue.popleft() for _ in range(min(self._split_size, len(self.queue)))]
+            try:
+                await self.flush(batch)
+            except Exception as exc:
+                self.failed_batches += 1
+                delay = self._on_failure(batch, exc)
+                if self._stopping:
+                    return
+                await asyncio.sleep(delay)
+            else:
+                self._attempts = 0
+                self._delay = self.retry_delay
+                if self._split_size < self.batch_size:
+                    # Bölünmeden önceki grubun tamamı yazıldıysa bozuk satır kalmadı
+                    self._clean_since_split += len(batch)
+                    if self._clean_since_split >= self.batch_size:
+                        self._split_size = self.batch_size
+    
+    def _on_failure(self, batch: List[MessageEntity], exc: Exception) -> float:
+        """Grubu kuyruğa geri koy; veri hatası sürerse böl ya da tek mesajı at
+        
+        Sonraki denemeden önce beklenecek süreyi döndürür.
+        """
+        if _is_transient(exc):
+            # Altyapı sorunu: grup bölünmez, deneme sayılmaz; bekleme katlanır
+            self.transient_failures += 1
+            delay = self._delay
+            self._delay = min(self._delay * 2, self.max_retry_delay)
+            logger.warning("Toplu mesaj yazımı başarısız (%s), %d mesaj %.1f sn sonra tekrar denenecek", exc, len(batch), delay)
+            self.queue.extendleft(reversed(batch))
+            return delay
+        
+        self._attempts += 1
+        if self._attempts < self.max_attempts:
+            logger.exception("Toplu mesaj yazımı başarısız, %d mesaj tekrar denenecek", len(batch))
+            self.queue.extendleft(reversed(batch))
+            return self.retry_delay
+        
+        self._attempts = 0
+        if len(batch) > 1:
+            # Bozuk satırı ayırmak için grubu ikiye böl
+            self._split_size = max(1, len(batch) // 2)
+            self._clean_since_split = 0
+            self.queue.extendleft(reversed(batch))
+            return self.retry_delay
+        
+        self._split_size = self.batch_size
+        self.dead_lettered += 1
+        self.dead_letters.append(batch[0])
+        logger.error("Mesaj yazılamadı ve atıldı (oda %s): %s", batch[0].room_id, exc)
+        return self.retry_delay
+    
+    async def _wait_for_wakeup(self, timeout: Optional[float]) -> None:
+        self._wakeup.clear()
+        try:
+            async with asyncio.timeout(timeout):
+                await self._wakeup.wait()
+        except TimeoutError:
+            pass
+    
+    async def flush(self, batch: List[MessageEntity]) -> None:
+        """Bir grup mesajı tek transaction içinde yaz"""
+        if not batch:
+            return
+        
+        started = time.perf_counter()
+        async with self.session_factory() as session:
+            user_ids, new_users = await self._ensure_users(session, batch)
+            room_ids, new_rooms = await self._ensure_rooms(session, batch)
+            
+            rows = [
+                {
+                    "content": message.content,
+                    "message_type": message.message_type.value,
+                    "timestamp": message.timestamp,
+                    "sender_id": user_ids[message.sender.connection_id],
+                    "room_id": room_ids[message.room_id],
+                }
+                for message in batch
+            ]
+            for start in range(0, len(rows), MAX_ROWS_PER_INSERT):
+                await session.execute(insert(Message).values(rows[start:start + MAX_ROWS_PER_INSERT]))
+            await session.commit()
+        
+        # Rollback olursa önbellek var olmayan satırları göstermesin
+        self.user_ids.put_many(new_users)
+        self.room_ids.put_many(new_rooms)
+        self.written += len(batch)
+        self.last_flush_seconds = time.perf_counter() - started
+    
+    async def _ensure_users(self, session, batch: Iterable[MessageEntity]) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """Tüm göndericilerin kimlikleri ve bu transaction'da çözülenler"""
+        senders = {message.sender.connection_id: message.sender for message in batch}
+        found, missing = self.user_ids.get_many(senders)
+        if not missing:
+            return found, {}
+        
+        await session.execute(
+            insert(User).values([
+                {
+                    "username": senders[connection_id].username,
+                    "connection_id": connection_id,
+                    "joined_at": senders[connection_id].joined_at,
+                }
+                for connection_id in missing
+            ]).on_conflict_do_nothing(index_elements=[User.connection_id])
+        )
+        result = await session.execute(
+            select(User.connection_id, User.id).where(User.connection_id.in_(missing))
+        )
+        resolved = dict(result.all())
+        found.update(resolved)
+        return found, resolved
+    
+    async def _ensure_rooms(self, session, batch: Iterable[MessageEntity]) -> Tuple[Dict[str, int], Dict[str, int]]:
+        found, missing = self.room_ids.get_many({message.room_id for message in batch})
+        if not missing:
+            return found, {}
+        
+        await session.execute(
+            insert(Room).values([{"room_id": room_id} for room_id in missing])
+            .on_conflict_do_nothing(index_elements=[Room.room_id])
+        )
+        result = await session.execute(
+            select(Room.room_id, Room.id).where(Room.room_id.in_(missing))
+        )
+        resolved = dict(result.all())
+        found.update(resolved)
+        return found, resolved
+
+def _is_transient(exc: Exception) -> bool:
+    """Bağlantı/zaman aşımı hataları: veri değil altyapı sorunu, bölmeye gerek yok"""
+    if isinstance(exc, PoolTimeoutError):
+        # Havuzdan bağlantı alınamadı (QueuePool doygun)
+        return True
+    if isinstance(exc, DBAPIError):
+        if exc.connection_invalidated or isinstance(exc, OperationalError):
+            return True
+        # asyncpg hataları (CannotConnectNowError, TooManyConnectionsError...)
+        # genel DBAPIError olarak sarılır; SQLSTATE'ten ayırt edilir
+        sqlstate = getattr(exc.orig, "sqlstate", None) or getattr(exc.orig, "pgcode", None)
+        return isinstance(sqlstate, str) and sqlstate.startswith(TRANSIENT_SQLSTATES)
+    return isinstance(exc, (OSError, ConnectionError, asyncio.TimeoutError))
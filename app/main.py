@@ -1,15 +1,255 @@
-from fastapi import FastAPI, WebSocket
+import logging
+import math
+import os
+import secrets
+from functools import partial
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, WebSocket, Header, HTTPException, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
 # Domain katmanı
 from domain.use_cases import ChatUseCase
+from domain.errors import ChatError
 
 # Infrastructure katmanı
 from infrastructure.websocket_handler import WebSocketHandler
+from infrastructure.backplane import create_backplane
+from infrastructure.token_cache import token_cache
+from infrastructure.sharding import ShardRouter
+from domain.rate_limit import RateLimiter
+from infrastructure import metrics
+from infrastructure.loop_watchdog import LoopWatchdog
+from infrastructure.password_hasher import AsyncPasswordHasher, HasherOverloaded
+from infrastructure.drain import GracefulDrain
+from infrastructure.snapshot import SnapshotSlot, load_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Oda parolaları bcrypt ile, olay döngüsü dışındaki sınırlı bir havuzda hash'lenir
+password_hasher = AsyncPasswordHasher(
+    max_workers=int(os.getenv("CHAT_HASH_WORKERS", "0")) or None,
+    max_pending=int(os.getenv("CHAT_HASH_MAX_PENDING", "256")),
+    queue_observer=metrics.registry.histogram(
+        "chat_password_hash_queue_seconds", "Parola işinin havuzda sıra bekleme süresi"
+    ).observe,
+    work_observer=metrics.registry.histogram(
+        "chat_password_hash_seconds", "Parola hash/doğrulama süresi",
+        buckets=(0.01, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.0, 5.0)
+    ).observe
+)
+# HTTP aramasındaki parola doğrulamaları için ayrı, küçük havuz; aramalar
+# katılmaların hash kapasitesini tüketemez
+search_password_hasher = AsyncPasswordHasher(
+    max_workers=int(os.getenv("CHAT_SEARCH_HASH_WORKERS", "1")),
+    max_pending=int(os.getenv("CHAT_SEARCH_HASH_MAX_PENDING", "8"))
+)
+
+# Chat use case ve handler oluştur
+# Yoğun odalarda çerçeveler alıcı başına kısa bir pencerede birleştirilebilir
+# (örn. CHAT_BATCH_WINDOW_MS=10)
+chat_use_case = ChatUseCase(
+    batch_window=float(os.getenv("CHAT_BATCH_WINDOW_MS", "0")) / 1000,
+    max_batch=int(os.getenv("CHAT_MAX_BATCH", "32")),
+    # Oda geçmişi üzerinde arama indeksi (CHAT_SEARCH=0 kapatır)
+    search_index=os.getenv("CHAT_SEARCH", "1") != "0",
+    password_hasher=password_hasher,
+    # Omurgadaki oda kaydının (parola hash'i, kuşak) ömrü, saniye
+    claim_ttl=int(os.getenv("CHAT_ROOM_CLAIM_TTL", "86400"))
+)
+chat_use_case.search_password_hasher = search_password_hasher
+# Odalar birden fazla süreç arasında paylaştırılabilir
+# (örn. CHAT_SHARD_ID=a CHAT_SHARD_URLS=a=ws://host:8001,b=ws://host:8002)
+shard_router = ShardRouter.from_env()
+# Bağlantı ve oda başına saniyelik mesaj sınırı (0 = sınırsız)
+rate_limiter = RateLimiter(
+    connection_rate=float(os.getenv("CHAT_RATE_CONNECTION", "10")),
+    connection_burst=float(os.getenv("CHAT_RATE_CONNECTION_BURST", "20")),
+    room_rate=float(os.getenv("CHAT_RATE_ROOM", "200")),
+    room_burst=float(os.getenv("CHAT_RATE_ROOM_BURST", "400")),
+    # Negatif değer "yavaşla" bildirimini kapatır
+    notice_interval=float(os.getenv("CHAT_RATE_NOTICE_INTERVAL", "2"))
+)
+# HTTP araması istemci IP'si ve oda başına sınırlanır (parola denemeleri dahil)
+search_limiter = RateLimiter(
+    connection_rate=float(os.getenv("CHAT_SEARCH_RATE_IP", "1")),
+    connection_burst=float(os.getenv("CHAT_SEARCH_RATE_IP_BURST", "5")),
+    room_rate=float(os.getenv("CHAT_SEARCH_RATE_ROOM", "5")),
+    room_burst=float(os.getenv("CHAT_SEARCH_RATE_ROOM_BURST", "20")),
+    notice_interval=-1
+)
+# Bu kadar istemci izlenince dolu kovalar atılır
+SEARCH_LIMITER_MAX_TRACKED = 10_000
+# Kapanışta istemciler RECONNECT_MS + [0, JITTER_MS) ms sonra yeniden bağlanır
+RECONNECT_MS = int(os.getenv("CHAT_RECONNECT_MS", "1000"))
+RECONNECT_JITTER_MS = int(os.getenv("CHAT_RECONNECT_JITTER_MS", "5000"))
+websocket_handler = WebSocketHandler(
+    chat_use_case,
+    shard_router=shard_router,
+    rate_limiter=rate_limiter,
+    reconnect_after_ms=RECONNECT_MS,
+    reconnect_jitter_ms=RECONNECT_JITTER_MS
+)
+
+# SIGTERM'de odalar/geçmiş buraya yazılır, açılışta geri yüklenir (boş = kapalı);
+# birden fazla worker'da her biri kendi yuvasını kullanır (bkz. SnapshotSlot)
+SNAPSHOT_PATH = os.getenv("CHAT_SNAPSHOT_PATH") or None
+graceful_drain = GracefulDrain(
+    chat_use_case,
+    reconnect_after_ms=RECONNECT_MS,
+    jitter_ms=RECONNECT_JITTER_MS,
+    timeout=float(os.getenv("CHAT_DRAIN_TIMEOUT", "5"))
+)
+
+# /metrics için ölçümler; değerlerin çoğu kazıma anında mevcut sayaçlardan okunur
+metrics.instrument_chat(chat_use_case)
+metrics.instrument_stats("chat_rate_limiter", rate_limiter.stats, "Hız sınırlayıcı sayaçları")
+metrics.instrument_stats("chat_token_cache", token_cache.stats, "JWT doğrulama önbelleği sayaçları")
+metrics.instrument_stats("chat_password_hasher", password_hasher.stats, "Parola havuzu sayaçları")
+metrics.instrument_stats("chat_search_password_hasher", search_password_hasher.stats, "Arama parola havuzu sayaçları")
+metrics.instrument_stats("chat_search_limiter", search_limiter.stats, "Arama hız sınırlayıcı sayaçları")
+if shard_router is not None:
+    metrics.instrument_stats("chat_shard", shard_router.stats, "Shard yönlendirme sayaçları")
+
+loop_watchdog = None
+if os.getenv("CHAT_LOOP_WATCHDOG", "").lower() in ("1", "true", "yes", "on"):
+    loop_stalls = metrics.registry.histogram(
+        "chat_event_loop_stall_seconds",
+        "Eşiği aşan olay döngüsü takılmaları",
+        buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    )
+    loop_watchdog = LoopWatchdog(
+        threshold=float(os.getenv("CHAT_LOOP_WATCHDOG_THRESHOLD_MS", "100")) / 1000,
+        on_stall=loop_stalls.observe
+    )
+
+# Yönetim uçları X-Admin-Token başlığı ister; CHAT_ADMIN_TOKEN tanımlı değilse
+# uçlar hiç yokmuş gibi 404 döner
+ADMIN_TOKEN = os.getenv("CHAT_ADMIN_TOKEN")
+
+def _check_admin(token: str) -> None:
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not secrets.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Yetkisiz")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Uygulama açılış/kapanış işleri"""
+    lag_probe = metrics.LoopLagProbe(metrics.loop_lag)
+    lag_probe.start()
+    
+    # İsteğe bağlı takılma bekçisi (CHAT_LOOP_WATCHDOG=1)
+    if loop_watchdog is not None:
+        loop_watchdog.start()
+    
+    # Birden fazla worker/container için oda trafiği omurgası
+    # (örn. CHAT_BACKPLANE_URL=redis://redis:6379)
+    backplane = create_backplane(os.getenv("CHAT_BACKPLANE_URL"))
+    if backplane is not None:
+        await backplane.start()
+        if shard_router is None:
+            chat_use_case.backplane = backplane
+        else:
+            # Shard'lı kurulumda her oda tek düğümde yaşar; omurga yalnızca
+            # shard haritası duyuruları için kullanılır
+            await shard_router.attach(backplane, chat_use_case)
+        # Session iptalleri tüm worker'lardaki token önbelleğine yayılsın
+        await token_cache.attach(backplane)
+    
+    message_writer = None
+    session_sweeper = None
+    if os.getenv("CHAT_PERSISTENCE") == "postgres":
+        # Mesajlar gönderim yolunu bekletmeden arka planda toplu yazılır
+        from infrastructure.database import AsyncSessionLocal, init_db
+        from adapters.write_behind import WriteBehindMessageWriter
+        from adapters.repositories import PostgresUnitOfWork
+        from adapters import identity_cache
+        from infrastructure.session_sweeper import SessionSweeper
+        
+        from infrastructure.database import pool_metrics
+        
+        await init_db()
+        metrics.instrument_stats("chat_db_pool", pool_metrics.snapshot, "Bağlantı havuzu sayaçları")
+        metrics.instrument_stats("chat_identity_cache_users", identity_cache.user_ids.stats, "connection_id → kullanıcı kimliği önbelleği")
+        metrics.instrument_stats("chat_identity_cache_rooms", identity_cache.room_ids.stats, "room_id → oda kimliği önbelleği")
+        message_writer = WriteBehindMessageWriter(
+            AsyncSessionLocal,
+            batch_size=int(os.getenv("CHAT_WRITE_BATCH_SIZE", "500")),
+            flush_interval=float(os.getenv("CHAT_WRITE_FLUSH_INTERVAL", "0.2"))
+        )
+        message_writer.start()
+        metrics.instrument_stats("chat_write_behind", message_writer.stats, "Toplu mesaj yazıcı sayaçları")
+        chat_use_case.message_sink = message_writer
+        # Katılma/ayrılma başına kullanıcı, üyelik ve oda durumu tek transaction'da
+        chat_use_case.uow_factory = partial(PostgresUnitOfWork, AsyncSessionLocal)
+        
+        # Süresi dolmuş session'lar parça parça silinir
+        session_sweeper = SessionSweeper(
+            AsyncSessionLocal,
+            interval=float(os.getenv("CHAT_SESSION_SWEEP_INTERVAL", "60")),
+            chunk_size=int(os.getenv("CHAT_SESSION_SWEEP_CHUNK", "5000"))
+        )
+        session_sweeper.start()
+        metrics.instrument_stats("chat_session_sweeper", session_sweeper.stats, "Session süpürücü sayaçları")
+    
+    message_log = None
+    if os.getenv("CHAT_STORAGE") == "log":
+        # Postgres'siz tek düğüm: mesajlar yerel, yalnızca eklenen günlükte kalıcı
+        from adapters.log_repository import LogMessageRepository
+        
+        message_log = LogMessageRepository(
+            os.getenv("CHAT_LOG_DIR", "data/messages"),
+            segment_bytes=int(os.getenv("CHAT_LOG_SEGMENT_MB", "64")) * 1024 * 1024
+        )
+        chat_use_case.history_store = message_log
+        metrics.instrument_stats("chat_message_log", message_log.stats, "Mesaj günlüğü sayaçları")
+    
+    # Önceki sürecin bıraktığı durum; yeniden bağlananlar odalarını ve geçmişi bulur
+    snapshot_slot = SnapshotSlot.acquire(SNAPSHOT_PATH) if SNAPSHOT_PATH else None
+    if snapshot_slot is not None:
+        graceful_drain.snapshot_path = snapshot_slot.path
+        state = load_snapshot(snapshot_slot.path, max_age=float(os.getenv("CHAT_SNAPSHOT_MAX_AGE", "300")))
+        if state is not None:
+            await chat_use_case.restore_state(state, grace=float(os.getenv("CHAT_SNAPSHOT_GRACE", "120")))
+    elif SNAPSHOT_PATH:
+        logger.warning("Boş anlık görüntü yuvası yok, bu worker durum kaydetmeyecek: %s", SNAPSHOT_PATH)
+    graceful_drain.install()
+    
+    yield
+    
+    graceful_drain.uninstall()
+    # Sinyalsiz kapanışta (örn. test istemcisi) da bağlantılar düzgün kapatılır
+    await graceful_drain.drain()
+    if snapshot_slot is not None:
+        graceful_drain.snapshot_path = None
+        snapshot_slot.release()
+    
+    if message_log is not None:
+        chat_use_case.history_store = None
+        message_log.close()
+    
+    if session_sweeper is not None:
+        await session_sweeper.stop()
+    
+    if message_writer is not None:
+        chat_use_case.message_sink = None
+        chat_use_case.uow_factory = None
+        await message_writer.stop()
+    
+    if backplane is not None:
+        chat_use_case.backplane = None
+        await backplane.close()
+    
+    await lag_probe.stop()
+    password_hasher.shutdown()
+    search_password_hasher.shutdown()
+    if loop_watchdog is not None:
+        loop_watchdog.stop()
 
 # FastAPI uygulamasını oluştur
-app = FastAPI(title="Basit Chat Uygulaması")
+app = FastAPI(title="Basit Chat Uygulaması", lifespan=lifespan)
 
 # CORS middleware ekle
 app.add_middleware(
@@ -20,14 +260,44 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Chat use case ve handler oluştur
-chat_use_case = ChatUseCase()
-websocket_handler = WebSocketHandler(chat_use_case)
-
 # WebSocket endpoint'i
 @app.websocket("/ws/{room}/{username}")
 async def websocket_endpoint(websocket: WebSocket, room: str, username: str):
     await websocket_handler.handle_connection(websocket, room, username)
 
+# Prometheus metin biçiminde ölçümler (statik mount'tan önce tanımlanmalı)
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/admin/loop-stalls")
+async def loop_stalls_endpoint(limit: int = 20, x_admin_token: str = Header(default="")):
+    _check_admin(x_admin_token)
+    if loop_watchdog is None:
+        raise HTTPException(status_code=404, detail="Bekçi kapalı (CHAT_LOOP_WATCHDOG=1)")
+    return {"stats": loop_watchdog.stats(), "stalls": loop_watchdog.recent(limit)}
+
+# Oda geçmişinde arama; parolalı odalar için X-Room-Password başlığı gerekir
+@app.get("/rooms/{room_id}/search")
+async def search_endpoint(request: Request, room_id: str, q: str, limit: int = 20, x_room_password: str = Header(default="")):
+    client = request.client.host if request.client else "-"
+    # Var olmayan oda adları kova biriktirmesin
+    room_key = room_id if room_id in chat_use_case.rooms else None
+    if not search_limiter.allow(client, room_key):
+        retry_after = max(1, math.ceil(search_limiter.retry_after(client, room_key)))
+        raise HTTPException(status_code=429, detail="Çok fazla arama isteği", headers={"Retry-After": str(retry_after)})
+    stats = search_limiter.stats()
+    if stats["tracked_connections"] + stats["tracked_rooms"] > SEARCH_LIMITER_MAX_TRACKED:
+        search_limiter.prune()
+    try:
+        entries = await chat_use_case.search_room(room_id, q, limit, password=x_room_password or None)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except HasherOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ChatError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    return {"room": room_id, "query": q, "messages": [entry.to_dict() for entry in entries]}
+
 # Static dosyaları serve et
 app.mount("/", StaticFiles(directory="static", html=True), name="static")
\ No newline at end of file
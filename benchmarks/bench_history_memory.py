@@ -0,0 +1,104 @@
+"""Oda geçmişinde mesaj başına bellek kullanımı
+
+Eski düzen (``Dict[str, List[Message]]``) ile ``MessageHistory`` halka
+tamponunu karşılaştırır. Çalıştırma:
+
+    python -m benchmarks.bench_history_memory --messages 100000
+"""
+import argparse
+import json
+import random
+import string
+import tracemalloc
+from datetime import datetime
+
+from domain.entities import Message, MessageType, User
+from domain.history import MessageHistory
+
+
+def _make_users(rooms: int, users_per_room: int):
+    return [
+        User(username=f"user{i}", connection_id=f"conn-{i}", joined_at=datetime.now())
+        for i in range(rooms * users_per_room)
+    ]
+
+
+def _make_messages(count: int, rooms: int, users_per_room: int, users):
+    rng = random.Random(42)
+    for i in range(count):
+        room = i % rooms
+        sender = users[room * users_per_room + rng.randrange(users_per_room)]
+        content = "".join(rng.choices(string.ascii_letters + " ", k=rng.randint(10, 80)))
+        yield Message(
+            content=content,
+            sender=sender,
+            message_type=MessageType.TEXT,
+            timestamp=datetime.now(),
+            room_id=f"room-{room}"
+        )
+
+
+def _traced(store, messages) -> int:
+    """Mesajlar izleme altında üretilip saklanır; kalan bellek ölçülür"""
+    tracemalloc.start()
+    baseline = tracemalloc.take_snapshot()
+    kept = store(messages)
+    current = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    del kept
+    return sum(stat.size_diff for stat in current.compare_to(baseline, "filename"))
+
+
+def store_list(messages):
+    rooms = {}
+    for message in messages:
+        if message.room_id not in rooms:
+            rooms[message.room_id] = []
+        rooms[message.room_id].append(message)
+    return rooms
+
+
+def store_ring(room_limit: int):
+    def store(messages):
+        history = MessageHistory(room_limit=room_limit, memory_budget=1 << 40)
+        for message in messages:
+            history.append(message)
+        return history
+    return store
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--rooms", type=int, default=20)
+    parser.add_argument("--users-per-room", type=int, default=10)
+    parser.add_argument("--room-limit", type=int, default=None,
+                        help="Halka tamponu kapasitesi (varsayılan: tüm mesajlar sığar)")
+    args = parser.parse_args()
+
+    users = _make_users(args.rooms, args.users_per_room)
+    room_limit = args.room_limit or args.messages
+
+    list_bytes = _traced(
+        store_list,
+        _make_messages(args.messages, args.rooms, args.users_per_room, users)
+    )
+    ring_bytes = _traced(
+        store_ring(room_limit),
+        _make_messages(args.messages, args.rooms, args.users_per_room, users)
+    )
+    retained = min(args.messages, room_limit * args.rooms)
+    print(json.dumps({
+        "messages": args.messages,
+        "rooms": args.rooms,
+        "room_limit": room_limit,
+        "ring_retained_messages": retained,
+        "list_total_bytes": list_bytes,
+        "ring_total_bytes": ring_bytes,
+        "list_bytes_per_message": round(list_bytes / args.messages, 1),
+        "ring_bytes_per_message": round(ring_bytes / retained, 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""WebSocket chat yolu için yük testi
+
+N istemciyi M odaya dağıtıp ``/ws/{room}/{username}`` üzerinden bağlar,
+istenen hızda mesaj gönderir ve uçtan uca teslim gecikmesini (p50/p99),
+saniyedeki mesaj sayısını ve sunucu RSS'ini JSON olarak raporlar.
+
+    # Yerel bir uvicorn başlatıp ölç
+    python -m benchmarks.ws_load --spawn --clients 200 --rooms 10 --rate 2 --duration 20
+
+    # Çalışan bir sunucuya karşı ölç
+    python -m benchmarks.ws_load --url ws://127.0.0.1:8000 --server-pid 12345
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+import websockets
+
+MARKER = "bench"
+
+
+def read_rss_kb(pid: int) -> Optional[int]:
+    """/proc üzerinden sürecin RSS değerini (kB) oku"""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Stats:
+    def __init__(self):
+        self.sent = 0
+        self.received = 0
+        self.latencies_ms: List[float] = []
+        self.errors = 0
+        self.throttled = 0
+        self.connect_failures = 0
+        self.recording = False
+
+    def observe(self, content: str) -> None:
+        # İçerik "kullanıcı: bench:<gönderim_ns>" biçimindedir
+        marker = content.find(MARKER + ":")
+        if marker < 0:
+            return
+        try:
+            sent_ns = int(content[marker + len(MARKER) + 1:])
+        except ValueError:
+            return
+        if self.recording:
+            self.received += 1
+            self.latencies_ms.append((time.perf_counter_ns() - sent_ns) / 1e6)
+
+
+def iter_frames(raw):
+    data = json.loads(raw)
+    if isinstance(data, list):
+        yield from data
+    else:
+        yield data
+
+
+async def run_client(url: str, room: str, username: str, rate: float,
+                     stop: asyncio.Event, ready: asyncio.Event, stats: Stats) -> None:
+    try:
+        async with websockets.connect(f"{url}/ws/{room}/{username}", max_queue=None) as ws:
+            await ws.send(json.dumps({"password": None}))
+
+            async def reader():
+                async for raw in ws:
+                    for frame in iter_frames(raw):
+                        if frame.get("type") == "message":
+                            stats.observe(frame.get("content", ""))
+                        elif frame.get("type") == "slow_down":
+                            # Hız sınırı mesajları sessizce düşürüyor; sonuç geçersiz
+                            stats.throttled += 1
+
+            reader_task = asyncio.ensure_future(reader())
+            await ready.wait()
+
+            interval = 1.0 / rate if rate > 0 else None
+            next_send = time.perf_counter()
+            while not stop.is_set():
+                if interval is None:
+                    await asyncio.sleep(0.1)
+                    continue
+                await ws.send(json.dumps({"message": f"{MARKER}:{time.perf_counter_ns()}"}))
+                if stats.recording:
+                    stats.sent += 1
+                next_send += interval
+                await asyncio.sleep(max(0.0, next_send - time.perf_counter()))
+
+            reader_task.cancel()
+    except (OSError, websockets.WebSocketException):
+        stats.connect_failures += 1
+
+
+async def run(args) -> dict:
+    stats = Stats()
+    stop = asyncio.Event()
+    ready = asyncio.Event()
+    clients = []
+    for i in range(args.clients):
+        room = f"bench-room-{i % args.rooms}"
+        clients.append(asyncio.ensure_future(
+            run_client(args.url, room, f"user{i}", args.rate, stop, ready, stats)
+        ))
+        if args.connect_batch and (i + 1) % args.connect_batch == 0:
+            await asyncio.sleep(0)
+
+    # Bağlantıların oturmasını bekle, ardından ısınma süresi
+    await asyncio.sleep(args.connect_wait)
+    ready.set()
+    await asyncio.sleep(args.warmup)
+
+    rss_samples = []
+    stats.recording = True
+    started = time.perf_counter()
+    while time.perf_counter() - started < args.duration:
+        if args.server_pid:
+            rss = read_rss_kb(args.server_pid)
+            if rss is not None:
+                rss_samples.append(rss)
+        await asyncio.sleep(min(1.0, args.duration))
+    elapsed = time.perf_counter() - started
+    stats.recording = False
+
+    stop.set()
+    await asyncio.gather(*clients, return_exceptions=True)
+
+    latencies = stats.latencies_ms
+    return {
+        "config": {
+            "clients": args.clients,
+            "rooms": args.rooms,
+            "rate_per_client": args.rate,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "batch_window_ms": args.batch_window_ms,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "commit": _git_commit(),
+        },
+        "sent": stats.sent,
+        "delivered": stats.received,
+        "connect_failures": stats.connect_failures,
+        "slow_down_notices": stats.throttled,
+        "sent_per_sec": stats.sent / elapsed,
+        "delivered_per_sec": stats.received / elapsed,
+        "latency_ms": {
+            "p50": percentile(latencies, 50),
+            "p90": percentile(latencies, 90),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies) if latencies else 0.0,
+        },
+        "server_rss_kb": {
+            "max": max(rss_samples) if rss_samples else None,
+            "last": rss_samples[-1] if rss_samples else None,
+        },
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Ölçüm yükü hız sınırına takılmasın; düşürülen mesajlar gecikmeyi iyi gösterir
+BENCH_ENV = {
+    "CHAT_RATE_CONNECTION": "0",
+    "CHAT_RATE_ROOM": "0",
+}
+
+
+def spawn_server(port: int, extra_env: dict) -> subprocess.Popen:
+    env = dict(os.environ, **BENCH_ENV)
+    env.update(extra_env)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env=env
+    )
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return process
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("uvicorn başlatılamadı")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="ws://127.0.0.1:8000")
+    parser.add_argument("--spawn", action="store_true", help="Yerel uvicorn başlat")
+    parser.add_argument("--server-pid", type=int, default=None, help="RSS ölçülecek sunucu PID'i")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--rooms", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=1.0, help="İstemci başına mesaj/sn")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--connect-wait", type=float, default=2.0)
+    parser.add_argument("--connect-batch", type=int, default=50)
+    parser.add_argument("--batch-window-ms", type=float, default=None,
+                        help="--spawn ile başlatılan sunucuda mikro toplama penceresi")
+    parser.add_argument("--output", default=None, help="JSON sonucu dosyaya yaz")
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn:
+        port = free_port()
+        extra_env = {}
+        if args.batch_window_ms is not None:
+            extra_env["CHAT_BATCH_WINDOW_MS"] = str(args.batch_window_ms)
+        server = spawn_server(port, extra_env)
+        args.url = f"ws://127.0.0.1:{port}"
+        args.server_pid = server.pid
+
+    try:
+        result = asyncio.run(run(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(output + "\n")
+    print(output)
+    if result["slow_down_notices"]:
+        sys.exit(f"Sunucu {result['slow_down_notices']} kez slow_down gönderdi; "
+                 "mesajlar hız sınırında düşürüldü, ölçüm geçersiz")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, Optional
+
+
+class BroadcastStats:
+    """Yayın başına gecikme istatistikleri"""
+
+    def __init__(self, window: int = 1024):
+        self.broadcasts = 0
+        self.frames_sent = 0
+        self.send_failures = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self.recent = deque(maxlen=window)
+
+    def record(self, sent: int, failed: int, latency: float) -> None:
+        self.broadcasts += 1
+        self.frames_sent += sent
+        self.send_failures += failed
+        self.last_latency = latency
+        if latency > self.max_latency:
+            self.max_latency = latency
+        self.recent.append(latency)
+
+    def percentile(self, p: float) -> float:
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def snapshot(self) -> dict:
+        return {
+            "broadcasts": self.broadcasts,
+            "frames_sent": self.frames_sent,
+            "send_failures": self.send_failures,
+            "last_latency_ms": self.last_latency * 1000,
+            "max_latency_ms": self.max_latency * 1000,
+            "p50_latency_ms": self.percentile(50) * 1000,
+            "p99_latency_ms": self.percentile(99) * 1000,
+        }
+
+
+class Broadcaster:
+    """Çerçeveyi bir kez serileştirip alıcıların giden kuyruklarına dağıtan motor
+
+    Gönderim her bağlantının kendi yazıcı görevinde yapılır (bkz.
+    ``domain.outbound.ConnectionWriter``); yavaş bir istemci yayını bekletmez.
+    """
+
+    def __init__(self, connections: Dict[str, any]):
+        self.connections = connections
+        self.stats = BroadcastStats()
+        # Yayın süresini dış bir ölçüm sistemine aktarmak için (örn. histogram)
+        self.latency_observer: Optional[Callable[[float], None]] = None
+
+    async def broadcast(self, connection_ids: Iterable[str], payload: dict, cacheable: bool = False) -> int:
+        """Payload'ı verilen bağlantılara gönder, kuyruğa alınan çerçeve sayısını döndür
+
+        Çerçeve her codec için bir kez kodlanır; ``cacheable`` sabit içerikli
+        çerçevelerin codec önbelleğinden alınmasını sağlar.
+        """
+        started = time.perf_counter()
+        frames = {}
+        sent = 0
+        failed = 0
+        for connection_id in connection_ids:
+            writer = self.connections.get(connection_id)
+            if writer is None:
+                continue
+            codec = writer.codec
+            frame = frames.get(codec.name)
+            if frame is None:
+                frame = frames[codec.name] = codec.encode(payload, cacheable)
+            if writer.offer(frame):
+                sent += 1
+            else:
+                failed += 1
+
+        latency = time.perf_counter() - started
+        self.stats.record(sent, failed, latency)
+        if self.latency_observer is not None:
+            self.latency_observer(latency)
+        return sent
+
+    async def send_to(self, connection_id: str, payload: dict, cacheable: bool = False) -> bool:
+        """Tek bir bağlantıya gönder"""
+        return await self.broadcast((connection_id,), payload, cacheable) == 1
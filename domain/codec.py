@@ -0,0 +1,268 @@
+import json
+import struct
+from collections import OrderedDict
+from typing import Dict, List, Union
+
+try:
+    import orjson
+except ImportError:  # opsiyonel hızlı JSON
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # opsiyonel C MessagePack; yoksa saf Python alt kümesi
+    msgpack = None
+
+Frame = Union[str, bytes]
+
+
+class JsonCodec:
+    """Varsayılan JSON metin protokolü
+
+    ``orjson`` kuruluysa onu kullanır. ``cacheable`` olarak işaretlenen,
+    sabit içerikli çerçeveler (sistem bildirimleri gibi) kodlanmış halleriyle
+    sınırlı bir önbellekte tutulur.
+    """
+    name = "json"
+    binary = False
+
+    def __init__(self, cache_size: int = 1024):
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[tuple, str]" = OrderedDict()
+
+    def encode(self, payload: dict, cacheable: bool = False) -> Frame:
+        key = _cache_key(payload) if cacheable else None
+        if key is not None:
+            frame = self._cache.get(key)
+            if frame is not None:
+                self._cache.move_to_end(key)
+                return frame
+
+        frame = self._dumps(payload)
+        if key is not None:
+            self._cache[key] = frame
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return frame
+
+    def join(self, frames: List[Frame]) -> Frame:
+        """Önceden kodlanmış çerçeveleri tek bir dizi çerçevesinde birleştir"""
+        return "[" + ",".join(frames) + "]"
+
+    def decode(self, data: Frame) -> dict:
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data)
+
+    @staticmethod
+    def _dumps(payload) -> str:
+        if orjson is not None:
+            return orjson.dumps(payload).decode()
+        return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+
+
+class MsgPackCodec(JsonCodec):
+    """MessagePack biçiminde kompakt ikili çerçeveler
+
+    ``msgpack`` kuruluysa C uzantısıyla kodlanır. Yedek saf Python alt kümesi
+    yalnızca uyumluluk içindir; JSON'dan yavaştır, performans için kullanılmamalı.
+    """
+    name = "msgpack"
+    binary = True
+
+    def join(self, frames: List[Frame]) -> Frame:
+        # Dizi başlığı + öğeler; öğeler zaten kodlanmış olduğundan yeniden paketlenmez
+        out = bytearray()
+        _pack_array_header(len(frames), out)
+        for frame in frames:
+            out += frame
+        return bytes(out)
+
+    def decode(self, data: Frame) -> dict:
+        if isinstance(data, str):
+            # Anlaşma öncesi ya da hata çerçeveleri metin olarak gelebilir
+            return super().decode(data)
+        if msgpack is not None:
+            return msgpack.unpackb(data, raw=False, strict_map_key=False)
+        value, offset = _unpack(data, 0)
+        if offset != len(data):
+            raise ValueError("Fazladan bayt")
+        return value
+
+    @staticmethod
+    def _dumps(payload) -> bytes:
+        if msgpack is not None:
+            return msgpack.packb(payload, use_bin_type=True)
+        out = bytearray()
+        _pack(payload, out)
+        return bytes(out)
+
+
+def _cache_key(payload: dict):
+    # Yalnızca içeriği tamamen dize olan küçük çerçeveler önbelleğe alınır
+    items = []
+    for key, value in payload.items():
+        if not isinstance(value, str) or len(value) > 256:
+            return None
+        items.append((key, value))
+    return tuple(items)
+
+
+def _pack(obj, out: bytearray) -> None:
+    if obj is None:
+        out.append(0xC0)
+    elif obj is True:
+        out.append(0xC3)
+    elif obj is False:
+        out.append(0xC2)
+    elif isinstance(obj, int):
+        _pack_int(obj, out)
+    elif isinstance(obj, float):
+        out.append(0xCB)
+        out += struct.pack(">d", obj)
+    elif isinstance(obj, str):
+        data = obj.encode("utf-8")
+        size = len(data)
+        if size < 32:
+            out.append(0xA0 | size)
+        elif size < 0x100:
+            out += struct.pack(">BB", 0xD9, size)
+        elif size < 0x10000:
+            out += struct.pack(">BH", 0xDA, size)
+        else:
+            out += struct.pack(">BI", 0xDB, size)
+        out += data
+    elif isinstance(obj, (bytes, bytearray)):
+        size = len(obj)
+        if size < 0x100:
+            out += struct.pack(">BB", 0xC4, size)
+        elif size < 0x10000:
+            out += struct.pack(">BH", 0xC5, size)
+        else:
+            out += struct.pack(">BI", 0xC6, size)
+        out += obj
+    elif isinstance(obj, (list, tuple)):
+        _pack_array_header(len(obj), out)
+        for item in obj:
+            _pack(item, out)
+    elif isinstance(obj, dict):
+        size = len(obj)
+        if size < 16:
+            out.append(0x80 | size)
+        elif size < 0x10000:
+            out += struct.pack(">BH", 0xDE, size)
+        else:
+            out += struct.pack(">BI", 0xDF, size)
+        for key, value in obj.items():
+            _pack(key, out)
+            _pack(value, out)
+    else:
+        raise TypeError(f"MessagePack ile kodlanamayan tip: {type(obj).__name__}")
+
+
+def _pack_array_header(size: int, out: bytearray) -> None:
+    if size < 16:
+        out.append(0x90 | size)
+    elif size < 0x10000:
+        out += struct.pack(">BH", 0xDC, size)
+    else:
+        out += struct.pack(">BI", 0xDD, size)
+
+
+def _pack_int(value: int, out: bytearray) -> None:
+    if 0 <= value < 0x80:
+        out.append(value)
+    elif -32 <= value < 0:
+        out.append(value & 0xFF)
+    elif 0 <= value < 0x100:
+        out += struct.pack(">BB", 0xCC, value)
+    elif 0 <= value < 0x10000:
+        out += struct.pack(">BH", 0xCD, value)
+    elif 0 <= value < 0x100000000:
+        out += struct.pack(">BI", 0xCE, value)
+    elif value >= 0:
+        out += struct.pack(">BQ", 0xCF, value)
+    elif value >= -0x80:
+        out += struct.pack(">Bb", 0xD0, value)
+    elif value >= -0x8000:
+        out += struct.pack(">Bh", 0xD1, value)
+    elif value >= -0x80000000:
+        out += struct.pack(">Bi", 0xD2, value)
+    else:
+        out += struct.pack(">Bq", 0xD3, value)
+
+
+_FIXED = {
+    0xCC: ">B", 0xCD: ">H", 0xCE: ">I", 0xCF: ">Q",
+    0xD0: ">b", 0xD1: ">h", 0xD2: ">i", 0xD3: ">q",
+    0xCA: ">f", 0xCB: ">d",
+}
+
+
+def _unpack(data: bytes, offset: int):
+    tag = data[offset]
+    offset += 1
+    if tag < 0x80:
+        return tag, offset
+    if tag >= 0xE0:
+        return tag - 0x100, offset
+    if 0xA0 <= tag <= 0xBF:
+        size = tag & 0x1F
+        return data[offset:offset + size].decode("utf-8"), offset + size
+    if 0x90 <= tag <= 0x9F:
+        return _unpack_array(data, offset, tag & 0x0F)
+    if 0x80 <= tag <= 0x8F:
+        return _unpack_map(data, offset, tag & 0x0F)
+    if tag == 0xC0:
+        return None, offset
+    if tag == 0xC2:
+        return False, offset
+    if tag == 0xC3:
+        return True, offset
+    if tag in _FIXED:
+        fmt = _FIXED[tag]
+        return struct.unpack_from(fmt, data, offset)[0], offset + struct.calcsize(fmt)
+    if tag in (0xD9, 0xDA, 0xDB, 0xC4, 0xC5, 0xC6):
+        fmt = {0xD9: ">B", 0xDA: ">H", 0xDB: ">I", 0xC4: ">B", 0xC5: ">H", 0xC6: ">I"}[tag]
+        size = struct.unpack_from(fmt, data, offset)[0]
+        offset += struct.calcsize(fmt)
+        raw = data[offset:offset + size]
+        value = raw.decode("utf-8") if tag in (0xD9, 0xDA, 0xDB) else bytes(raw)
+        return value, offset + size
+    if tag in (0xDC, 0xDD):
+        fmt = ">H" if tag == 0xDC else ">I"
+        size = struct.unpack_from(fmt, data, offset)[0]
+        return _unpack_array(data, offset + struct.calcsize(fmt), size)
+    if tag in (0xDE, 0xDF):
+        fmt = ">H" if tag == 0xDE else ">I"
+        size = struct.unpack_from(fmt, data, offset)[0]
+        return _unpack_map(data, offset + struct.calcsize(fmt), size)
+    raise ValueError(f"Desteklenmeyen MessagePack etiketi: {tag:#x}")
+
+
+def _unpack_array(data: bytes, offset: int, size: int):
+    items = []
+    for _ in range(size):
+        item, offset = _unpack(data, offset)
+        items.append(item)
+    return items, offset
+
+
+def _unpack_map(data: bytes, offset: int, size: int):
+    result = {}
+    for _ in range(size):
+        key, offset = _unpack(data, offset)
+        value, offset = _unpack(data, offset)
+        result[key] = value
+    return result, offset
+
+
+CODECS: Dict[str, JsonCodec] = {
+    JsonCodec.name: JsonCodec(),
+    MsgPackCodec.name: MsgPackCodec(),
+}
+
+
+def get_codec(name: str = None) -> JsonCodec:
+    """İstemcinin istediği codec'i döndür, bilinmiyorsa JSON"""
+    return CODECS.get(name or JsonCodec.name, CODECS[JsonCodec.name])
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Optional, Set
+from typing import Dict, Optional
 from datetime import datetime
 from enum import Enum
 
@@ -22,13 +22,27 @@ class Message:
     message_type: MessageType
     timestamp: datetime
     room_id: str
+    id: Optional[int] = None
+
+@dataclass
+class Session:
+    """Kullanıcı oturumu"""
+    session_id: str
+    user_id: str
+    username: str
+    room_id: str
+    created_at: datetime
+    expires_at: datetime
+    is_active: bool = True
 
 @dataclass
 class Room:
     """Chat odası"""
     room_id: str
+    # Parola hash'i (parola servisi yoksa düz metin)
     password: Optional[str]
-    users: Set[User]
+    # connection_id -> kullanıcı; katılma, ayrılma ve üyelik kontrolü O(1)
+    users: Dict[str, User]
     created_at: datetime
     is_active: bool = True
     
@@ -41,10 +55,14 @@ class Room:
             return True
         return self.password == password
     
+    def has_user(self, connection_id: str) -> bool:
+        return connection_id in self.users
+    
     def add_user(self, user: User) -> None:
-        self.users.add(user)
+        self.users[user.connection_id] = user
     
-    def remove_user(self, user: User) -> None:
-        self.users.discard(user)
+    def remove_user(self, connection_id: str) -> Optional[User]:
+        user = self.users.pop(connection_id, None)
         if self.user_count <= 1:
             self.is_active = False
+        return user
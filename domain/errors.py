@@ -0,0 +1,6 @@
+class ChatError(ValueError):
+    """İstemciye olduğu gibi gösterilebilen iş kuralı hatası (örn. yanlış şifre)
+
+    ValueError'dan türer; eski ``except ValueError`` blokları çalışmaya
+    devam eder. Diğer iç hataların metni istemciye gönderilmez.
+    """
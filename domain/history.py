@@ -0,0 +1,223 @@
+import sys
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+from .entities import Message, MessageType
+from .search import RoomIndex
+
+
+class HistoryEntry:
+    """Geçmişte tutulan kompakt mesaj kaydı"""
+    __slots__ = ("id", "username", "content", "timestamp", "message_type")
+
+    def __init__(self, id: int, username: str, content: str, timestamp: float, message_type: MessageType):
+        self.id = id
+        self.username = username
+        self.content = content
+        self.timestamp = timestamp
+        self.message_type = message_type
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "username": self.username,
+            "content": self.content,
+            "timestamp": self.timestamp,
+            "message_type": self.message_type.value,
+        }
+
+
+# Kayıt başına sabit maliyet (slot'lu nesne + deque hücresi yaklaşık)
+ENTRY_OVERHEAD = sys.getsizeof(HistoryEntry(0, "", "", 0.0, MessageType.TEXT)) + 8 + 24
+
+
+def _entry_size(content: str) -> int:
+    return ENTRY_OVERHEAD + sys.getsizeof(content)
+
+
+class RoomHistory:
+    """Tek bir odanın sınırlı halka tamponu"""
+
+    def __init__(self, limit: int, indexed: bool = False):
+        self.entries = deque(maxlen=limit)
+        self.next_id = 1
+        self.bytes = 0
+        # Arama indeksi tamponla birlikte büyür ve küçülür
+        self.index = RoomIndex() if indexed else None
+
+    def append(self, username: str, content: str, timestamp: float, message_type: MessageType) -> HistoryEntry:
+        if len(self.entries) == self.entries.maxlen:
+            evicted = self.entries[0]
+            self.bytes -= _entry_size(evicted.content)
+            if self.index is not None:
+                self.bytes += self.index.remove(evicted.id, evicted.content)
+        entry = HistoryEntry(self.next_id, sys.intern(username), content, timestamp, message_type)
+        self.next_id += 1
+        self.entries.append(entry)
+        self.bytes += _entry_size(content)
+        if self.index is not None:
+            # İndeks belleği de oda bütçesine sayılır
+            self.bytes += self.index.add(entry.id, content)
+        return entry
+
+    def before(self, before_id: Optional[int], limit: int) -> List[HistoryEntry]:
+        """``before_id``'den küçük son ``limit`` kaydı döndür (keyset sayfalama)
+
+        Kimlikler ardışık arttığı için sınır indeksi doğrudan hesaplanır;
+        tamponu taramaya gerek kalmaz (boşluk varsa ikili arama).
+        """
+        entries = self.entries
+        if not entries or limit <= 0:
+            return []
+        end = len(entries) if before_id is None else self._position(before_id)
+        start = max(0, end - limit)
+        return [entries[i] for i in range(start, end)]
+
+    def search(self, query: str, limit: int) -> List[HistoryEntry]:
+        """Sorgu terimlerini (önek olarak) içeren kayıtlar, en yenisi önce"""
+        if self.index is None or limit <= 0:
+            return []
+        entries = self.entries
+        results = []
+        for entry_id in self.index.search(query, limit):
+            position = self._position(entry_id)
+            if position < len(entries) and entries[position].id == entry_id:
+                results.append(entries[position])
+        return results
+
+    def _position(self, entry_id: int) -> int:
+        """Kimliği ``entry_id``'den küçük kayıt sayısı"""
+        entries = self.entries
+        if entries[-1].id - entries[0].id == len(entries) - 1:
+            return max(0, min(entry_id - entries[0].id, len(entries)))
+        # Kalıcı depodan yüklenen kimliklerde boşluk olabilir
+        return bisect_left(entries, entry_id, key=lambda entry: entry.id)
+
+    def export(self) -> list:
+        """Anlık görüntü için kompakt satırlar: [id, kullanıcı, içerik, zaman, tür]"""
+        return [
+            [entry.id, entry.username, entry.content, entry.timestamp, entry.message_type.value]
+            for entry in self.entries
+        ]
+
+    def restore(self, rows: list) -> None:
+        """``export`` çıktısını kimlikleri koruyarak geri yükle"""
+        for entry_id, username, content, timestamp, message_type in rows[-self.entries.maxlen:]:
+            self.next_id = entry_id
+            self.append(username, content, timestamp, MessageType(message_type))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class MessageHistory:
+    """Oda başına sınırlı, global bellek bütçeli mesaj geçmişi
+
+    Her oda en fazla ``room_limit`` kayıt tutar. Toplam tahmini boyut
+    ``memory_budget`` baytı aşarsa en uzun süredir dokunulmayan odalar atılır.
+    """
+
+    def __init__(self, room_limit: int = 500, memory_budget: int = 64 * 1024 * 1024, indexed: bool = False):
+        self.room_limit = room_limit
+        self.memory_budget = memory_budget
+        # Oda başına arama indeksi (bkz. domain.search)
+        self.indexed = indexed
+        self.rooms: "OrderedDict[str, RoomHistory]" = OrderedDict()
+        self.bytes = 0
+        self.evicted_rooms = 0
+
+    def append(self, message: Message) -> HistoryEntry:
+        """Mesajı odanın tamponuna ekle"""
+        return self.append_entry(
+            message.room_id,
+            message.sender.username,
+            message.content,
+            message.timestamp.timestamp(),
+            message.message_type
+        )
+
+    def append_entry(
+        self,
+        room_id: str,
+        username: str,
+        content: str,
+        timestamp: float,
+        message_type: MessageType
+    ) -> HistoryEntry:
+        """Ham alanlardan kayıt ekle (örn. başka bir düğümden gelen mesaj)"""
+        history = self.rooms.get(room_id)
+        if history is None:
+            history = RoomHistory(self.room_limit, self.indexed)
+            self.rooms[room_id] = history
+        else:
+            self.rooms.move_to_end(room_id)
+
+        before = history.bytes
+        entry = history.append(username, content, timestamp, message_type)
+        self.bytes += history.bytes - before
+        self._enforce_budget(keep=room_id)
+        return entry
+
+    def recent(self, room_id: str, limit: int) -> List[HistoryEntry]:
+        """Odanın son ``limit`` kaydını eskiden yeniye döndür"""
+        return self.before(room_id, None, limit)
+
+    def before(self, room_id: str, before_id: Optional[int], limit: int) -> List[HistoryEntry]:
+        """``before_id``'den eski en fazla ``limit`` kaydı eskiden yeniye döndür"""
+        history = self.rooms.get(room_id)
+        if history is None:
+            return []
+        self.rooms.move_to_end(room_id)
+        return history.before(before_id, limit)
+
+    def search(self, room_id: str, query: str, limit: int) -> List[HistoryEntry]:
+        history = self.rooms.get(room_id)
+        if history is None:
+            return []
+        return history.search(query, limit)
+
+    def export(self) -> Dict[str, list]:
+        return {room_id: history.export() for room_id, history in self.rooms.items()}
+
+    def restore(self, rooms: Dict[str, list]) -> None:
+        """Anlık görüntüden odaları geri yükle (bütçe kuralları geçerli)"""
+        for room_id, rows in rooms.items():
+            if not rows:
+                continue
+            history = RoomHistory(self.room_limit, self.indexed)
+            history.restore(rows)
+            self.drop_room(room_id)
+            self.rooms[room_id] = history
+            self.bytes += history.bytes
+            self._enforce_budget(keep=room_id)
+
+    def drop_room(self, room_id: str) -> None:
+        history = self.rooms.pop(room_id, None)
+        if history is not None:
+            self.bytes -= history.bytes
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "rooms": len(self.rooms),
+            "entries": sum(len(history) for history in self.rooms.values()),
+            "bytes": self.bytes,
+            "memory_budget": self.memory_budget,
+            "evicted_rooms": self.evicted_rooms,
+            "indexed_terms": sum(len(history.index) for history in self.rooms.values() if history.index is not None),
+            "index_bytes": sum(history.index.bytes for history in self.rooms.values() if history.index is not None),
+        }
+
+    def __contains__(self, room_id: str) -> bool:
+        return room_id in self.rooms
+
+    def get(self, room_id: str) -> Optional[RoomHistory]:
+        return self.rooms.get(room_id)
+
+    def _enforce_budget(self, keep: str) -> None:
+        while self.bytes > self.memory_budget and len(self.rooms) > 1:
+            room_id = next(iter(self.rooms))
+            if room_id == keep:
+                self.rooms.move_to_end(room_id)
+                continue
+            self.drop_room(room_id)
+            self.evicted_rooms += 1
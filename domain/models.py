@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime, timedelta
@@ -51,6 +51,13 @@ class Message(Base):
     # İlişkiler
     sender = relationship("User", back_populates="messages")
     room = relationship("Room", back_populates="messages")
+    
+    __table_args__ = (
+        # Geçmiş sayfalama (room_id, id) üzerinden keyset ile yapılır
+        Index("ix_messages_room_id_id", "room_id", "id"),
+        # Oda içinde zamana göre sıralama ve aralık sorguları
+        Index("ix_messages_room_id_timestamp", "room_id", "timestamp"),
+    )
 
 class RoomMembership(Base):
     __tablename__ = "room_memberships"
@@ -65,6 +72,13 @@ class RoomMembership(Base):
     # İlişkiler
     user = relationship("User", back_populates="room_memberships")
     room = relationship("Room", back_populates="memberships")
+    
+    __table_args__ = (
+        # Bir kullanıcı bir odaya tek kez üye olur; (user_id, ...) aramalarını da karşılar
+        Index("uq_room_memberships_user_room", "user_id", "room_id", unique=True),
+        # Odadan üyelere gidiş
+        Index("ix_room_memberships_room_id", "room_id"),
+    )
 
 class Session(Base):
     __tablename__ = "sessions"
@@ -72,8 +86,8 @@ class Session(Base):
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(String(100), unique=True, nullable=False)
     created_at = Column(DateTime, default=datetime.now)
-    expires_at = Column(DateTime, default=lambda: datetime.now() + timedelta(hours=24))
-    is_active = Column(Boolean, default=True)
+    expires_at = Column(DateTime, default=lambda: datetime.now() + timedelta(hours=24), index=True)
+    is_active = Column(Boolean, default=True, index=True)
     
     # Foreign Keys
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -81,3 +95,6 @@ class Session(Base):
     
     # İlişkiler
     user = relationship("User", back_populates="sessions")
+    
+    def is_expired(self) -> bool:
+        return self.expires_at is not None and self.expires_at < datetime.now()
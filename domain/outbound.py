@@ -0,0 +1,175 @@
+import asyncio
+from collections import deque
+from enum import Enum
+from typing import Callable, Optional, Tuple
+from .codec import Frame, JsonCodec, get_codec
+
+
+class OverflowPolicy(Enum):
+    """Kuyruk dolduğunda uygulanacak politika"""
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+    DISCONNECT = "disconnect"
+
+
+class ConnectionWriter:
+    """Bağlantıya özel sınırlı giden kuyruk ve yazıcı görevi
+
+    ``batch_window`` sıfırdan büyükse mikro toplama açıktır: ilk çerçeveden
+    sonra en fazla bu kadar saniye (ya da ``max_batch`` çerçeve birikene
+    kadar) beklenir ve biriken çerçeveler codec'in dizi çerçevesiyle tek
+    WebSocket mesajı olarak gönderilir.
+    """
+
+    def __init__(
+        self,
+        connection_id: str,
+        websocket,
+        max_queue: int = 256,
+        policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        send_timeout: float = 2.0,
+        on_failure: Optional[Callable[[str], None]] = None,
+        codec: Optional[JsonCodec] = None,
+        batch_window: float = 0.0,
+        max_batch: int = 32,
+    ):
+        self.connection_id = connection_id
+        self.websocket = websocket
+        self.codec = codec or get_codec()
+        self.max_queue = max_queue
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.on_failure = on_failure
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.queue = deque()
+        self.sent = 0
+        self.batches = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.closed = False
+        self.closing = False
+        self.close_code = 1000
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def depth(self) -> int:
+        return len(self.queue)
+
+    def start(self) -> None:
+        """Yazıcı görevini başlat"""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    def offer(self, frame: Frame) -> bool:
+        """Çerçeveyi beklemeden kuyruğa ekle, kabul edilmezse False döndür"""
+        if self.closed or self.closing:
+            return False
+
+        if len(self.queue) >= self.max_queue:
+            if self.policy is OverflowPolicy.DROP_NEWEST:
+                self.dropped += 1
+                return False
+            if self.policy is OverflowPolicy.DISCONNECT:
+                self._fail()
+                return False
+            self.queue.popleft()
+            self.dropped += 1
+
+        self.queue.append(frame)
+        if len(self.queue) > self.max_depth:
+            self.max_depth = len(self.queue)
+        self._wakeup.set()
+        return True
+
+    def finish(self, code: int = 1000) -> None:
+        """Yeni çerçeve kabul etme, bekleyenleri gönderip soketi kapat"""
+        self.closing = True
+        self.close_code = code
+        self._wakeup.set()
+
+    def close(self) -> None:
+        """Yazıcıyı durdur ve bekleyen çerçeveleri bırak"""
+        self.closed = True
+        self.queue.clear()
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "depth": len(self.queue),
+            "max_depth": self.max_depth,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "policy": self.policy.value,
+            "codec": self.codec.name,
+        }
+
+    async def _run(self) -> None:
+        try:
+            while not self.closed:
+                if not self.queue:
+                    if self.closing:
+                        self.closed = True
+                        async with asyncio.timeout(self.send_timeout):
+                            await self.websocket.close(code=self.close_code)
+                        return
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                if self.batch_window > 0:
+                    await self._collect()
+                    if not self.queue:
+                        continue
+                frame, count = self._next_frame()
+                # wait_for yerine timeout: iptal, gönderimle yarışınca kaybolmaz
+                async with asyncio.timeout(self.send_timeout):
+                    if isinstance(frame, bytes):
+                        await self.websocket.send_bytes(frame)
+                    else:
+                        await self.websocket.send_text(frame)
+                self.sent += count
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._fail()
+
+    async def _collect(self) -> None:
+        # Pencere dolana ya da parti tamamlanana kadar yeni çerçeve bekle
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.batch_window
+        while len(self.queue) < self.max_batch and not self.closing:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            self._wakeup.clear()
+            try:
+                async with asyncio.timeout(remaining):
+                    await self._wakeup.wait()
+            except TimeoutError:
+                return
+
+    def _next_frame(self) -> Tuple[Frame, int]:
+        frame = self.queue.popleft()
+        if self.batch_window <= 0 or not self.queue:
+            return frame, 1
+
+        # Yalnızca aynı türdeki (metin/ikili) ardışık çerçeveler birleştirilir
+        kind = type(frame)
+        frames = [frame]
+        while self.queue and len(frames) < self.max_batch and type(self.queue[0]) is kind:
+            frames.append(self.queue.popleft())
+        if len(frames) == 1:
+            return frame, 1
+        self.batches += 1
+        return self.codec.join(frames), len(frames)
+
+    def _fail(self) -> None:
+        # Yavaş ya da kopmuş istemci: bağlantıyı sahibine bildir
+        if self.closed:
+            return
+        self.close()
+        if self.on_failure:
+            self.on_failure(self.connection_id)
@@ -0,0 +1,138 @@
+import time
+from typing import Callable, Dict, Optional
+
+
+class TokenBucket:
+    """Monotonik saatle tembel dolan token kovası (zamanlayıcı kullanmaz)"""
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def refill(self, now: float) -> float:
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+        return self.tokens
+
+    def retry_after(self, cost: float = 1.0) -> float:
+        """Bir sonraki ``cost`` token için beklenecek süre (saniye)"""
+        missing = cost - self.tokens
+        return missing / self.rate if missing > 0 else 0.0
+
+
+class RateLimiter:
+    """Bağlantı ve oda başına token kovalarıyla gelen çerçeve sınırlayıcı
+
+    ``rate`` saniyede dolan token, ``burst`` kovanın kapasitesidir; ``rate``
+    sıfırsa o seviye sınırsızdır. Bir çerçeve yalnızca her iki kovada da
+    token varsa kabul edilir ve ancak o zaman token harcanır; reddedilen
+    mesaj odanın kotasını tüketmez.
+    """
+
+    def __init__(
+        self,
+        connection_rate: float = 10.0,
+        connection_burst: float = 20.0,
+        room_rate: float = 200.0,
+        room_burst: float = 400.0,
+        notice_interval: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.connection_rate = connection_rate
+        self.connection_burst = connection_burst
+        self.room_rate = room_rate
+        self.room_burst = room_burst
+        self.notice_interval = notice_interval
+        self.clock = clock
+        self._connections: Dict[str, TokenBucket] = {}
+        self._rooms: Dict[str, TokenBucket] = {}
+        self._last_notice: Dict[str, float] = {}
+        self.allowed = 0
+        self.rejected_connection = 0
+        self.rejected_room = 0
+        self.notices = 0
+
+    def allow(self, connection_id: str, room_id: Optional[str] = None) -> bool:
+        """Çerçeveyi kabul et ya da reddet; ``room_id`` verilmezse yalnızca bağlantı kovası"""
+        now = self.clock()
+        connection = self._bucket(self._connections, connection_id, self.connection_rate, self.connection_burst, now)
+        if connection is not None and connection.refill(now) < 1:
+            self.rejected_connection += 1
+            return False
+
+        room = None
+        if room_id is not None:
+            room = self._bucket(self._rooms, room_id, self.room_rate, self.room_burst, now)
+            if room is not None and room.refill(now) < 1:
+                self.rejected_room += 1
+                return False
+
+        if connection is not None:
+            connection.tokens -= 1
+        if room is not None:
+            room.tokens -= 1
+        self.allowed += 1
+        return True
+
+    def retry_after(self, connection_id: str, room_id: Optional[str] = None) -> float:
+        """Bağlantının yeniden gönderebilmesi için tahmini bekleme (saniye)"""
+        waits = [0.0]
+        for buckets, key in ((self._connections, connection_id), (self._rooms, room_id)):
+            bucket = buckets.get(key) if key is not None else None
+            if bucket is not None:
+                waits.append(bucket.retry_after())
+        return max(waits)
+
+    def should_notify(self, connection_id: str) -> bool:
+        """"Yavaşla" bildirimini bağlantı başına ``notice_interval``'da bire indir"""
+        if self.notice_interval < 0:
+            return False
+        now = self.clock()
+        last = self._last_notice.get(connection_id)
+        if last is not None and now - last < self.notice_interval:
+            return False
+        self._last_notice[connection_id] = now
+        self.notices += 1
+        return True
+
+    def forget_connection(self, connection_id: str) -> None:
+        self._connections.pop(connection_id, None)
+        self._last_notice.pop(connection_id, None)
+
+    def forget_room(self, room_id: str) -> None:
+        self._rooms.pop(room_id, None)
+
+    def prune(self) -> int:
+        """Tamamen dolmuş kovaları at (kayıpsız; yeniden oluşturulan kova da dolu başlar)"""
+        now = self.clock()
+        removed = 0
+        for buckets in (self._connections, self._rooms):
+            for key in [key for key, bucket in buckets.items() if bucket.refill(now) >= bucket.capacity]:
+                del buckets[key]
+                self._last_notice.pop(key, None)
+                removed += 1
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "allowed": self.allowed,
+            "rejected_connection": self.rejected_connection,
+            "rejected_room": self.rejected_room,
+            "notices": self.notices,
+            "tracked_connections": len(self._connections),
+            "tracked_rooms": len(self._rooms),
+        }
+
+    @staticmethod
+    def _bucket(buckets: Dict[str, TokenBucket], key: str, rate: float, burst: float, now: float) -> Optional[TokenBucket]:
+        if rate <= 0:
+            return None
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = TokenBucket(rate, max(1.0, burst), now)
+        return bucket
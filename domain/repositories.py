@@ -0,0 +1,72 @@
+from typing import Iterable, List, Optional, Protocol, Tuple
+from .entities import User, Room, Message
+
+
+class UserRepository(Protocol):
+    async def save_user(self, user: User) -> None: ...
+
+    async def get_user(self, connection_id: str) -> Optional[User]: ...
+
+    async def delete_user(self, connection_id: str) -> None: ...
+
+
+class RoomRepository(Protocol):
+    async def save_room(self, room: Room) -> None: ...
+
+    async def get_room(self, room_id: str) -> Optional[Room]: ...
+
+    async def delete_room(self, room_id: str) -> None: ...
+
+    async def add_user_to_room(self, room_id: str, user: User) -> None: ...
+
+    async def remove_user_from_room(self, room_id: str, connection_id: str) -> None: ...
+
+    async def add_memberships(self, memberships: Iterable[Tuple[str, User]]) -> None: ...
+
+    async def remove_memberships(self, memberships: Iterable[Tuple[str, str]]) -> None: ...
+
+    async def drop_memberships_for_connections(self, connection_ids: Iterable[str]) -> None: ...
+
+
+class MessageRepository(Protocol):
+    async def save_message(self, message: Message) -> None: ...
+
+    async def get_room_messages(self, room_id: str, limit: int = 50) -> List[Message]: ...
+
+
+class HistoryStore(Protocol):
+    """ChatUseCase'in bellekteki tamponun gerisi için kullandığı kalıcı geçmiş
+
+    Kimlikler tamponla ortaktır; sayfalama kimlik üzerinden yapılır.
+    """
+    def enqueue(self, message: Message) -> bool: ...
+
+    async def get_room_messages(self, room_id: str, limit: int = 50) -> List[Message]: ...
+
+    async def get_room_messages_before(self, room_id: str, before_id: Optional[int], limit: int = 50) -> List[Message]: ...
+
+    async def has_messages_before(self, room_id: str, before_id: int) -> bool: ...
+
+
+class UnitOfWork(Protocol):
+    """Bir sohbet işleminin tüm yazımlarını tek transaction'da toplayan birim
+
+    Kullanım::
+
+        async with uow_factory() as uow:
+            await uow.rooms.add_user_to_room(room_id, user)
+            await uow.commit()
+
+    ``commit`` çağrılmadan bloktan çıkılırsa yazımlar geri alınır.
+    """
+    users: UserRepository
+    rooms: RoomRepository
+    messages: MessageRepository
+
+    async def __aenter__(self) -> "UnitOfWork": ...
+
+    async def __aexit__(self, exc_type, exc, tb) -> None: ...
+
+    async def commit(self) -> None: ...
+
+    async def rollback(self) -> None: ...
@@ -0,0 +1,100 @@
+import re
+import sys
+from bisect import bisect_left, insort
+from collections import deque
+from typing import Dict, List, Optional, Set
+
+# Çok uzun "kelimeler" (örn. base64) sözlüğü şişirmesin
+MAX_TERM_LENGTH = 40
+MAX_QUERY_TERMS = 8
+
+# Bellek bütçesi için yaklaşık maliyetler: terim başına boş deque + sözlük
+# girdisi + sıralı listede bir işaretçi; kimlik başına deque hücresi (kimlik
+# nesnesi geçmiş kaydıyla paylaşılır)
+TERM_OVERHEAD = sys.getsizeof(deque()) + 48 + 8
+POSTING_SIZE = 8
+
+_WORD = re.compile(r"\w+")
+# str.lower() "I"yı "i"ye, "İ"yi "i̇"ye (noktalı birleşik) çevirir; Türkçede yanlış
+_TURKISH_UPPER = str.maketrans({"I": "ı", "İ": "i"})
+
+
+def fold(text: str) -> str:
+    """Türkçe kurallarıyla küçük harfe çevir (I→ı, İ→i)"""
+    return text.translate(_TURKISH_UPPER).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    return [term[:MAX_TERM_LENGTH] for term in _WORD.findall(fold(text))]
+
+
+class RoomIndex:
+    """Bir odanın geçmiş tamponu için artımlı ters indeks
+
+    Her terim için mesaj kimlikleri artan sırada tutulur; tampondan en eski
+    kayıt düştüğünde kimliği her terim listesinin başındadır ve O(1) ile
+    silinir. Sözlük sıralı tutulduğundan önek sorguları ikili arama ile
+    bulunur. İndeks tampondan büyümez; sorgu maliyeti tampon boyutuyla
+    sınırlıdır. ``bytes`` tahmini bellek kullanımıdır; ``add``/``remove``
+    değişimi döndürür.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, deque] = {}
+        self.terms: List[str] = []
+        self.bytes = 0
+
+    def add(self, entry_id: int, text: str) -> int:
+        before = self.bytes
+        for term in set(tokenize(text)):
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = deque()
+                insort(self.terms, term)
+                self.bytes += TERM_OVERHEAD + sys.getsizeof(term)
+            posting.append(entry_id)
+            self.bytes += POSTING_SIZE
+        return self.bytes - before
+
+    def remove(self, entry_id: int, text: str) -> int:
+        before = self.bytes
+        for term in set(tokenize(text)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            if posting[0] == entry_id:
+                posting.popleft()
+            elif entry_id in posting:
+                posting.remove(entry_id)
+            else:
+                continue
+            self.bytes -= POSTING_SIZE
+            if not posting:
+                del self.postings[term]
+                del self.terms[bisect_left(self.terms, term)]
+                self.bytes -= TERM_OVERHEAD + sys.getsizeof(term)
+        return self.bytes - before
+
+    def match(self, prefix: str) -> Set[int]:
+        """``prefix`` ile başlayan tüm terimlerin kimlikleri"""
+        ids: Set[int] = set()
+        position = bisect_left(self.terms, prefix)
+        while position < len(self.terms) and self.terms[position].startswith(prefix):
+            ids.update(self.postings[self.terms[position]])
+            position += 1
+        return ids
+
+    def search(self, query: str, limit: int) -> List[int]:
+        """Sorgudaki tüm terimleri (önek olarak) içeren kimlikler, en yenisi önce"""
+        terms = set(tokenize(query)[:MAX_QUERY_TERMS])
+        result: Optional[Set[int]] = None
+        # Uzun önekler daha seçicidir; kesişim erken boşalır
+        for term in sorted(terms, key=len, reverse=True):
+            ids = self.match(term)
+            result = ids if result is None else result & ids
+            if not result:
+                return []
+        return sorted(result, reverse=True)[:limit] if result else []
+
+    def __len__(self) -> int:
+        return len(self.terms)
@@ -1,80 +1,536 @@
+import asyncio
 import json
-from typing import Optional, List, Dict
+import logging
+import random
+import time
+import uuid
+from typing import Optional, Dict, List, Set
+from dataclasses import replace
 from datetime import datetime
 from .entities import User, Room, Message, MessageType
+from .broadcast import Broadcaster
+from .outbound import ConnectionWriter, OverflowPolicy
+from .history import HistoryEntry, MessageHistory
+from .codec import get_codec
+from .errors import ChatError
+
+logger = logging.getLogger(__name__)
+
+# Arama sorgusu bu uzunlukta kesilir
+MAX_QUERY_LENGTH = 200
 
 class ChatUseCase:
     """Chat iş mantığı"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        send_timeout: float = 2.0,
+        max_queue: int = 256,
+        overflow_policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        history_limit: int = 500,
+        history_budget: int = 64 * 1024 * 1024,
+        history_replay: int = 50,
+        history_page_limit: int = 200,
+        search_index: bool = True,
+        batch_window: float = 0.0,
+        max_batch: int = 32,
+        message_sink=None,
+        history_store=None,
+        uow_factory=None,
+        backplane=None,
+        password_hasher=None,
+        claim_ttl: int = 86400
+    ):
         self.users: Dict[str, User] = {}
         self.rooms: Dict[str, Room] = {}
-        self.messages: Dict[str, List[Message]] = {}
-        self.connections: Dict[str, any] = {}
+        # Ters indeks: bağlantının bulunduğu odalar
+        self.connection_rooms: Dict[str, Set[str]] = {}
+        # search_index: oda geçmişi için artımlı arama indeksi (bkz. domain.search)
+        self.messages = MessageHistory(room_limit=history_limit, memory_budget=history_budget, indexed=search_index)
+        self.history_replay = history_replay
+        self.history_page_limit = history_page_limit
+        # Kalıcı saklama için enqueue(message) sunan nesne (örn. write-behind yazıcı)
+        self.message_sink = message_sink
+        # Bellekteki tampondan eski sayfalar için kalıcı depo (örn. LogMessageRepository,
+        # bkz. domain.repositories.HistoryStore); kimlikler tamponla ortaktır.
+        # Kayıtlar oda oluşturulma anıyla anahtarlanır (bkz. _history_key)
+        self.history_store = history_store
+        # Katılma/ayrılma yazımlarını tek transaction'da toplayan unit of work
+        # üreticisi (bkz. domain.repositories.UnitOfWork); None = kalıcılık yok
+        self.uow_factory = uow_factory
+        self.persistence_failures = 0
+        self.connections: Dict[str, ConnectionWriter] = {}
+        self.send_timeout = send_timeout
+        self.max_queue = max_queue
+        self.overflow_policy = overflow_policy
+        # Alıcı başına mikro toplama (0 = kapalı)
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.broadcaster = Broadcaster(self.connections)
+        # Odaları süreçler arasında yayan omurga (bkz. infrastructure.backplane)
+        self.backplane = backplane
+        self.node_id = uuid.uuid4().hex
+        # Odanın düğümler arası kimliği (bkz. _claim_room); yalnızca aynı
+        # kuşaktaki odalar birbirinin trafiğini alır
+        self.room_generations: Dict[str, str] = {}
+        self.claim_ttl = claim_ttl
+        # async hash(parola)/verify(parola, hash) sunan nesne; None ise oda
+        # parolaları düz metin karşılaştırılır
+        self.password_hasher = password_hasher
+        # HTTP aramasının parola doğrulamaları ayrı (küçük) bir havuzda;
+        # katılmaların hash kapasitesini tüketmesin. None = password_hasher
+        self.search_password_hasher = None
+        self.messages_received = 0
+        # Kapanış sırasında yeni bağlantı alınmaz, ayrılma bildirimleri yapılmaz
+        self.draining = False
+        self.evicted_connections = 0
     
-    def add_connection(self, connection_id: str, websocket) -> None:
-        """WebSocket bağlantısını ekle"""
-        self.connections[connection_id] = websocket
+    def add_connection(self, connection_id: str, websocket, codec: Optional[str] = None) -> None:
+        """WebSocket bağlantısını ekle ve yazıcı görevini başlat"""
+        writer = ConnectionWriter(
+            connection_id,
+            websocket,
+            max_queue=self.max_queue,
+            policy=self.overflow_policy,
+            send_timeout=self.send_timeout,
+            on_failure=self._evict_connection,
+            codec=get_codec(codec),
+            batch_window=self.batch_window,
+            max_batch=self.max_batch
+        )
+        self.connections[connection_id] = writer
+        writer.start()
     
     def remove_connection(self, connection_id: str) -> None:
         """WebSocket bağlantısını kaldır"""
-        self.connections.pop(connection_id, None)
+        writer = self.connections.pop(connection_id, None)
+        if writer:
+            writer.close()
+    
+    def connection_stats(self) -> Dict[str, dict]:
+        """Bağlantı başına kuyruk derinliği ve sayaçlar"""
+        return {connection_id: writer.stats() for connection_id, writer in self.connections.items()}
+    
+    def _evict_connection(self, connection_id: str) -> None:
+        """Yavaş ya da kopmuş bağlantıyı çıkar ve soketi kapat"""
+        writer = self.connections.pop(connection_id, None)
+        if writer:
+            self.evicted_connections += 1
+            asyncio.ensure_future(self._close_quietly(writer.websocket))
+    
+    async def _close_quietly(self, websocket) -> None:
+        try:
+            await asyncio.wait_for(websocket.close(), self.send_timeout)
+        except Exception:
+            pass
+    
+    async def send_to_connection(self, connection_id: str, payload: dict) -> bool:
+        """Bağlantının giden kuyruğuna çerçeve ekle"""
+        return await self.broadcaster.send_to(connection_id, payload)
     
     async def join_room(self, username: str, connection_id: str, room_id: str, password: Optional[str] = None) -> Room:
         """Kullanıcıyı odaya katıldır"""
-        # Kullanıcı oluştur
-        user = User(
-            username=username,
-            connection_id=connection_id,
-            joined_at=datetime.now()
-        )
-        self.users[connection_id] = user
+        # Aynı bağlantı birden fazla odada aynı kullanıcıyla bulunur
+        user = self.users.get(connection_id)
+        if user is None:
+            user = User(
+                username=username,
+                connection_id=connection_id,
+                joined_at=datetime.now()
+            )
         
         # Oda kontrolü
         room = self.rooms.get(room_id)
+        created = False
+        verified = False
+        made_here = False
         if not room:
-            room = Room(
-                room_id=room_id,
-                password=password if password and password.strip() else None,
-                users=set(),
-                created_at=datetime.now()
+            existing = await self._lookup_claim(room_id)
+            if existing is not None:
+                # Oda başka bir düğümde kurulu: parolası hash'lenmez, yerel kopya
+                # kurulmadan önce doğrulanır
+                if not await self._password_matches(existing["password"], password):
+                    raise ChatError("Yanlış şifre!")
+                stored_password = existing["password"]
+            else:
+                stored_password = password if password and password.strip() else None
+                if stored_password and self.password_hasher is not None:
+                    stored_password = await self.password_hasher.hash(stored_password)
+            generation, stored_password, created_at, claimed = await self._claim_room(
+                room_id, stored_password, datetime.now(), existing
             )
-            self.rooms[room_id] = room
+            # Doğrulanan kayıt hâlâ geçerli olan kayıtsa parola yeniden sorulmaz
+            verified = existing is not None and generation == existing["generation"]
+            # Beklerken oda başka bir katılımla oluşturulmuş olabilir
+            room = self.rooms.get(room_id)
+            if not room:
+                room = Room(
+                    room_id=room_id,
+                    password=stored_password,
+                    users={},
+                    created_at=created_at
+                )
+                self.rooms[room_id] = room
+                self.room_generations[room_id] = generation
+                # Oda başka bir düğümde zaten varsa onun parolası geçerli
+                created = claimed
+                made_here = True
+                await self._attach_room(room_id)
         
-        # Şifre kontrolü
-        if not room.can_join(password):
-            raise ValueError("Yanlış şifre!")
+        # Şifre kontrolü (odayı oluşturanın parolası zaten hash'lendi; başka
+        # düğümdeki oda yukarıda doğrulandı)
+        if not created and not (verified and self.room_generations.get(room_id) == generation) \
+                and not await self._check_password(room, password):
+            # Yalnızca bu katılımın (kayıt yarışı yüzünden) açtığı boş kopya kapatılır;
+            # anlık görüntüden gelen ya da başka bir katılımın açtığı oda beklemede kalır
+            if made_here and room.user_count == 0:
+                await self._close_room(room_id)
+            raise ChatError("Yanlış şifre!")
         
         # Kullanıcıyı odaya ekle
+        self.users[connection_id] = user
         room.add_user(user)
+        self.connection_rooms.setdefault(connection_id, set()).add(room_id)
+        await self._cluster_members(room)
         
         # Diğer kullanıcılara bildir
         await self._notify_room(room, f"{username} odaya katıldı!", exclude_user=user)
         
+        # Oda ve üyelik tek transaction'da
+        writes = [lambda uow: uow.rooms.add_user_to_room(room_id, user)]
+        if created:
+            writes.insert(0, lambda uow: uow.rooms.save_room(room))
+        await self._persist(writes)
+        
         return room
     
+    async def _check_password(self, room: Room, password: Optional[str], hasher=None) -> bool:
+        return await self._password_matches(room.password, password, hasher)
+    
+    async def _password_matches(self, stored: Optional[str], password: Optional[str], hasher=None) -> bool:
+        hasher = hasher or self.password_hasher
+        if not stored:
+            return True
+        if hasher is None:
+            return stored == password
+        # bcrypt döngüyü bloklamasın diye havuzda doğrulanır
+        return bool(password) and await hasher.verify(password, stored)
+    
     async def leave_room(self, connection_id: str, room_id: str) -> None:
         """Kullanıcıyı odadan çıkar"""
-        user = self.users.get(connection_id)
+        writes = []
+        await self._leave(connection_id, room_id, writes)
+        await self._persist(writes)
+    
+    async def _leave(self, connection_id: str, room_id: str, writes: list) -> None:
         room = self.rooms.get(room_id)
+        user = room.remove_user(connection_id) if room else None
         
-        if user and room:
-            room.remove_user(user)
-            self.users.pop(connection_id, None)
-            
+        if user:
+            self._forget_membership(connection_id, room_id)
+            if self.draining:
+                # Üyelik anlık görüntüde; yeniden bağlanınca geri gelecekler.
+                # Veritabanındaki üyelikler drain() sonunda toplu silinir
+                return
+            writes.append(lambda uow: uow.rooms.remove_user_from_room(room_id, connection_id))
+
+            # Kapanma kararı tüm düğümlerdeki üyelere göre verilir; bu düğümün
+            # son üyesi ayrılsa da oda diğer düğümlerde sürebilir
+            room.is_active = await self._cluster_members(room) > 1
             if room.is_active:
                 await self._notify_room(room, f"{user.username} odadan ayrıldı!")
+                if room.user_count == 0:
+                    await self._close_room(room_id)
             else:
-                await self._notify_room(room, "Odada yeterli kişi kalmadığı için oda kapatıldı.")
-                self.rooms.pop(room_id, None)
+                # Diğer düğümler de duyuruyla birlikte odayı kapatır
+                await self._notify_room(room, "Odada yeterli kişi kalmadığı için oda kapatıldı.", cacheable=True, closing=True)
+                await self._shut_room(room, writes)
+    
+    async def _shut_room(self, room: Room, writes: list) -> None:
+        """Odayı bu düğümde kapat; kalan üyelerin üyelikleri de silinir"""
+        remaining = [(room.room_id, member) for member in room.users]
+        for _, member in remaining:
+            self._forget_membership(member, room.room_id)
+        room.is_active = False
+        writes.append(lambda uow: uow.rooms.save_room(room))
+        writes.append(lambda uow: uow.rooms.remove_memberships(remaining))
+        await self._close_room(room.room_id)
+    
+    async def _close_room(self, room_id: str) -> None:
+        """Odayı kapat; geçmişi de silinir, aynı adla kurulan yeni oda görmez"""
+        self.rooms.pop(room_id, None)
+        self.messages.drop_room(room_id)
+        await self._detach_room(room_id)
+        await self._release_room_claim(room_id)
+    
+    async def leave_all_rooms(self, connection_id: str) -> None:
+        """Bağlantıyı bulunduğu tüm odalardan çıkar (tek transaction)"""
+        writes = []
+        for room_id in list(self.connection_rooms.get(connection_id, ())):
+            await self._leave(connection_id, room_id, writes)
+        await self._persist(writes)
+    
+    async def _persist(self, writes: list) -> None:
+        """Bir sohbet işleminin yazımlarını tek unit of work içinde uygula
+        
+        Kalıcılık hatası sohbeti durdurmaz; sayılır ve loglanır.
+        """
+        if self.uow_factory is None or not writes:
+            return
+        try:
+            async with self.uow_factory() as uow:
+                for write in writes:
+                    await write(uow)
+                await uow.commit()
+        except Exception:
+            self.persistence_failures += 1
+            logger.exception("Sohbet işlemi kalıcılaştırılamadı (%d yazım)", len(writes))
+    
+    def rooms_for(self, connection_id: str) -> Set[str]:
+        """Bağlantının bulunduğu odalar"""
+        return self.connection_rooms.get(connection_id, set())
+    
+    def _forget_membership(self, connection_id: str, room_id: str) -> bool:
+        """Ters indeksten sil; bağlantı hiçbir odada kalmadıysa True"""
+        rooms = self.connection_rooms.get(connection_id)
+        if rooms is not None:
+            rooms.discard(room_id)
+            if rooms:
+                return False
+            del self.connection_rooms[connection_id]
+        self.users.pop(connection_id, None)
+        return True
+    
+    async def release_room(self, room_id: str, payload: dict) -> int:
+        """Odayı bu düğümden bırak (örn. başka bir shard'a taşındığında)
+        
+        Üyelere ``payload`` gönderilir, bağlantıları bekleyen çerçeveler
+        gönderildikten sonra kapatılır; odanın üyeleri ve geçmişi silinir.
+        """
+        room = self.rooms.pop(room_id, None)
+        if room is None:
+            return 0
+        
+        members = list(room.users)
+        await self.broadcaster.broadcast(members, payload)
+        for connection_id in members:
+            if not self._forget_membership(connection_id, room_id):
+                continue
+            writer = self.connections.get(connection_id)
+            if writer is not None:
+                writer.finish()
+        self.messages.drop_room(room_id)
+        await self._detach_room(room_id)
+        await self._release_room_claim(room_id)
+        return len(members)
+    
+    async def drain(self, reconnect_after_ms: int = 1000, jitter_ms: int = 5000, timeout: float = 5.0) -> int:
+        """Yeni bağlantıları durdur, istemcilere dağıtılmış yeniden bağlanma süresi bildir
+        
+        Her bağlantıya ``reconnect_after_ms`` + [0, ``jitter_ms``) ms sonra
+        yeniden bağlanmasını söyleyen bir çerçeve gönderilir; istemciler aynı
+        anda geri dönmez. Bekleyen çerçeveler gönderildikten sonra soketler
+        1012 (sunucu yeniden başlıyor) ile kapatılır.
+        """
+        self.draining = True
+        members = list(self.connection_rooms)
+        writers = list(self.connections.values())
+        for writer in writers:
+            writer.offer(writer.codec.encode(self.reconnect_frame(reconnect_after_ms, jitter_ms)))
+            writer.finish(code=1012)
+        
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and any(not writer.closed for writer in writers):
+            await asyncio.sleep(0.05)
+        # Giden üyeler diğer düğümlerdeki odaları açık tutmasın
+        await asyncio.gather(*(self._cluster_members(room) for room in list(self.rooms.values())))
+        # Soket başına bir transaction yerine düğümün tüm üyelikleri tek seferde
+        if members:
+            await self._persist([lambda uow: uow.rooms.drop_memberships_for_connections(members)])
+        return len(writers)
+    
+    @staticmethod
+    def reconnect_frame(reconnect_after_ms: int, jitter_ms: int) -> dict:
+        return {
+            "type": "reconnect",
+            "after_ms": reconnect_after_ms + int(random.random() * jitter_ms),
+            "content": "Sunucu yeniden başlatılıyor, birazdan otomatik olarak yeniden bağlanacaksınız.",
+        }
+    
+    def export_state(self) -> dict:
+        """Odaların, üyelerin ve geçmişin yeniden başlatma için anlık görüntüsü"""
+        return {
+            "version": 1,
+            "node": self.node_id,
+            "saved_at": time.time(),
+            "rooms": [
+                [
+                    room.room_id,
+                    room.password,
+                    room.created_at.timestamp(),
+                    sorted({user.username for user in room.users.values()}),
+                ]
+                for room in self.rooms.values()
+            ],
+            "history": self.messages.export(),
+        }
+    
+    async def restore_state(self, state: dict, grace: float = 120.0) -> int:
+        """Anlık görüntüden odaları (boş) ve geçmişi geri yükle
+        
+        Odalar parolalarıyla birlikte geri gelir; böylece ilk yeniden bağlanan
+        odayı parolasız yeniden kuramaz. ``grace`` saniye içinde kimse geri
+        dönmezse oda kapatılır.
+        """
+        restored = []
+        for room_id, password, created_at, _members in state.get("rooms", ()):
+            if room_id in self.rooms:
+                continue
+            generation, password, created, _ = await self._claim_room(
+                room_id, password, datetime.fromtimestamp(created_at)
+            )
+            if room_id in self.rooms:
+                continue
+            self.rooms[room_id] = Room(
+                room_id=room_id,
+                password=password,
+                users={},
+                created_at=created
+            )
+            self.room_generations[room_id] = generation
+            await self._attach_room(room_id)
+            restored.append(room_id)
+        # Yalnızca geri yüklenen odaların geçmişi; kapanmış odalarınki taşınmaz
+        history = state.get("history", {})
+        self.messages.restore({room_id: history[room_id] for room_id in restored if room_id in history})
+        
+        if restored:
+            asyncio.get_running_loop().call_later(
+                grace, lambda: asyncio.ensure_future(self._expire_restored(restored))
+            )
+        return len(restored)
+    
+    async def _expire_restored(self, room_ids) -> None:
+        for room_id in room_ids:
+            room = self.rooms.get(room_id)
+            if room is not None and room.user_count == 0:
+                await self._close_room(room_id)
+    
+    async def search(self, connection_id: str, room_id: str, query: str, limit: Optional[int] = None) -> int:
+        """Oda geçmişinde ara, sonuçları (en yenisi önce) tek çerçevede gönder"""
+        if room_id not in self.rooms_for(connection_id):
+            raise ChatError("Kullanıcı veya oda bulunamadı!")
+        
+        entries = await self._search(room_id, query, limit)
+        await self.send_to_connection(connection_id, {
+            "type": "search_results",
+            "query": query,
+            "messages": [entry.to_dict() for entry in entries],
+        })
+        return len(entries)
+    
+    async def search_room(self, room_id: str, query: str, limit: Optional[int] = None, password: Optional[str] = None) -> List[HistoryEntry]:
+        """Üye olmayan çağıranlar (HTTP) için arama; oda parolası doğrulanır"""
+        room = self.rooms.get(room_id)
+        if room is None:
+            raise LookupError("Oda bulunamadı!")
+        if not await self._check_password(room, password, self.search_password_hasher):
+            raise ChatError("Yanlış şifre!")
+        return await self._search(room_id, query, limit)
+    
+    async def _search(self, room_id: str, query: str, limit: Optional[int]) -> List[HistoryEntry]:
+        limit = min(limit or self.history_replay, self.history_page_limit)
+        await self._ensure_history(room_id)
+        return self.messages.search(room_id, query[:MAX_QUERY_LENGTH], limit)
+    
+    async def replay_history(self, connection_id: str, room_id: str) -> int:
+        """Katılan kullanıcıya son mesajları tek bir çerçevede gönder"""
+        await self._ensure_history(room_id)
+        entries = self.messages.recent(room_id, self.history_replay)
+        await self.send_to_connection(connection_id, await self._history_frame(room_id, entries, "replay"))
+        return len(entries)
+    
+    async def load_older(self, connection_id: str, room_id: str, before_id: Optional[int], limit: Optional[int] = None) -> int:
+        """``before_id``'den eski bir sayfa geçmişi gönder (keyset sayfalama)"""
+        if room_id not in self.rooms_for(connection_id):
+            raise ChatError("Kullanıcı veya oda bulunamadı!")
+        
+        limit = min(limit or self.history_replay, self.history_page_limit)
+        await self._ensure_history(room_id)
+        entries = self.messages.before(room_id, before_id, limit)
+        room = self.rooms.get(room_id)
+        if len(entries) < limit and self.history_store is not None and room is not None:
+            # Tamponun gerisi kalıcı depodan
+            oldest = entries[0].id if entries else before_id
+            older = await self.history_store.get_room_messages_before(
+                self._history_key(room), oldest, limit - len(entries)
+            )
+            entries = [self._history_entry(message) for message in older] + entries
+        await self.send_to_connection(connection_id, await self._history_frame(room_id, entries, "older"))
+        return len(entries)
+    
+    async def _history_frame(self, room_id: str, entries, mode: str) -> dict:
+        # Tamponda ya da kalıcı depoda sayfanın ilk kaydından eski kayıt varsa devam
+        # edilebilir; kimlikler boşluklu olabildiğinden depoya sorulur
+        has_more = False
+        if entries:
+            history = self.messages.get(room_id)
+            room = self.rooms.get(room_id)
+            if history is not None and history.entries and entries[0].id > history.entries[0].id:
+                has_more = True
+            elif self.history_store is not None and room is not None:
+                has_more = await self.history_store.has_messages_before(self._history_key(room), entries[0].id)
+        return {
+            "type": "history",
+            "mode": mode,
+            "messages": [entry.to_dict() for entry in entries],
+            "has_more": has_more,
+        }
+    
+    async def _ensure_history(self, room_id: str) -> None:
+        """Tamponda olmayan odanın son mesajlarını kalıcı depodan yükle
+        
+        Yeni mesajlar depodaki son kimlikten devam eder; bütçe yüzünden
+        atılmış bir odanın kimlikleri 1'den yeniden başlamaz.
+        """
+        room = self.rooms.get(room_id)
+        if self.history_store is None or room is None or room_id in self.messages:
+            return
+        stored = await self.history_store.get_room_messages(self._history_key(room), self.messages.room_limit)
+        if stored:
+            self.messages.restore({room_id: [
+                [message.id, message.sender.username, message.content,
+                 message.timestamp.timestamp(), message.message_type.value]
+                for message in stored
+            ]})
+    
+    @staticmethod
+    def _history_key(room: Room) -> str:
+        """Kalıcı geçmiş anahtarı: oda adı + oluşturulma anı
+        
+        Kapanan bir odanın kaydı, aynı adla (belki parolasız) yeniden kurulan
+        odaya yüklenmez; anlık görüntüden geri gelen oda ise oluşturulma
+        anını koruduğu için kendi geçmişine devam eder.
+        """
+        return f"{room.room_id}@{round(room.created_at.timestamp() * 1_000_000)}"
+    
+    @staticmethod
+    def _history_entry(message: Message) -> HistoryEntry:
+        return HistoryEntry(
+            message.id,
+            message.sender.username,
+            message.content,
+            message.timestamp.timestamp(),
+            message.message_type
+        )
     
     async def send_message(self, connection_id: str, room_id: str, content: str) -> Message:
         """Mesaj gönder"""
-        user = self.users.get(connection_id)
         room = self.rooms.get(room_id)
+        user = room.users.get(connection_id) if room else None
         
-        if not user or not room:
-            raise ValueError("Kullanıcı veya oda bulunamadı!")
+        if not user:
+            raise ChatError("Kullanıcı veya oda bulunamadı!")
         
         # Mesaj oluştur
         message = Message(
@@ -85,40 +541,175 @@ class ChatUseCase:
             room_id=room_id
         )
         
-        # Mesajı kaydet
-        if room_id not in self.messages:
-            self.messages[room_id] = []
-        self.messages[room_id].append(message)
+        # Mesajı sınırlı oda geçmişine kaydet
+        self.messages_received += 1
+        await self._ensure_history(room_id)
+        message.id = self.messages.append(message).id
+        if self.history_store is not None:
+            self.history_store.enqueue(replace(message, room_id=self._history_key(room)))
+        if self.message_sink is not None:
+            self.message_sink.enqueue(message)
         
         # Diğer kullanıcılara bildir
-        await self._notify_room(room, f"{user.username}: {content}", exclude_user=user)
+        await self._notify_room(room, f"{user.username}: {content}", exclude_user=user, source=message)
+        
+        # Toplu yazıcı yoksa mesaj kendi transaction'ında kalıcılaştırılır
+        if self.message_sink is None:
+            await self._persist([lambda uow: uow.messages.save_message(message)])
         
         return message
     
-    async def _notify_room(self, room: Room, message: str, exclude_user: Optional[User] = None) -> None:
-        """Odadaki tüm kullanıcılara bildirim gönder"""
-        for user in room.users:
-            if exclude_user and user.connection_id == exclude_user.connection_id:
-                continue
-            
-            websocket = self.connections.get(user.connection_id)
-            if websocket:
-                try:
-                    await websocket.send_text(json.dumps({
-                        "type": "message",
-                        "content": message
-                    }))
-                except Exception:
-                    self.remove_connection(user.connection_id)
+    async def _notify_room(
+        self,
+        room: Room,
+        message: str,
+        exclude_user: Optional[User] = None,
+        source: Optional[Message] = None,
+        cacheable: bool = False,
+        local_only: bool = False,
+        closing: bool = False
+    ) -> None:
+        """Odadaki tüm kullanıcılara bildirim gönder
+        
+        ``local_only``: omurgaya yayma; ``closing``: diğer düğümler de odayı kapatsın.
+        """
+        payload = {"type": "message", "content": message}
+        excluded = exclude_user.connection_id if exclude_user else None
+        await self.broadcaster.broadcast(
+            (connection_id for connection_id in room.users if connection_id != excluded),
+            payload,
+            cacheable
+        )
+        if self.backplane is not None and not local_only:
+            await self._publish(room.room_id, payload, source, closing)
+    
+    def _channel(self, room_id: str) -> str:
+        return f"chat:room:{room_id}"
+    
+    async def _attach_room(self, room_id: str) -> None:
+        """Odanın omurga kanalına abone ol"""
+        if self.backplane is not None:
+            await self.backplane.subscribe(self._channel(room_id), self._on_backplane_message)
+    
+    async def _detach_room(self, room_id: str) -> None:
+        if self.backplane is not None:
+            await self.backplane.unsubscribe(self._channel(room_id), self._on_backplane_message)
+    
+    async def _lookup_claim(self, room_id: str) -> Optional[dict]:
+        """Odanın omurgadaki kaydı; yoksa ya da omurgaya ulaşılamıyorsa None"""
+        if self.backplane is None:
+            return None
+        try:
+            value = await self.backplane.lookup(self._claim_key(room_id))
+        except (OSError, asyncio.IncompleteReadError, RuntimeError) as exc:
+            logger.warning("Oda kaydı okunamadı: %s (%s)", room_id, exc)
+            return None
+        return json.loads(value) if value is not None else None
+    
+    async def _claim_room(self, room_id: str, password: Optional[str], created_at: datetime, existing: Optional[dict] = None):
+        """Odanın düğümler arası kaydını al ya da var olanı benimse
+        
+        Parola yalnızca bu düğümde kontrol edilir ama trafik tüm düğümlere
+        gider; bu yüzden oda ilk kuran düğümün parola hash'i ve kuşak
+        kimliğiyle omurgada kaydedilir, diğer düğümler katılanı bu parolayla
+        doğrular. ``existing`` (bkz. _lookup_claim) verilirse o kayıt aynen
+        benimsenir. (kuşak, parola, oluşturulma anı, kayıt bizim mi) döndürür.
+        Omurga yoksa ya da ulaşılamıyorsa kuşak yereldir; oda diğer
+        düğümlerle trafik paylaşmaz.
+        """
+        generation = uuid.uuid4().hex
+        if self.backplane is None:
+            return generation, password, created_at, True
+        value = json.dumps(existing or {"generation": generation, "password": password, "created_at": created_at.timestamp()})
+        try:
+            current = json.loads(await self.backplane.claim(self._claim_key(room_id), self.node_id, value, self.claim_ttl))
+        except (OSError, asyncio.IncompleteReadError, RuntimeError) as exc:
+            logger.warning("Oda kaydı alınamadı, oda yalnızca bu düğümde: %s (%s)", room_id, exc)
+            return generation, password, created_at, True
+        return (
+            current["generation"],
+            current["password"],
+            datetime.fromtimestamp(current["created_at"]),
+            current["generation"] == generation
+        )
+    
+    async def _release_room_claim(self, room_id: str) -> None:
+        if self.room_generations.pop(room_id, None) is None or self.backplane is None:
+            return
+        try:
+            await self.backplane.release(self._claim_key(room_id), self.node_id)
+        except (OSError, asyncio.IncompleteReadError, RuntimeError) as exc:
+            # Kayıt claim_ttl sonunda kendiliğinden düşer
+            logger.warning("Oda kaydı bırakılamadı: %s (%s)", room_id, exc)
+    
+    def _claim_key(self, room_id: str) -> str:
+        return f"chat:roomclaim:{room_id}"
+    
+    async def _cluster_members(self, room: Room) -> int:
+        """Bu düğümdeki üye sayısını omurgaya yaz, tüm düğümlerdeki toplamı döndür
+        
+        Omurga yoksa ya da ulaşılamıyorsa yerel sayı döner.
+        """
+        if self.backplane is None or room.room_id not in self.room_generations:
+            return room.user_count
+        try:
+            return await self.backplane.set_members(
+                self._claim_key(room.room_id), self.node_id, room.user_count, self.claim_ttl
+            )
+        except (OSError, asyncio.IncompleteReadError, RuntimeError) as exc:
+            logger.warning("Oda üye sayısı yazılamadı: %s (%s)", room.room_id, exc)
+            return room.user_count
+    
+    async def _publish(self, room_id: str, payload: dict, source: Optional[Message], closing: bool = False) -> None:
+        envelope = {
+            "node": self.node_id,
+            "room": room_id,
+            "generation": self.room_generations.get(room_id),
+            "payload": payload,
+        }
+        if closing:
+            envelope["close"] = True
+        if source is not None:
+            # Diğer düğümler geçmişlerine de eklesin
+            envelope["message"] = {
+                "username": source.sender.username,
+                "content": source.content,
+                "timestamp": source.timestamp.timestamp(),
+                "message_type": source.message_type.value,
+            }
+        await self.backplane.publish(self._channel(room_id), json.dumps(envelope))
+    
+    async def _on_backplane_message(self, channel: str, data: str) -> None:
+        """Başka bir düğümden gelen oda trafiğini yerel üyelere dağıt"""
+        envelope = json.loads(data)
+        if envelope.get("node") == self.node_id:
+            return
+        
+        room = self.rooms.get(envelope.get("room"))
+        if room is None:
+            return
+        # Aynı adla başka bir düğümde ayrıca (örn. omurga kesintisinde) kurulmuş oda
+        if envelope.get("generation") != self.room_generations.get(room.room_id):
+            return
+        
+        entry = envelope.get("message")
+        if entry:
+            self.messages.append_entry(
+                room.room_id,
+                entry["username"],
+                entry["content"],
+                entry["timestamp"],
+                MessageType(entry["message_type"])
+            )
+        await self.broadcaster.broadcast(room.users, envelope["payload"])
+        if envelope.get("close"):
+            writes = []
+            await self._shut_room(room, writes)
+            await self._persist(writes)
     
     async def notify_user(self, user: User, message: str) -> None:
         """Kullanıcıya bildirim gönder"""
-        websocket = self.connections.get(user.connection_id)
-        if websocket:
-            try:
-                await websocket.send_text(json.dumps({
-                    "type": "system",
-                    "content": message
-                }))
-            except Exception:
-                self.remove_connection(user.connection_id)
+        await self.broadcaster.send_to(
+            user.connection_id,
+            {"type": "system", "content": message}
+        )
@@ -3,26 +3,30 @@ from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from passlib.context import CryptContext
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from domain.models import User, Session
 from domain.entities import Session as SessionEntity
+from adapters.repositories import PostgresSessionRepository
+from infrastructure.token_cache import TokenCache, token_cache, token_digest
+# Password hashing (doğrudan çağrı döngüyü bloklar; async yol için AsyncPasswordHasher)
+from infrastructure.password_hasher import pwd_context
 
 # JWT ayarları
 SECRET_KEY = "your-secret-key-change-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 1440  # 24 saat
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# PyJWT ve python-jose farklı temel hata sınıfı kullanır
+JWTError = getattr(jwt, "JWTError", None) or jwt.PyJWTError
 
 # Security scheme
 security = HTTPBearer()
 
 class AuthService:
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, cache: Optional[TokenCache] = None):
         self.session = session
+        self.cache = cache if cache is not None else token_cache
     
     def create_access_token(self, data: dict, expires_delta: Optional[timedelta] = None):
         """JWT token oluştur"""
@@ -46,7 +50,7 @@ class AuthService:
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Token süresi dolmuş"
             )
-        except jwt.JWTError:
+        except JWTError:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Geçersiz token"
@@ -84,8 +88,20 @@ class AuthService:
     
     async def validate_session(self, token: str) -> Optional[SessionEntity]:
         """Session'ı doğrula ve kullanıcı bilgilerini getir"""
+        # Daha önce doğrulanmış token'lar için kripto ve DB sorgusu atlanır
+        digest = token_digest(token)
+        cached = self.cache.get(digest)
+        if not TokenCache.is_miss(cached):
+            if isinstance(cached, HTTPException):
+                raise HTTPException(status_code=cached.status_code, detail=cached.detail)
+            return cached
+        
         # JWT token'ı doğrula
-        payload = self.verify_token(token)
+        try:
+            payload = self.verify_token(token)
+        except HTTPException as exc:
+            self.cache.put_negative(digest, exc)
+            raise
         
         # Veritabanından session'ı kontrol et
         result = await self.session.execute(
@@ -97,9 +113,10 @@ class AuthService:
         db_session = result.scalar_one_or_none()
         
         if not db_session or db_session.is_expired():
+            self.cache.put_negative(digest)
             return None
         
-        return SessionEntity(
+        session_entity = SessionEntity(
             session_id=db_session.session_id,
             user_id=str(db_session.user_id),
             username=payload.get("username"),
@@ -107,30 +124,19 @@ class AuthService:
             created_at=db_session.created_at,
             expires_at=db_session.expires_at
         )
+        # Token'ın exp'i ile session'ın bitişinden erken olanına kadar geçerli
+        expires_at = min(float(payload["exp"]), db_session.expires_at.timestamp())
+        self.cache.put(digest, session_entity, expires_at)
+        return session_entity
     
     async def invalidate_session(self, token: str) -> None:
-        """Session'ı geçersiz kıl"""
-        result = await self.session.execute(
-            select(Session).where(Session.session_id == token)
-        )
-        db_session = result.scalar_one_or_none()
-        
-        if db_session:
-            db_session.is_active = False
-            await self.session.commit()
+        """Session'ı geçersiz kıl (önbellek iptali dahil)"""
+        await PostgresSessionRepository(self.session, self.cache).invalidate_session(token)
     
-    async def cleanup_expired_sessions(self) -> None:
+    async def cleanup_expired_sessions(self, chunk_size: int = 5000) -> int:
         """Süresi dolmuş session'ları temizle"""
-        expired_sessions = await self.session.execute(
-            select(Session).where(
-                Session.expires_at < datetime.now()
-            )
-        )
-        
-        for session in expired_sessions.scalars().all():
-            await self.session.delete(session)
-        
-        await self.session.commit()
+        # Tek tek ORM silmesi yerine parça parça küme tabanlı DELETE
+        return await PostgresSessionRepository(self.session).cleanup_expired_sessions(chunk_size)
 
 def get_current_user(credentials: HTTPAuthorizationCredentials = security) -> dict:
     """Mevcut kullanıcıyı getir (dependency injection için)"""
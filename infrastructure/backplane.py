@@ -0,0 +1,378 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Set
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[str, str], Awaitable[None]]
+
+class InMemoryBackplane:
+    """Aynı süreçteki ChatUseCase örnekleri arasında oda trafiğini dağıtan omurga"""
+
+    def __init__(self):
+        self._handlers: Dict[str, Set[Handler]] = {}
+        # anahtar -> [değer, sahipler, son geçerlilik]
+        self._claims: Dict[str, list] = {}
+        # anahtar -> {sahip: yerel üye sayısı}
+        self._members: Dict[str, Dict[str, int]] = {}
+        self.published = 0
+
+    async def start(self) -> None:
+        pass
+
+    async def publish(self, channel: str, data: str) -> None:
+        self.published += 1
+        for handler in list(self._handlers.get(channel, ())):
+            try:
+                await handler(channel, data)
+            except Exception:
+                logger.exception("Backplane handler hatası (%s)", channel)
+
+    async def subscribe(self, channel: str, handler: Handler) -> None:
+        self._handlers.setdefault(channel, set()).add(handler)
+
+    async def unsubscribe(self, channel: str, handler: Handler) -> None:
+        handlers = self._handlers.get(channel)
+        if handlers is not None:
+            handlers.discard(handler)
+            if not handlers:
+                del self._handlers[channel]
+
+    async def claim(self, key: str, owner: str, value: str, ttl: int) -> str:
+        """Anahtar boşsa ``value``'yu yaz, ``owner``'ı sahiplere ekle; geçerli değeri döndür"""
+        entry = self._claims.get(key)
+        if entry is None or entry[2] < time.monotonic():
+            entry = self._claims[key] = [value, set(), 0.0]
+        entry[1].add(owner)
+        entry[2] = time.monotonic() + ttl
+        return entry[0]
+
+    async def store(self, key: str, value: str) -> None:
+        """Süresiz, sahipsiz bir değer yaz (``lookup`` ile okunur)"""
+        self._claims[key] = [value, set(), float("inf")]
+
+    async def lookup(self, key: str) -> Optional[str]:
+        """Anahtarın geçerli değeri; yoksa None"""
+        entry = self._claims.get(key)
+        if entry is None or entry[2] < time.monotonic():
+            return None
+        return entry[0]
+
+    async def release(self, key: str, owner: str) -> None:
+        """``owner``'ı sahiplerden çıkar; sahip kalmazsa anahtar silinir"""
+        members = self._members.get(key)
+        if members is not None:
+            members.pop(owner, None)
+            if not members:
+                del self._members[key]
+        entry = self._claims.get(key)
+        if entry is not None:
+            entry[1].discard(owner)
+            if not entry[1]:
+                del self._claims[key]
+                self._members.pop(key, None)
+
+    async def set_members(self, key: str, owner: str, count: int, ttl: int) -> int:
+        """``owner``'ın yerel üye sayısını yaz; tüm düğümlerin toplamını döndür"""
+        members = self._members.setdefault(key, {})
+        if count > 0:
+            members[owner] = count
+        else:
+            members.pop(owner, None)
+        total = sum(members.values())
+        if not members:
+            del self._members[key]
+        return total
+
+    async def close(self) -> None:
+        self._handlers.clear()
+        self._claims.clear()
+        self._members.clear()
+
+def encode_command(*args) -> bytes:
+    """Redis RESP dizi komutu oluştur"""
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+async def read_reply(reader: asyncio.StreamReader):
+    """Tek bir RESP2 yanıtını oku"""
+    line = await reader.readuntil(b"\r\n")
+    kind, body = line[:1], line[1:-2]
+    if kind == b"+":
+        return body.decode()
+    if kind == b"-":
+        raise RuntimeError(body.decode())
+    if kind == b":":
+        return int(body)
+    if kind == b"$":
+        length = int(body)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2]
+    if kind == b"*":
+        count = int(body)
+        if count < 0:
+            return None
+        return [await read_reply(reader) for _ in range(count)]
+    raise RuntimeError(f"Beklenmeyen RESP yanıtı: {line!r}")
+
+# Anahtar yoksa yaz, sahip kümesine ekle, ikisinin de süresini yenile; geçerli değeri döndür
+CLAIM_SCRIPT = """
+redis.call('SET', KEYS[1], ARGV[1], 'NX')
+redis.call('SADD', KEYS[2], ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return redis.call('GET', KEYS[1])
+"""
+# Sahibi ve üye sayısını çıkar; son sahip de bıraktıysa anahtarları sil
+RELEASE_SCRIPT = """
+redis.call('SREM', KEYS[2], ARGV[1])
+redis.call('HDEL', KEYS[3], ARGV[1])
+if redis.call('SCARD', KEYS[2]) == 0 then
+    redis.call('DEL', KEYS[1], KEYS[3])
+end
+return 0
+"""
+# Sahibin yerel üye sayısını yaz (0 ise sil); tüm sahiplerin toplamını döndür
+MEMBERS_SCRIPT = """
+if tonumber(ARGV[2]) > 0 then
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+else
+    redis.call('HDEL', KEYS[1], ARGV[1])
+end
+local total = 0
+for _, count in ipairs(redis.call('HVALS', KEYS[1])) do
+    total = total + tonumber(count)
+end
+return total
+"""
+
+class RedisBackplane:
+    """Redis protokolü (RESP) ile PUBLISH/SUBSCRIBE yapan süreçler arası omurga
+
+    ``redis://host:port`` ya da yerel ``unix:///yol/redis.sock`` adreslerini
+    destekler; Redis ya da protokol uyumlu herhangi bir sunucu ile çalışır.
+    Yayın ve abonelik için iki ayrı bağlantı kullanılır. Komutlar yayın
+    bağlantısına yanıt beklenmeden art arda yazılır (pipelining); yanıtlar
+    sırayla okunup bekleyenlere dağıtılır. ``request_timeout`` içinde yanıt
+    gelmezse bağlantı düşürülür. Bağlantı koparsa abonelikler yeniden kurulur.
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379", reconnect_delay: float = 1.0,
+                 request_timeout: float = 2.0):
+        self.url = url
+        self.reconnect_delay = reconnect_delay
+        self.request_timeout = request_timeout
+        self._handlers: Dict[str, Set[Handler]] = {}
+        self._publish_writer: Optional[asyncio.StreamWriter] = None
+        # Yanıtı beklenen komutlar, gönderiliş sırasıyla
+        self._pending: Deque[asyncio.Future] = deque()
+        self._reply_task: Optional[asyncio.Task] = None
+        self._connect_lock = asyncio.Lock()
+        self._subscribe_writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._closed = False
+        self.published = 0
+        self.received = 0
+
+    async def _open(self):
+        parsed = urlparse(self.url)
+        if parsed.scheme == "unix":
+            return await asyncio.open_unix_connection(parsed.path)
+        reader, writer = await asyncio.open_connection(parsed.hostname or "localhost", parsed.port or 6379)
+        if parsed.password:
+            writer.write(encode_command("AUTH", parsed.password))
+            await read_reply(reader)
+        return reader, writer
+
+    async def start(self) -> None:
+        """Yayın bağlantısını aç ve abonelik okuyucusunu başlat"""
+        try:
+            await self._connection()
+        except OSError as exc:
+            # Sunucu henüz hazır değil; ilk yayında yeniden denenir
+            logger.warning("Backplane bağlantısı kurulamadı: %s", exc)
+        self._reader_task = asyncio.ensure_future(self._read_loop())
+
+    async def publish(self, channel: str, data: str) -> None:
+        try:
+            await self._request("PUBLISH", channel, data)
+            self.published += 1
+        except (OSError, asyncio.IncompleteReadError) as exc:
+            logger.warning("Backplane yayını başarısız: %s", exc)
+
+    async def claim(self, key: str, owner: str, value: str, ttl: int) -> str:
+        """Anahtar boşsa ``value``'yu yaz, ``owner``'ı sahiplere ekle; geçerli değeri döndür
+
+        Bağlantı hatasında OSError/IncompleteReadError, sunucu betik
+        çalıştıramıyorsa RuntimeError yükseltir.
+        """
+        reply = await self._request("EVAL", CLAIM_SCRIPT, "2", key, f"{key}:owners", value, owner, str(ttl))
+        return reply.decode()
+
+    async def store(self, key: str, value: str) -> None:
+        """Süresiz, sahipsiz bir değer yaz (``lookup`` ile okunur)"""
+        await self._request("SET", key, value)
+
+    async def lookup(self, key: str) -> Optional[str]:
+        """Anahtarın geçerli değeri; yoksa None"""
+        reply = await self._request("GET", key)
+        return reply.decode() if reply is not None else None
+
+    async def release(self, key: str, owner: str) -> None:
+        await self._request("EVAL", RELEASE_SCRIPT, "3", key, f"{key}:owners", f"{key}:members", owner)
+
+    async def set_members(self, key: str, owner: str, count: int, ttl: int) -> int:
+        """``owner``'ın yerel üye sayısını yaz; tüm düğümlerin toplamını döndür"""
+        return await self._request("EVAL", MEMBERS_SCRIPT, "1", f"{key}:members", owner, str(count), str(ttl))
+
+    async def _request(self, *args):
+        """Komutu yayın bağlantısına yaz, yanıtını ``request_timeout`` ile bekle
+
+        Zaman aşımında TimeoutError (OSError) yükseltir.
+        """
+        writer = await self._connection()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(future)
+        writer.write(encode_command(*args))
+        try:
+            return await asyncio.wait_for(future, self.request_timeout)
+        except asyncio.TimeoutError:
+            # Yanıt sırası artık güvenilmez; bekleyenlerin hepsi yeniden bağlanmalı
+            error = TimeoutError("Backplane yanıtı zaman aşımına uğradı")
+            self._reset(writer, error)
+            raise error from None
+
+    async def _connection(self) -> asyncio.StreamWriter:
+        if self._publish_writer is None:
+            async with self._connect_lock:
+                if self._publish_writer is None:
+                    try:
+                        reader, writer = await asyncio.wait_for(self._open(), self.request_timeout)
+                    except asyncio.TimeoutError:
+                        raise TimeoutError("Backplane bağlantısı zaman aşımına uğradı") from None
+                    self._publish_writer = writer
+                    self._pending = deque()
+                    self._reply_task = asyncio.ensure_future(self._reply_loop(reader, writer, self._pending))
+        return self._publish_writer
+
+    async def _reply_loop(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                          pending: Deque[asyncio.Future]) -> None:
+        """Yanıtları sırayla oku, gönderiliş sırasındaki bekleyene ilet"""
+        try:
+            while True:
+                try:
+                    reply = await read_reply(reader)
+                    error = None
+                except RuntimeError as exc:
+                    # -ERR yanıtı yalnızca kendi komutunu ilgilendirir
+                    reply, error = None, exc
+                if not pending:
+                    raise ConnectionError("Beklenmeyen backplane yanıtı")
+                future = pending.popleft()
+                if future.done():
+                    # Bekleyen iptal edilmiş; yanıt atılır
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(reply)
+        except asyncio.CancelledError:
+            raise
+        except (OSError, asyncio.IncompleteReadError) as exc:
+            self._reset(writer, ConnectionError(f"Backplane bağlantısı koptu: {exc}"))
+
+    def _reset(self, writer: asyncio.StreamWriter, exc: Exception) -> None:
+        """Bağlantıyı kapat, yanıt bekleyen komutları ``exc`` ile sonlandır"""
+        if self._publish_writer is not writer:
+            return
+        self._publish_writer = None
+        self._close_writer(writer)
+        if self._reply_task is not None and self._reply_task is not asyncio.current_task():
+            self._reply_task.cancel()
+        self._reply_task = None
+        pending, self._pending = self._pending, deque()
+        for future in pending:
+            if not future.done():
+                future.set_exception(exc)
+
+    async def subscribe(self, channel: str, handler: Handler) -> None:
+        handlers = self._handlers.setdefault(channel, set())
+        first = not handlers
+        handlers.add(handler)
+        if first:
+            self._send_subscription("SUBSCRIBE", channel)
+
+    async def unsubscribe(self, channel: str, handler: Handler) -> None:
+        handlers = self._handlers.get(channel)
+        if handlers is None:
+            return
+        handlers.discard(handler)
+        if not handlers:
+            del self._handlers[channel]
+            self._send_subscription("UNSUBSCRIBE", channel)
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+        if self._publish_writer is not None:
+            self._reset(self._publish_writer, ConnectionError("Backplane kapatıldı"))
+        self._close_writer(self._subscribe_writer)
+        self._subscribe_writer = None
+
+    def _send_subscription(self, command: str, channel: str) -> None:
+        # Bağlantı henüz yoksa okuyucu yeniden bağlanınca tüm kanallara abone olur
+        if self._subscribe_writer is not None:
+            self._subscribe_writer.write(encode_command(command, channel))
+
+    async def _read_loop(self) -> None:
+        while not self._closed:
+            try:
+                reader, writer = await self._open()
+                self._subscribe_writer = writer
+                if self._handlers:
+                    writer.write(encode_command("SUBSCRIBE", *self._handlers))
+
+                while True:
+                    reply = await read_reply(reader)
+                    if isinstance(reply, list) and len(reply) == 3 and reply[0] == b"message":
+                        await self._dispatch(reply[1].decode(), reply[2].decode())
+            except asyncio.CancelledError:
+                raise
+            except (OSError, asyncio.IncompleteReadError, RuntimeError) as exc:
+                logger.warning("Backplane aboneliği koptu: %s", exc)
+                self._close_writer(self._subscribe_writer)
+                self._subscribe_writer = None
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def _dispatch(self, channel: str, data: str) -> None:
+        self.received += 1
+        for handler in list(self._handlers.get(channel, ())):
+            try:
+                await handler(channel, data)
+            except Exception:
+                logger.exception("Backplane handler hatası (%s)", channel)
+
+    @staticmethod
+    def _close_writer(writer: Optional[asyncio.StreamWriter]) -> None:
+        if writer is not None:
+            writer.close()
+
+def create_backplane(url: Optional[str]):
+    """Adrese göre omurga oluştur; boşsa None (yalnızca yerel yayın)"""
+    if not url:
+        return None
+    if url == "memory":
+        return InMemoryBackplane()
+    return RedisBackplane(url)
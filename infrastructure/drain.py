@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import signal
+import time
+from typing import Dict, Optional
+from infrastructure.snapshot import save_snapshot
+
+logger = logging.getLogger(__name__)
+
+class GracefulDrain:
+    """SIGTERM/SIGINT geldiğinde sunucu kapanmadan önce bağlantıları boşaltır
+
+    Uvicorn sinyal aldığında önce WebSocket'leri kapatır, lifespan kapanışı
+    ancak sonra çalışır; bu yüzden boşaltma sinyalin kendisine bağlanır:
+    yeni bağlantılar durdurulur, oda/geçmiş anlık görüntüsü yazılır,
+    istemcilere dağıtılmış yeniden bağlanma süreleri gönderilir ve ardından
+    sinyal önceki işleyiciye (uvicorn) devredilir.
+    """
+
+    def __init__(
+        self,
+        chat_use_case,
+        snapshot_path: Optional[str] = None,
+        reconnect_after_ms: int = 1000,
+        jitter_ms: int = 5000,
+        timeout: float = 5.0
+    ):
+        self.chat_use_case = chat_use_case
+        self.snapshot_path = snapshot_path
+        self.reconnect_after_ms = reconnect_after_ms
+        self.jitter_ms = jitter_ms
+        self.timeout = timeout
+        self.drained = False
+        self._previous: Dict[int, object] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def install(self, signals=(signal.SIGTERM, signal.SIGINT)) -> None:
+        loop = asyncio.get_running_loop()
+        for sig in signals:
+            self._previous[sig] = signal.getsignal(sig)
+            loop.add_signal_handler(sig, self._on_signal, sig)
+
+    def uninstall(self) -> None:
+        """Sinyalleri önceki işleyicilere geri ver"""
+        loop = asyncio.get_running_loop()
+        for sig, previous in list(self._previous.items()):
+            loop.remove_signal_handler(sig)
+            if previous is not None:
+                signal.signal(sig, previous)
+        self._previous.clear()
+
+    async def drain(self) -> None:
+        """Anlık görüntüyü al ve bağlantıları boşalt (bir kez çalışır)"""
+        if self.drained:
+            return
+        self.drained = True
+        started = time.perf_counter()
+        
+        # Üyelikler, soketler kapanıp odalardan çıkılmadan önce kaydedilir
+        self.chat_use_case.draining = True
+        if self.snapshot_path:
+            try:
+                size = save_snapshot(self.snapshot_path, self.chat_use_case.export_state())
+                logger.info("Anlık görüntü yazıldı: %s (%d bayt)", self.snapshot_path, size)
+            except OSError:
+                logger.exception("Anlık görüntü yazılamadı: %s", self.snapshot_path)
+        
+        count = await self.chat_use_case.drain(self.reconnect_after_ms, self.jitter_ms, self.timeout)
+        logger.info("%d bağlantı %.0f ms içinde boşaltıldı", count, (time.perf_counter() - started) * 1000)
+
+    def _on_signal(self, sig) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._drain_then_exit(sig))
+
+    async def _drain_then_exit(self, sig) -> None:
+        previous = self._previous.get(sig)
+        try:
+            await self.drain()
+        except Exception:
+            logger.exception("Boşaltma başarısız")
+        finally:
+            # İkinci bir sinyal doğrudan önceki işleyiciye (zorla kapatma) gitsin
+            self.uninstall()
+            if callable(previous):
+                previous(sig, None)
+            else:
+                signal.raise_signal(sig)
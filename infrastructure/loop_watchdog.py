@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Stack = Tuple[str, ...]
+
+class LoopWatchdog:
+    """Olay döngüsü takılmalarını yakalayıp yığın örnekleri kaydeden bekçi
+
+    Döngü her ``heartbeat`` saniyede bir zaman damgası bırakır. Ayrı bir
+    daemon iş parçacığı ``check_interval`` aralıklarla bu damganın ne kadar
+    geciktiğine bakar; gecikme ``threshold``'u aşarsa döngü iş parçacığının
+    o anki yığınını ``sys._current_frames`` ile örnekler. Takılma bitince
+    en sık görülen yığınlar halka tamponda saklanır.
+
+    Normal durumda maliyet, döngüde periyodik tek bir geri çağırım ve iş
+    parçacığında bir kayan nokta karşılaştırmasıdır; yığın yalnızca takılma
+    sırasında alınır.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.1,
+        heartbeat: float = 0.05,
+        check_interval: float = 0.02,
+        history: int = 100,
+        max_depth: int = 40,
+        top_stacks: int = 3,
+        on_stall=None
+    ):
+        self.threshold = threshold
+        self.heartbeat = heartbeat
+        self.check_interval = check_interval
+        self.max_depth = max_depth
+        self.top_stacks = top_stacks
+        # Takılma kaydedildiğinde iş parçacığından çağrılır (örn. sayaç)
+        self.on_stall = on_stall
+        self.stalls: deque = deque(maxlen=history)
+        self.stall_count = 0
+        self.max_stall = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = 0.0
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._samples: Counter = Counter()
+        self._stall_started: Optional[float] = None
+        self._stall_wall: Optional[datetime] = None
+
+    def start(self) -> None:
+        """Çalışan döngüye bağlan ve izleme iş parçacığını başlat"""
+        if self._thread is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._beat()
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def recent(self, limit: Optional[int] = None) -> List[dict]:
+        """Son takılmalar, en yenisi önce"""
+        stalls = list(self.stalls)[::-1]
+        return stalls[:limit] if limit else stalls
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "stalls": self.stall_count,
+            "max_stall_ms": self.max_stall * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "stalled": self._stall_started is not None,
+        }
+
+    def _beat(self) -> None:
+        self._last_beat = time.monotonic()
+        self._handle = self._loop.call_later(self.heartbeat, self._beat)
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.check_interval):
+            expected = self._last_beat + self.heartbeat
+            lag = time.monotonic() - expected
+            if lag >= self.threshold:
+                if self._stall_started is None:
+                    self._stall_started = expected
+                    self._stall_wall = datetime.now()
+                stack = self._sample()
+                if stack:
+                    self._samples[stack] += 1
+            elif self._stall_started is not None:
+                self._finish(self._last_beat - self._stall_started)
+
+    def _sample(self) -> Stack:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return ()
+        return tuple(
+            f"{entry.filename}:{entry.lineno} in {entry.name}"
+            for entry in traceback.extract_stack(frame, limit=self.max_depth)
+        )
+
+    def _finish(self, duration: float) -> None:
+        total = sum(self._samples.values())
+        record = {
+            "started_at": self._stall_wall.isoformat(),
+            "duration_ms": round(duration * 1000, 2),
+            "samples": total,
+            "stacks": [
+                {"count": count, "share": round(count / total, 3), "frames": list(stack)}
+                for stack, count in self._samples.most_common(self.top_stacks)
+            ],
+        }
+        self.stalls.append(record)
+        self.stall_count += 1
+        if duration > self.max_stall:
+            self.max_stall = duration
+        self._samples = Counter()
+        self._stall_started = None
+        self._stall_wall = None
+
+        culprit = record["stacks"][0]["frames"][-1] if record["stacks"] else "?"
+        logger.warning("Olay döngüsü %.0f ms takıldı: %s", duration * 1000, culprit)
+        if self.on_stall is not None:
+            self.on_stall(duration)
@@ -0,0 +1,290 @@
+import asyncio
+import bisect
+import logging
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+Labels = Tuple[Tuple[str, str], ...]
+Sample = Union[float, Dict[Labels, float]]
+
+# Saniye cinsinden gecikmeler için varsayılan kovalar
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class Counter:
+    """Yalnızca artan sayaç
+
+    Güncellemeler tek olay döngüsü iş parçacığında yapılır; kilit gerekmez
+    ve artış tek bir toplama işlemidir.
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def samples(self) -> Iterable[Tuple[str, Labels, float]]:
+        yield self.name, (), self.value
+
+class Histogram:
+    """Sabit kovalı histogram; gözlem bir ikili arama ve iki toplama"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self) -> Iterable[Tuple[str, Labels, float]]:
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f"{self.name}_bucket", (("le", _format_value(bound)),), cumulative
+        yield f"{self.name}_bucket", (("le", "+Inf"),), self.count
+        yield f"{self.name}_sum", (), self.sum
+        yield f"{self.name}_count", (), self.count
+
+class CallbackMetric:
+    """Değeri kazıma anında okunan ölçüm (sıcak yolda maliyeti yok)
+
+    ``callback`` tek bir sayı ya da ``{etiketler: değer}`` sözlüğü döndürür.
+    """
+
+    def __init__(self, name: str, help_text: str, callback: Callable[[], Sample], kind: str = "gauge"):
+        self.name = name
+        self.help = help_text
+        self.callback = callback
+        self.kind = kind
+
+    def samples(self) -> Iterable[Tuple[str, Labels, float]]:
+        value = self.callback()
+        if isinstance(value, dict):
+            for labels, sample in value.items():
+                yield self.name, labels, sample
+        elif value is not None:
+            yield self.name, (), value
+
+class Registry:
+    """Ölçümleri toplayıp Prometheus metin biçiminde sunan kayıt"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Ölçüm zaten kayıtlı: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self.register(Counter(name, help_text))
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help_text, buckets))
+
+    def gauge_callback(self, name: str, help_text: str, callback: Callable[[], Sample]) -> CallbackMetric:
+        return self.register(CallbackMetric(name, help_text, callback, "gauge"))
+
+    def counter_callback(self, name: str, help_text: str, callback: Callable[[], Sample]) -> CallbackMetric:
+        return self.register(CallbackMetric(name, help_text, callback, "counter"))
+
+    def unregister(self, name: str) -> None:
+        self._metrics.pop(name, None)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            try:
+                samples = list(metric.samples())
+            except Exception:
+                # Tek bir bozuk geri çağırım tüm kazımayı düşürmesin
+                logger.exception("Ölçüm okunamadı: %s", metric.name)
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+class LoopLagProbe:
+    """Olay döngüsü gecikmesini ölçen hafif görev
+
+    Her ``interval`` saniyede bir uyanır; beklenen ile gerçek uyanma
+    arasındaki fark döngünün o sırada ne kadar meşgul olduğunu gösterir.
+    """
+
+    def __init__(self, histogram: Histogram, interval: float = 0.5):
+        self.histogram = histogram
+        self.interval = interval
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            self.last_lag = lag
+            if lag > self.max_lag:
+                self.max_lag = lag
+            self.histogram.observe(lag)
+
+# Uygulama genelinde paylaşılan kayıt ve sıcak yol ölçümleri
+registry = Registry()
+
+broadcast_latency = registry.histogram(
+    "chat_broadcast_duration_seconds",
+    "Bir yayının alıcı kuyruklarına dağıtılma süresi"
+)
+db_query_latency = registry.histogram(
+    "chat_db_query_duration_seconds",
+    "Veritabanı sorgu süresi"
+)
+loop_lag = registry.histogram(
+    "chat_event_loop_lag_seconds",
+    "Olay döngüsü gecikmesi",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+def instrument_engine(engine, histogram: Histogram = db_query_latency) -> None:
+    """SQLAlchemy motorundaki her sorgunun süresini histogram'a yaz"""
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        histogram.observe(time.perf_counter() - started)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context):
+        # Başarısız sorgunun başlangıç zamanı yığında kalmasın
+        stack = context.connection.info.get("query_started") if context.connection is not None else None
+        if stack:
+            histogram.observe(time.perf_counter() - stack.pop())
+
+# Oda boyutu dağılımı için üst sınırlar (üye sayısı)
+ROOM_SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 500, 1000)
+
+def instrument_chat(chat_use_case) -> None:
+    """ChatUseCase'in mevcut sayaçlarını kazıma anında okunacak şekilde kaydet"""
+    broadcaster = chat_use_case.broadcaster
+    broadcaster.latency_observer = broadcast_latency.observe
+
+    registry.gauge_callback(
+        "chat_connections", "Açık WebSocket bağlantıları",
+        lambda: len(chat_use_case.connections)
+    )
+    registry.gauge_callback(
+        "chat_rooms", "Aktif odalar",
+        lambda: len(chat_use_case.rooms)
+    )
+    registry.gauge_callback(
+        "chat_room_members_total", "Tüm odalardaki üye sayısı",
+        lambda: sum(room.user_count for room in chat_use_case.rooms.values())
+    )
+
+    def rooms_by_size():
+        # Oda adları kullanıcı verisidir; /metrics kimlik doğrulamasız olduğu
+        # için etiket olarak yayınlanmaz, yalnızca boyut dağılımı verilir
+        counts = [0] * (len(ROOM_SIZE_BUCKETS) + 1)
+        for room in chat_use_case.rooms.values():
+            counts[bisect.bisect_left(ROOM_SIZE_BUCKETS, room.user_count)] += 1
+        labels = [str(bound) for bound in ROOM_SIZE_BUCKETS] + ["+Inf"]
+        result, total = {}, 0
+        for label, count in zip(labels, counts):
+            total += count
+            result[(("le", label),)] = total
+        return result
+
+    registry.gauge_callback(
+        "chat_rooms_by_size", "Üye sayısı en fazla le olan oda sayısı (kümülatif)", rooms_by_size
+    )
+    registry.counter_callback(
+        "chat_messages_received_total", "İstemcilerden kabul edilen mesajlar",
+        lambda: chat_use_case.messages_received
+    )
+    registry.counter_callback(
+        "chat_frames_sent_total", "Giden kuyruklara alınan çerçeveler",
+        lambda: broadcaster.stats.frames_sent
+    )
+    registry.counter_callback(
+        "chat_broadcasts_total", "Yapılan yayınlar",
+        lambda: broadcaster.stats.broadcasts
+    )
+    registry.counter_callback(
+        "chat_send_failures_total", "Kuyruğa alınamayan çerçeveler",
+        lambda: broadcaster.stats.send_failures
+    )
+    registry.counter_callback(
+        "chat_connections_evicted_total", "Yavaş ya da kopuk olduğu için atılan bağlantılar",
+        lambda: chat_use_case.evicted_connections
+    )
+    registry.counter_callback(
+        "chat_persistence_failures_total", "Kalıcılaştırılamayan sohbet işlemleri",
+        lambda: chat_use_case.persistence_failures
+    )
+    registry.gauge_callback(
+        "chat_outbound_queue_depth", "Tüm giden kuyruklardaki bekleyen çerçeveler",
+        lambda: sum(writer.depth for writer in chat_use_case.connections.values())
+    )
+    registry.gauge_callback(
+        "chat_history_bytes", "Bellekteki mesaj geçmişinin tahmini boyutu",
+        lambda: chat_use_case.messages.bytes
+    )
+
+def instrument_stats(prefix: str, stats: Callable[[], dict], help_text: str) -> None:
+    """``stats()`` sözlüğü sunan bileşenlerin sayısal alanlarını gauge olarak yayınla"""
+    def read():
+        return {(("field", key),): value for key, value in stats().items() if isinstance(value, (int, float))}
+    # Yeniden başlatılan lifespan aynı bileşeni tekrar kaydedebilir
+    registry.unregister(prefix)
+    registry.gauge_callback(prefix, help_text, read)
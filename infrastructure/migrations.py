@@ -0,0 +1,77 @@
+import logging
+from dataclasses import dataclass
+from typing import List, Tuple
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class Migration:
+    """Sırayla ve bir kez uygulanan şema değişikliği"""
+    version: int
+    description: str
+    statements: Tuple[str, ...]
+
+# ``create_all`` mevcut tablolara indeks eklemez; var olan veritabanları
+# buradaki adımlarla güncellenir. Adımlar IF NOT EXISTS ile idempotenttir.
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Mesaj geçmişi indeksleri", (
+        "CREATE INDEX IF NOT EXISTS ix_messages_room_id_id ON messages (room_id, id)",
+        "CREATE INDEX IF NOT EXISTS ix_messages_room_id_timestamp ON messages (room_id, timestamp)",
+    )),
+    Migration(2, "Tekil oda üyeliği", (
+        # Tekil indeksten önce yinelenen üyelikleri temizle (en eskisi kalır)
+        "DELETE FROM room_memberships WHERE id NOT IN "
+        "(SELECT MIN(id) FROM room_memberships GROUP BY user_id, room_id)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_room_memberships_user_room ON room_memberships (user_id, room_id)",
+        "CREATE INDEX IF NOT EXISTS ix_room_memberships_room_id ON room_memberships (room_id)",
+    )),
+    Migration(3, "Session süpürme ve durum indeksleri", (
+        "CREATE INDEX IF NOT EXISTS ix_sessions_expires_at ON sessions (expires_at)",
+        "CREATE INDEX IF NOT EXISTS ix_sessions_is_active ON sessions (is_active)",
+    )),
+]
+
+# Eşzamanlı başlayan worker'lar şema adımlarını sırayla uygulasın (pg_advisory_xact_lock anahtarı)
+MIGRATION_LOCK_KEY = 0x63686174  # "chat"
+
+async def lock_schema(conn) -> None:
+    """PostgreSQL'de şema kilidini al; transaction bitince kendiliğinden bırakılır
+
+    Aynı oturumda tekrar alınabilir; bekleyen worker kilidi aldığında
+    güncel sürümü okur.
+    """
+    if conn.dialect.name == "postgresql":
+        await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+async def current_version(conn) -> int:
+    await conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, description VARCHAR(200) NOT NULL, "
+        "applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    ))
+    result = await conn.execute(text("SELECT MAX(version) FROM schema_migrations"))
+    return result.scalar() or 0
+
+async def run_migrations(conn) -> List[int]:
+    """Uygulanmamış adımları verilen bağlantıda çalıştır, uygulananları döndür
+
+    Her adım çağıranın transaction'ı içinde çalışır; bir adım başarısız
+    olursa sürüm kaydı da geri alınır. PostgreSQL'de aynı anda başlayan
+    worker'lar bir advisory kilitle sıraya girer.
+    """
+    applied = []
+    await lock_schema(conn)
+    version = await current_version(conn)
+    for migration in MIGRATIONS:
+        if migration.version <= version:
+            continue
+        for statement in migration.statements:
+            await conn.execute(text(statement))
+        await conn.execute(
+            text("INSERT INTO schema_migrations (version, description) VALUES (:version, :description)"),
+            {"version": migration.version, "description": migration.description}
+        )
+        applied.append(migration.version)
+        logger.info("Şema sürümü %d uygulandı: %s", migration.version, migration.description)
+    return applied
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+from passlib.context import CryptContext
+from domain.errors import ChatError
+
+# Uygulama genelinde parola şeması (bcrypt)
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=int(os.getenv("CHAT_BCRYPT_ROUNDS", "12"))
+)
+
+class HasherOverloaded(ChatError):
+    """Bekleyen parola işi sınırı aşıldı"""
+
+class AsyncPasswordHasher:
+    """bcrypt hash/doğrulamayı olay döngüsü dışında, sınırlı bir havuzda çalıştırır
+
+    bcrypt bir çağrıda ~100-300 ms CPU harcar; döngüde çalışırsa düğümdeki
+    tüm soketleri bekletir. İşler ``max_workers`` iş parçacıklı havuza
+    gönderilir (bcrypt çalışırken GIL'i bırakır). Aynı anda en fazla
+    ``max_workers`` iş çalışır, en fazla ``max_pending`` iş sırada bekler;
+    fazlası ``HasherOverloaded`` ile hemen reddedilir. Sırada bekleme ve
+    çalışma süreleri ``queue_observer``/``work_observer`` ile dışarı aktarılır.
+    """
+
+    def __init__(
+        self,
+        context: CryptContext = pwd_context,
+        max_workers: Optional[int] = None,
+        max_pending: int = 256,
+        queue_observer: Optional[Callable[[float], None]] = None,
+        work_observer: Optional[Callable[[float], None]] = None
+    ):
+        self.context = context
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending
+        self.queue_observer = queue_observer
+        self.work_observer = work_observer
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hasher")
+        self._semaphore = asyncio.Semaphore(self.max_workers)
+        self.pending = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.queue_seconds_max = 0.0
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run(self.context.verify, password, hashed)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "workers": self.max_workers,
+            "pending": self.pending,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queue_max_ms": self.queue_seconds_max * 1000,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, func, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HasherOverloaded("Sunucu şu an meşgul, lütfen tekrar deneyin.")
+
+        queued = time.perf_counter()
+        self.pending += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            # Sırada beklerken iptal edilse de sıradan düşer
+            self.pending -= 1
+
+        started = time.perf_counter()
+        self._observe_queue(started - queued)
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._semaphore.release()
+            if self.work_observer is not None:
+                self.work_observer(time.perf_counter() - started)
+
+    def _observe_queue(self, waited: float) -> None:
+        if waited > self.queue_seconds_max:
+            self.queue_seconds_max = waited
+        if self.queue_observer is not None:
+            self.queue_observer(waited)
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Optional
+from adapters.repositories import PostgresSessionRepository
+
+logger = logging.getLogger(__name__)
+
+class SessionSweeper:
+    """Süresi dolmuş session'ları arka planda parça parça silen süpürücü
+
+    Her turda ``chunk_size`` satırlık küme tabanlı DELETE'ler ayrı
+    transaction'larda çalıştırılır; uzun süren tek bir transaction ya da
+    bellek patlaması olmaz. Parçalar arasında döngüye sıra verilir ve bir tur
+    ``max_chunks`` parçayla sınırlanır, kalanlar bir sonraki tura bırakılır.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        interval: float = 60.0,
+        chunk_size: int = 5000,
+        max_chunks: Optional[int] = 200,
+        chunk_pause: float = 0.0
+    ):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks
+        self.chunk_pause = chunk_pause
+        self.runs = 0
+        self.failed_runs = 0
+        self.total_deleted = 0
+        self.last_deleted = 0
+        self.last_chunks = 0
+        self.last_run_seconds = 0.0
+        self.last_run_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Periyodik süpürmeyi başlat"""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def sweep(self) -> int:
+        """Tek bir süpürme turu çalıştır, silinen satır sayısını döndür"""
+        started = time.perf_counter()
+        now = datetime.now()
+        deleted = 0
+        chunks = 0
+        while self.max_chunks is None or chunks < self.max_chunks:
+            async with self.session_factory() as session:
+                removed = await PostgresSessionRepository(session).delete_expired_chunk(now, self.chunk_size)
+            deleted += removed
+            chunks += 1
+            if removed < self.chunk_size:
+                break
+            await asyncio.sleep(self.chunk_pause)
+
+        self.runs += 1
+        self.total_deleted += deleted
+        self.last_deleted = deleted
+        self.last_chunks = chunks
+        self.last_run_seconds = time.perf_counter() - started
+        self.last_run_at = now
+        logger.info(
+            "Session süpürme: %d satır, %d parça, %.1f ms",
+            deleted, chunks, self.last_run_seconds * 1000
+        )
+        return deleted
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "runs": self.runs,
+            "failed_runs": self.failed_runs,
+            "total_deleted": self.total_deleted,
+            "last_deleted": self.last_deleted,
+            "last_chunks": self.last_chunks,
+            "last_run_ms": self.last_run_seconds * 1000,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+        }
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.failed_runs += 1
+                logger.exception("Session süpürme turu başarısız")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,204 @@
+import argparse
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Shard haritası değişikliklerinin duyurulduğu omurga kanalı
+SHARD_CHANNEL = "chat:shards"
+# Son duyurulan haritanın omurgada saklandığı anahtar; yeniden başlayan düğüm
+# ortam değişkenindeki ilk harita yerine bunu kullanır
+SHARD_MAP_KEY = "chat:shardmap"
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+def parse_shard_urls(value: str) -> Dict[str, str]:
+    """``a=ws://host:8001,b=ws://host:8002`` biçimindeki haritayı çöz"""
+    shards = {}
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        shard_id, _, url = item.partition("=")
+        shards[shard_id.strip()] = url.strip().rstrip("/")
+    return shards
+
+class HashRing:
+    """Sanal düğümlü tutarlı hash halkası
+
+    Bir düğüm eklendiğinde ya da çıkarıldığında anahtarların yalnızca yaklaşık
+    ``1/N`` kadarı yer değiştirir.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = 160):
+        self.vnodes = vnodes
+        self._nodes: set = set()
+        self._points: List[Tuple[int, str]] = []
+        self._keys: List[int] = []
+        for node in nodes:
+            self.add(node)
+
+    @property
+    def nodes(self) -> List[str]:
+        return sorted(self._nodes)
+
+    def add(self, node: str) -> None:
+        if node in self._nodes:
+            return
+        self._nodes.add(node)
+        for replica in range(self.vnodes):
+            self._points.append((_hash(f"{node}#{replica}"), node))
+        self._rebuild()
+
+    def remove(self, node: str) -> None:
+        if node not in self._nodes:
+            return
+        self._nodes.discard(node)
+        self._points = [point for point in self._points if point[1] != node]
+        self._rebuild()
+
+    def node_for(self, key: str) -> str:
+        if not self._points:
+            raise LookupError("Halkada düğüm yok")
+        index = bisect.bisect(self._keys, _hash(key)) % len(self._points)
+        return self._points[index][1]
+
+    def _rebuild(self) -> None:
+        self._points.sort()
+        self._keys = [point[0] for point in self._points]
+
+class ShardRouter:
+    """Odaları shard'lara dağıtan ve yanlış shard'a gelen bağlantıları yönlendiren yönlendirici
+
+    Her shard ayrı bir süreçtir (kendi olay döngüsü ve çekirdeği); sahip
+    olduğu odaların üyelerini ve geçmişini yalnızca o tutar, böylece odalar
+    arası trafik omurgadan geçmez. Shard haritası değiştiğinde bu düğümden
+    taşınan odaların üyelerine yeni adresle ``redirect`` çerçevesi gönderilir.
+    Çalışırken duyurulan harita omurgada saklanır (``SHARD_MAP_KEY``);
+    ``CHAT_SHARD_URLS`` yalnızca hiç duyuru yapılmamışsa geçerlidir. Halka
+    boşsa oda yerelde sunulur.
+    """
+
+    def __init__(self, shard_id: str, shard_urls: Dict[str, str], vnodes: int = 160):
+        if shard_id not in shard_urls:
+            raise ValueError(f"Shard haritasında bu düğüm yok: {shard_id}")
+        self.shard_id = shard_id
+        self.shard_urls = dict(shard_urls)
+        self.ring = HashRing(self.shard_urls, vnodes)
+        self.redirects = 0
+        self.rebalances = 0
+        self._chat_use_case = None
+
+    @classmethod
+    def from_env(cls) -> Optional["ShardRouter"]:
+        """CHAT_SHARD_ID ve CHAT_SHARD_URLS tanımlı değilse None (tek shard)"""
+        shard_id = os.getenv("CHAT_SHARD_ID")
+        shard_urls = os.getenv("CHAT_SHARD_URLS")
+        if not shard_id or not shard_urls:
+            return None
+        return cls(shard_id, parse_shard_urls(shard_urls))
+
+    def owner(self, room_id: str) -> str:
+        if not self.ring.nodes:
+            return self.shard_id
+        return self.ring.node_for(room_id)
+
+    def is_local(self, room_id: str) -> bool:
+        return self.owner(room_id) == self.shard_id
+
+    def redirect_frame(self, room_id: str) -> dict:
+        self.redirects += 1
+        owner = self.owner(room_id)
+        return {
+            "type": "redirect",
+            "shard": owner,
+            "url": self.shard_urls[owner],
+            "content": "Oda başka bir sunucuya taşındı, yeniden bağlanılıyor...",
+        }
+
+    def update(self, shard_urls: Dict[str, str]) -> None:
+        """Shard haritasını değiştir; halkada yalnızca farklar işlenir"""
+        for shard_id in set(self.shard_urls) - set(shard_urls):
+            self.ring.remove(shard_id)
+        for shard_id in set(shard_urls) - set(self.shard_urls):
+            self.ring.add(shard_id)
+        self.shard_urls = dict(shard_urls)
+
+    async def rebalance(self, chat_use_case) -> List[str]:
+        """Artık bu shard'a ait olmayan odaları bırak, taşınan odaları döndür"""
+        moved = [room_id for room_id in list(chat_use_case.rooms) if not self.is_local(room_id)]
+        for room_id in moved:
+            await chat_use_case.release_room(room_id, self.redirect_frame(room_id))
+        if moved:
+            self.rebalances += 1
+            logger.info("Shard %s: %d oda taşındı", self.shard_id, len(moved))
+        return moved
+
+    async def attach(self, backplane, chat_use_case) -> None:
+        """Omurgadan gelen shard haritası duyurularını dinle, son duyuruyu uygula"""
+        self._chat_use_case = chat_use_case
+        await backplane.subscribe(SHARD_CHANNEL, self._on_shard_map)
+        try:
+            stored = await backplane.lookup(SHARD_MAP_KEY)
+        except (OSError, asyncio.IncompleteReadError, RuntimeError) as exc:
+            logger.warning("Saklı shard haritası okunamadı, ortamdaki harita kullanılıyor: %s", exc)
+            return
+        if stored is not None:
+            await self._on_shard_map(SHARD_CHANNEL, stored)
+
+    async def _on_shard_map(self, channel: str, data: str) -> None:
+        shard_urls = json.loads(data)
+        if not shard_urls:
+            # Boş harita tüm odaları sahipsiz bırakır; yanlış duyuru sayılır
+            logger.warning("Boş shard haritası yok sayıldı")
+            return
+        if shard_urls == self.shard_urls:
+            return
+        if self.shard_id not in shard_urls:
+            # Bu düğüm haritadan çıkarıldı: tüm odalar başka shard'lara gider
+            logger.warning("Shard %s yeni haritada yok, tüm odalar bırakılıyor", self.shard_id)
+        self.update(shard_urls)
+        await self.rebalance(self._chat_use_case)
+
+    def stats(self) -> dict:
+        return {
+            "shard_id": self.shard_id,
+            "shards": self.ring.nodes,
+            "redirects": self.redirects,
+            "rebalances": self.rebalances,
+        }
+
+async def announce(backplane, shard_urls: Dict[str, str]) -> None:
+    """Yeni shard haritasını sakla ve tüm düğümlere duyur"""
+    if not shard_urls:
+        raise ValueError("Shard haritası boş olamaz")
+    data = json.dumps(shard_urls)
+    await backplane.store(SHARD_MAP_KEY, data)
+    await backplane.publish(SHARD_CHANNEL, data)
+
+def main() -> None:
+    from infrastructure.backplane import create_backplane
+
+    parser = argparse.ArgumentParser(description="Yeni shard haritasını duyur")
+    parser.add_argument("--backplane", default=os.getenv("CHAT_BACKPLANE_URL"), required=not os.getenv("CHAT_BACKPLANE_URL"))
+    parser.add_argument("shards", help="a=ws://host:8001,b=ws://host:8002")
+    args = parser.parse_args()
+
+    async def run():
+        backplane = create_backplane(args.backplane)
+        await backplane.start()
+        try:
+            await announce(backplane, parse_shard_urls(args.shards))
+        finally:
+            await backplane.close()
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    main()
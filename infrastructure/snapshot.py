@@ -0,0 +1,93 @@
+import fcntl
+import logging
+import os
+import time
+import zlib
+from typing import Optional
+from domain.codec import get_codec
+
+logger = logging.getLogger(__name__)
+
+# Dosya başlığı: biçim sürümü değişirse eski dosyalar yok sayılır
+MAGIC = b"CHATSNP1"
+
+def save_snapshot(path: str, state: dict) -> int:
+    """Durumu MessagePack + zlib olarak atomik biçimde yaz, yazılan bayt sayısını döndür"""
+    data = MAGIC + zlib.compress(get_codec("msgpack").encode(state), 6)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    
+    # Yarım yazılmış dosya hiçbir zaman asıl adla görünmesin
+    # Aynı dizine yazan diğer süreçlerin geçici dosyasıyla çakışmasın
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as handle:
+        handle.write(data)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(temp_path, path)
+    return len(data)
+
+def load_snapshot(path: str, max_age: Optional[float] = None) -> Optional[dict]:
+    """Anlık görüntüyü oku; yoksa, bozuksa ya da ``max_age``'den eskiyse None
+    
+    Okunan dosya ``.loaded`` uzantısıyla kenara alınır; sonraki bir çökme
+    sonrası aynı durum ikinci kez yüklenmez.
+    """
+    try:
+        with open(path, "rb") as handle:
+            data = handle.read()
+    except FileNotFoundError:
+        return None
+    
+    os.replace(path, f"{path}.loaded")
+    if not data.startswith(MAGIC):
+        logger.warning("Tanınmayan anlık görüntü biçimi: %s", path)
+        return None
+    try:
+        state = get_codec("msgpack").decode(zlib.decompress(data[len(MAGIC):]))
+    except (zlib.error, ValueError, IndexError) as exc:
+        logger.warning("Anlık görüntü okunamadı (%s): %s", path, exc)
+        return None
+    
+    if max_age is not None and time.time() - state.get("saved_at", 0) > max_age:
+        logger.info("Anlık görüntü çok eski, yok sayıldı: %s", path)
+        return None
+    return state
+
+class SnapshotSlot:
+    """Aynı ``CHAT_SNAPSHOT_PATH``'i paylaşan worker'lar için ayrı dosya yuvası
+
+    ``--workers N`` ile her worker aynı yolu yazıp birbirinin anlık
+    görüntüsünü ezerdi. Her süreç ``<yol>.lock``, ``<yol>.1.lock``, ...
+    kilitlerinden boştaki ilkini süreç ömrü boyunca tutar ve ona karşılık
+    gelen dosyayı (``<yol>``, ``<yol>.1``, ...) yazar/okur. Yeniden
+    başlatılan N worker aynı N yuvayı alır; tek worker'da yol değişmez.
+    """
+
+    def __init__(self, path: str, handle):
+        self.path = path
+        self._handle = handle
+
+    @classmethod
+    def acquire(cls, path: str, max_slots: int = 64) -> Optional["SnapshotSlot"]:
+        """Boştaki ilk yuvayı kilitle; hepsi doluysa None"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        for slot in range(max_slots):
+            slot_path = path if slot == 0 else f"{path}.{slot}"
+            handle = open(f"{slot_path}.lock", "a")
+            try:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                handle.close()
+                continue
+            return cls(slot_path, handle)
+        return None
+
+    def release(self) -> None:
+        if self._handle is not None:
+            # Kilit dosyası kapatılınca bırakılır
+            self._handle.close()
+            self._handle = None
@@ -0,0 +1,112 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Başka worker'lara iptal duyurusu için omurga kanalı
+REVOCATION_CHANNEL = "auth:revoked"
+
+_MISS = object()
+
+def token_digest(token: str) -> str:
+    """Token'ın kendisi yerine önbellek anahtarı olarak kullanılan özet"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+class TokenCache:
+    """Doğrulanmış JWT'ler için sınırlı, süre farkında önbellek
+
+    Olumlu kayıtlar token'ın ``exp`` zamanına kadar, olumsuz kayıtlar
+    ``negative_ttl`` saniye tutulur. İptal duyurularını taşıyan bir omurga
+    bağlı değilse başka bir worker'daki iptal buraya ulaşmaz; olumlu kayıtlar
+    da en fazla ``local_ttl`` saniye tutulur. ``revoke`` edilen bir token için kayıt
+    iptal işareti olarak kalır; eşzamanlı bir doğrulama onu olumlu kayıtla
+    ezemez.
+    """
+
+    def __init__(self, max_size: int = 50_000, negative_ttl: float = 5.0, revoked_ttl: float = 86_400.0,
+                 local_ttl: float = 60.0):
+        self.max_size = max_size
+        self.negative_ttl = negative_ttl
+        self.local_ttl = local_ttl
+        self.revoked_ttl = revoked_ttl
+        # özet -> (değer, son geçerlilik (time.time), iptal edildi mi)
+        self._entries: "OrderedDict[str, Tuple[Any, float, bool]]" = OrderedDict()
+        self.backplane = None
+        self.hits = 0
+        self.misses = 0
+        self.revocations = 0
+
+    def get(self, digest: str):
+        """Kayıt yoksa ``MISS`` döndürür; olumsuz kayıtlar için saklanan hata/None"""
+        entry = self._entries.get(digest)
+        if entry is None:
+            self.misses += 1
+            return _MISS
+
+        value, expires_at, _ = entry
+        if expires_at <= time.time():
+            del self._entries[digest]
+            self.misses += 1
+            return _MISS
+
+        self._entries.move_to_end(digest)
+        self.hits += 1
+        return value
+
+    def put(self, digest: str, value: Any, expires_at: float) -> None:
+        """Olumlu kaydı token'ın ``exp`` zamanına kadar sakla"""
+        current = self._entries.get(digest)
+        if current is not None and current[2]:
+            return
+        if self.backplane is None:
+            expires_at = min(expires_at, time.time() + self.local_ttl)
+        self._store(digest, value, expires_at, False)
+
+    def put_negative(self, digest: str, value: Any = None) -> None:
+        current = self._entries.get(digest)
+        if current is not None and current[2]:
+            return
+        self._store(digest, value, time.time() + self.negative_ttl, False)
+
+    def invalidate_local(self, digest: str, until: Optional[float] = None) -> None:
+        """Kaydı bu süreçte iptal edilmiş olarak işaretle"""
+        current = self._entries.get(digest)
+        if until is None:
+            until = current[1] if current is not None and not current[2] else time.time() + self.revoked_ttl
+        self._store(digest, None, until, True)
+        self.revocations += 1
+
+    async def revoke(self, digest: str, until: Optional[float] = None) -> None:
+        """Yerel olarak iptal et ve omurga varsa diğer worker'lara duyur"""
+        self.invalidate_local(digest, until)
+        if self.backplane is not None:
+            await self.backplane.publish(REVOCATION_CHANNEL, digest)
+
+    async def attach(self, backplane) -> None:
+        """Diğer worker'lardan gelen iptalleri dinle"""
+        self.backplane = backplane
+        await backplane.subscribe(REVOCATION_CHANNEL, self._on_revoked)
+
+    async def _on_revoked(self, channel: str, digest: str) -> None:
+        self.invalidate_local(digest)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "revocations": self.revocations,
+        }
+
+    def _store(self, digest: str, value: Any, expires_at: float, revoked: bool) -> None:
+        self._entries[digest] = (value, expires_at, revoked)
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def is_miss(value) -> bool:
+        return value is _MISS
+
+# Tüm AuthService örneklerinin paylaştığı süreç içi önbellek
+token_cache = TokenCache()
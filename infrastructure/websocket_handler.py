@@ -1,33 +1,73 @@
 import json
+import logging
 import uuid
+from typing import Optional
 from fastapi import WebSocket, WebSocketDisconnect
 from domain.use_cases import ChatUseCase
+from domain.errors import ChatError
+from domain.codec import get_codec
+from domain.rate_limit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+def _optional_int(value) -> Optional[int]:
+    """İstemciden gelen sayısal alanı güvenle çöz"""
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
 
 class WebSocketHandler:
     """WebSocket bağlantılarını yöneten handler"""
     
-    def __init__(self, chat_use_case: ChatUseCase):
+    def __init__(
+        self,
+        chat_use_case: ChatUseCase,
+        shard_router=None,
+        rate_limiter: Optional[RateLimiter] = None,
+        reconnect_after_ms: int = 1000,
+        reconnect_jitter_ms: int = 5000
+    ):
         self.chat_use_case = chat_use_case
+        # Boşaltma sırasında gelen bağlantılara önerilen yeniden bağlanma süresi
+        self.reconnect_after_ms = reconnect_after_ms
+        self.reconnect_jitter_ms = reconnect_jitter_ms
+        # Gelen çerçeveler send_message'dan önce sınırlanır (None = sınırsız)
+        self.rate_limiter = rate_limiter
+        # Odalar shard'lara dağıtılmışsa sahip olmayan düğüm yönlendirir
+        self.shard_router = shard_router
     
     async def handle_connection(self, websocket: WebSocket, room_id: str, username: str):
         """WebSocket bağlantısını kabul et ve yönet"""
         await websocket.accept()
         
+        if self.chat_use_case.draining:
+            # Kapanmakta olan düğüm yeni bağlantı almaz; istemci birazdan yeniden dener
+            await websocket.send_text(json.dumps(self.chat_use_case.reconnect_frame(self.reconnect_after_ms, self.reconnect_jitter_ms)))
+            await websocket.close(code=1012)
+            return
+        
+        if self.shard_router is not None and not self.shard_router.is_local(room_id):
+            await websocket.send_text(json.dumps(self.shard_router.redirect_frame(room_id)))
+            await websocket.close()
+            return
+        
         # Benzersiz bağlantı ID'si oluştur
         connection_id = str(uuid.uuid4())
         
         try:
-            # İlk mesaj olarak şifre bekliyoruz
+            # İlk mesaj olarak şifre (ve isteğe bağlı codec) bekliyoruz
             password_data = await websocket.receive_text()
             password_info = json.loads(password_data)
             password = password_info.get("password")
+            codec = get_codec(password_info.get("codec"))
             
             # None değerini boş string yap
             if password is None:
                 password = ""
             
             # Chat use case'e bağlantıyı ekle
-            self.chat_use_case.add_connection(connection_id, websocket)
+            self.chat_use_case.add_connection(connection_id, websocket, codec=codec.name)
             
             # Odaya katıl
             room = await self.chat_use_case.join_room(
@@ -38,18 +78,58 @@ class WebSocketHandler:
             )
             
             # Başarılı bağlantı mesajı
-            await websocket.send_text(json.dumps({
+            # Sıralama korunsun diye giden kuyruk üzerinden gönder
+            await self.chat_use_case.send_to_connection(connection_id, {
                 "type": "connected",
-                "content": f"Odaya başarıyla katıldınız! Odada {room.user_count} kişi var."
-            }))
+                "content": f"Odaya başarıyla katıldınız! Odada {room.user_count} kişi var.",
+                "codec": codec.name
+            })
+            
+            # Son mesajları tek çerçevede gönder
+            await self.chat_use_case.replay_history(connection_id, room_id)
             
             # Mesaj döngüsü
             while True:
-                data = await websocket.receive_text()
-                message_data = json.loads(data)
+                data = await self._receive_frame(websocket)
+                try:
+                    message_data = codec.decode(data)
+                except Exception:
+                    message_data = None
+                if not isinstance(message_data, dict):
+                    # Bozuk çerçeve bağlantıyı düşürmez
+                    await self.chat_use_case.send_to_connection(connection_id, {
+                        "type": "error",
+                        "content": "Geçersiz mesaj biçimi!"
+                    })
+                    continue
+                
+                if message_data.get("type") == "load_older":
+                    if not await self._admit(connection_id, None):
+                        continue
+                    await self.chat_use_case.load_older(
+                        connection_id=connection_id,
+                        room_id=room_id,
+                        before_id=_optional_int(message_data.get("before_id")),
+                        limit=_optional_int(message_data.get("limit"))
+                    )
+                    continue
+                
+                if message_data.get("type") == "search":
+                    if not await self._admit(connection_id, None):
+                        continue
+                    await self.chat_use_case.search(
+                        connection_id=connection_id,
+                        room_id=room_id,
+                        query=str(message_data.get("query") or ""),
+                        limit=_optional_int(message_data.get("limit"))
+                    )
+                    continue
+                
                 message_content = message_data.get("message", "")
                 
                 if message_content:
+                    if not await self._admit(connection_id, room_id):
+                        continue
                     await self.chat_use_case.send_message(
                         connection_id=connection_id,
                         room_id=room_id,
@@ -58,22 +138,52 @@ class WebSocketHandler:
                     
         except WebSocketDisconnect:
             # Bağlantı koptu
-            await self.chat_use_case.leave_room(connection_id, room_id)
-        except ValueError as e:
-            # Hata durumu (örn: yanlış şifre)
-            await websocket.send_text(json.dumps({
-                "type": "error",
-                "content": str(e)
-            }))
-            await websocket.close()
-        except Exception as e:
-            # Genel hata
-            print(f"WebSocket error: {e}")
-            await websocket.send_text(json.dumps({
-                "type": "error",
-                "content": "Bir hata oluştu!"
-            }))
-            await websocket.close()
+            pass
+        except ChatError as e:
+            # İş kuralı hatası (örn: yanlış şifre); metni istemciye gösterilebilir
+            await self._close_with_error(websocket, str(e))
+        except Exception:
+            # İç hatanın ayrıntısı yalnızca loglanır
+            logger.exception("WebSocket hatası (%s)", connection_id)
+            await self._close_with_error(websocket, "Bir hata oluştu!")
         finally:
-            # Bağlantıyı temizle
-            self.chat_use_case.remove_connection(connection_id)
+            # Bağlantı hangi yoldan biterse bitsin odalarda hayalet üye kalmasın
+            try:
+                await self.chat_use_case.leave_all_rooms(connection_id)
+            finally:
+                self.chat_use_case.remove_connection(connection_id)
+                if self.rate_limiter is not None:
+                    self.rate_limiter.forget_connection(connection_id)
+                    if room_id not in self.chat_use_case.rooms:
+                        self.rate_limiter.forget_room(room_id)
+    
+    @staticmethod
+    async def _close_with_error(websocket: WebSocket, content: str) -> None:
+        try:
+            await websocket.send_text(json.dumps({"type": "error", "content": content}))
+            await websocket.close()
+        except Exception:
+            # Soket zaten kapanmış olabilir
+            pass
+    
+    async def _admit(self, connection_id: str, room_id: Optional[str]) -> bool:
+        """Kovalarda yer yoksa çerçeveyi düşür ve gerekirse istemciyi uyar"""
+        limiter = self.rate_limiter
+        if limiter is None or limiter.allow(connection_id, room_id):
+            return True
+        if limiter.should_notify(connection_id):
+            await self.chat_use_case.send_to_connection(connection_id, {
+                "type": "slow_down",
+                "content": "Çok hızlı mesaj gönderiyorsunuz, bazı mesajlarınız iletilmedi.",
+                "retry_after_ms": int(limiter.retry_after(connection_id, room_id) * 1000)
+            })
+        return False
+    
+    async def _receive_frame(self, websocket: WebSocket):
+        """Metin ya da ikili çerçeveyi olduğu gibi al"""
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", 1000))
+        if message.get("bytes") is not None:
+            return message["bytes"]
+        return message["text"]
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from infrastructure.backplane import RedisBackplane, read_reply
+
+
+async def _fake_redis(stall: asyncio.Event):
+    """PUBLISH'e :1 ile yanıt veren; ``stall`` kuruluyken susan RESP sunucusu"""
+    async def handle(reader, writer):
+        try:
+            while True:
+                command = await read_reply(reader)
+                if stall.is_set():
+                    continue
+                if command[0] == b"PUBLISH":
+                    writer.write(b":1\r\n")
+                else:
+                    writer.write(b"-ERR unknown command\r\n")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+def test_requests_are_pipelined_and_errors_stay_per_command():
+    async def scenario():
+        server, port = await _fake_redis(asyncio.Event())
+        backplane = RedisBackplane(f"redis://127.0.0.1:{port}", request_timeout=1.0)
+        await backplane.start()
+        replies = await asyncio.gather(
+            backplane._request("PUBLISH", "a", "1"),
+            backplane._request("FLUSHALL"),
+            backplane._request("PUBLISH", "b", "2"),
+            return_exceptions=True
+        )
+        assert replies[0] == 1 and replies[2] == 1
+        assert isinstance(replies[1], RuntimeError)
+        await backplane.close()
+        server.close()
+
+    asyncio.run(scenario())
+
+
+def test_silent_server_times_out_and_reconnects():
+    async def scenario():
+        stall = asyncio.Event()
+        server, port = await _fake_redis(stall)
+        backplane = RedisBackplane(f"redis://127.0.0.1:{port}", request_timeout=0.05)
+        await backplane.start()
+        stall.set()
+        with pytest.raises(OSError):
+            await backplane._request("PUBLISH", "a", "1")
+        # Yayın hatası yutulur, gönderen beklemede kalmaz
+        await backplane.publish("a", "2")
+        assert backplane.published == 0
+
+        stall.clear()
+        await backplane.publish("a", "3")
+        assert backplane.published == 1
+        await backplane.close()
+        server.close()
+
+    asyncio.run(scenario())
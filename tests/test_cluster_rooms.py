@@ -0,0 +1,137 @@
+import asyncio
+import json
+
+from domain.use_cases import ChatUseCase
+from infrastructure.backplane import InMemoryBackplane
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.frames = []
+        self.closed = False
+
+    async def send_text(self, frame):
+        self.frames.extend(_contents(frame))
+
+    async def send_bytes(self, frame):
+        raise AssertionError("JSON codec bekleniyordu")
+
+    async def close(self, code: int = 1000):
+        self.closed = True
+
+
+def _contents(frame):
+    data = json.loads(frame)
+    return [item.get("content") for item in (data if isinstance(data, list) else [data])]
+
+
+async def _connect(node: ChatUseCase, connection_id: str, username: str, room_id: str = "oda") -> FakeWebSocket:
+    websocket = FakeWebSocket()
+    node.add_connection(connection_id, websocket)
+    await node.join_room(username, connection_id, room_id)
+    return websocket
+
+
+def test_last_local_member_leaving_keeps_room_open_elsewhere():
+    async def scenario():
+        backplane = InMemoryBackplane()
+        first, second = ChatUseCase(backplane=backplane), ChatUseCase(backplane=backplane)
+        alice = await _connect(first, "a", "alice")
+        await _connect(first, "d", "dave")
+        bob = await _connect(second, "b", "bob")
+
+        # Yerelde tek kişi kalıyor ama odada toplam iki kişi var
+        await first.leave_room("d", "oda")
+        await asyncio.sleep(0.01)
+        assert first.rooms["oda"].has_user("a")
+        assert "dave odadan ayrıldı!" in alice.frames
+        assert "dave odadan ayrıldı!" in bob.frames
+
+        # Bu düğümün son üyesi gidiyor; oda diğer düğümde sürmez çünkü tek kişi kalır
+        await first.leave_room("a", "oda")
+        await asyncio.sleep(0.01)
+        assert "oda" not in first.rooms
+        assert "oda" not in second.rooms
+        assert "Odada yeterli kişi kalmadığı için oda kapatıldı." in bob.frames
+        assert second.rooms_for("b") == set()
+        assert backplane._claims == {} and backplane._members == {}
+
+    asyncio.run(scenario())
+
+
+def test_node_without_members_leaves_active_room():
+    async def scenario():
+        backplane = InMemoryBackplane()
+        first, second = ChatUseCase(backplane=backplane), ChatUseCase(backplane=backplane)
+        await _connect(first, "a", "alice")
+        bob = await _connect(second, "b", "bob")
+        await _connect(second, "c", "carol")
+
+        await first.leave_room("a", "oda")
+        await asyncio.sleep(0.01)
+        assert "oda" not in first.rooms
+        assert second.rooms["oda"].user_count == 2
+        assert "alice odadan ayrıldı!" in bob.frames
+        assert await backplane.set_members(second._claim_key("oda"), second.node_id, 2, 60) == 2
+
+    asyncio.run(scenario())
+
+
+class CountingHasher:
+    """bcrypt yerine sayaçlı, ters çeviren sahte hasher"""
+
+    def __init__(self):
+        self.hashes = 0
+        self.verifies = 0
+
+    async def hash(self, password):
+        self.hashes += 1
+        return "h:" + password
+
+    async def verify(self, password, hashed):
+        self.verifies += 1
+        return hashed == "h:" + password
+
+
+def test_joining_room_from_another_node_does_not_hash():
+    async def scenario():
+        backplane = InMemoryBackplane()
+        first_hasher, second_hasher = CountingHasher(), CountingHasher()
+        first = ChatUseCase(backplane=backplane, password_hasher=first_hasher)
+        second = ChatUseCase(backplane=backplane, password_hasher=second_hasher)
+        first.add_connection("a", FakeWebSocket())
+        await first.join_room("alice", "a", "oda", "gizli")
+        assert first_hasher.hashes == 1
+
+        second.add_connection("x", FakeWebSocket())
+        try:
+            await second.join_room("mallory", "x", "oda", "yanlış")
+            raise AssertionError("yanlış parola kabul edildi")
+        except ValueError as exc:
+            assert str(exc) == "Yanlış şifre!"
+        # Yerel kopya hiç kurulmadı, omurga kaydına da eklenmedi
+        assert "oda" not in second.rooms
+        assert backplane._claims[first._claim_key("oda")][1] == {first.node_id}
+
+        second.add_connection("b", FakeWebSocket())
+        await second.join_room("bob", "b", "oda", "gizli")
+        assert second_hasher.hashes == 0
+        assert second_hasher.verifies == 2
+        assert second.rooms["oda"].has_user("b")
+
+    asyncio.run(scenario())
+
+
+def test_wrong_password_keeps_restored_empty_room():
+    async def scenario():
+        node = ChatUseCase(password_hasher=CountingHasher())
+        state = {"rooms": [["oda", "h:gizli", 0.0, ["alice"]]], "history": {}}
+        assert await node.restore_state(state, grace=60) == 1
+        node.add_connection("x", FakeWebSocket())
+        try:
+            await node.join_room("mallory", "x", "oda", "yanlış")
+        except ValueError:
+            pass
+        assert "oda" in node.rooms
+
+    asyncio.run(scenario())
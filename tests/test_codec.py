@@ -0,0 +1,54 @@
+import pytest
+
+from domain import codec as codec_module
+from domain.codec import get_codec
+
+PAYLOAD = {
+    "type": "history",
+    "messages": [
+        {"id": 1, "username": "ayşe", "content": "Merhaba İstanbul 🌉", "timestamp": 1700000000.25, "message_type": "text"},
+        {"id": 70000, "username": "ali", "content": "x" * 300, "timestamp": -1.5, "message_type": "system"},
+    ],
+    "has_more": False,
+    "cursor": None,
+    "counts": [0, -1, -33, 255, 65536, 2 ** 40, -(2 ** 40)],
+}
+
+
+@pytest.mark.parametrize("name", ["json", "msgpack"])
+def test_round_trip(name):
+    codec = get_codec(name)
+    frame = codec.encode(PAYLOAD)
+    assert isinstance(frame, bytes if codec.binary else str)
+    assert codec.decode(frame) == PAYLOAD
+
+
+@pytest.mark.parametrize("name", ["json", "msgpack"])
+def test_join_produces_array_frame(name):
+    codec = get_codec(name)
+    frames = [codec.encode({"i": i}) for i in range(20)]
+    assert codec.decode(codec.join(frames)) == [{"i": i} for i in range(20)]
+
+
+def test_cacheable_frames_are_reused():
+    codec = codec_module.JsonCodec(cache_size=1)
+    first = codec.encode({"type": "system", "content": "oda kapandı"}, cacheable=True)
+    assert codec.encode({"type": "system", "content": "oda kapandı"}, cacheable=True) is first
+    codec.encode({"type": "system", "content": "başka"}, cacheable=True)
+    assert len(codec._cache) == 1
+
+
+def test_msgpack_accepts_text_frames_and_unknown_codec_falls_back():
+    assert get_codec("msgpack").decode('{"password": null}') == {"password": None}
+    assert get_codec("yok").name == "json"
+
+
+def test_pure_python_fallback_matches_c_library(monkeypatch):
+    pytest.importorskip("msgpack")
+    codec = get_codec("msgpack")
+    expected = codec.encode(PAYLOAD)
+    monkeypatch.setattr(codec_module, "msgpack", None)
+    assert codec.encode(PAYLOAD) == expected
+    assert codec.decode(expected) == PAYLOAD
+    with pytest.raises(ValueError):
+        codec.decode(expected + b"\x00")
@@ -0,0 +1,65 @@
+from domain.entities import MessageType
+from domain.history import MessageHistory, RoomHistory
+
+
+def _fill(history: MessageHistory, room_id: str, count: int, content: str = "mesaj") -> None:
+    for i in range(count):
+        history.append_entry(room_id, "ali", f"{content} {i}", float(i), MessageType.TEXT)
+
+
+def test_room_limit_evicts_oldest_and_ids_keep_growing():
+    history = MessageHistory(room_limit=3)
+    _fill(history, "oda", 5)
+    assert [entry.id for entry in history.recent("oda", 10)] == [3, 4, 5]
+    assert history.get("oda").next_id == 6
+
+
+def test_keyset_paging():
+    history = MessageHistory(room_limit=10)
+    _fill(history, "oda", 7)
+    page = history.before("oda", None, 3)
+    assert [entry.id for entry in page] == [5, 6, 7]
+    page = history.before("oda", page[0].id, 3)
+    assert [entry.id for entry in page] == [2, 3, 4]
+    assert [entry.id for entry in history.before("oda", page[0].id, 3)] == [1]
+    assert history.before("oda", 1, 3) == []
+    assert history.before("yok", None, 3) == []
+
+
+def test_paging_with_id_gaps_after_restore():
+    room = RoomHistory(limit=10)
+    room.restore([[entry_id, "ali", "x", 0.0, MessageType.TEXT.value] for entry_id in (2, 5, 9)])
+    assert [entry.id for entry in room.before(9, 10)] == [2, 5]
+    assert [entry.id for entry in room.before(6, 1)] == [5]
+    assert room.next_id == 10
+
+
+def test_memory_budget_evicts_least_recently_used_room():
+    history = MessageHistory(room_limit=100, memory_budget=10_000)
+    _fill(history, "eski", 10)
+    _fill(history, "yeni", 10)
+    # "eski" okununca en yakın zamanda kullanılan olur
+    history.recent("eski", 1)
+    _fill(history, "üçüncü", 50)
+
+    assert "yeni" not in history
+    assert "eski" in history and "üçüncü" in history
+    assert history.bytes <= 10_000
+    assert history.evicted_rooms == 1
+    assert history.bytes == sum(room.bytes for room in history.rooms.values())
+
+
+def test_export_restore_round_trip_and_index_shrinks_with_buffer():
+    history = MessageHistory(room_limit=2, indexed=True)
+    history.append_entry("oda", "ali", "elma armut", 1.0, MessageType.TEXT)
+    history.append_entry("oda", "veli", "armut", 2.0, MessageType.TEXT)
+    history.append_entry("oda", "ali", "kiraz", 3.0, MessageType.TEXT)
+    # "elma" içeren kayıt tampondan düştü; indekste de kalmamalı
+    assert history.search("oda", "elma", 10) == []
+    assert [entry.id for entry in history.search("oda", "arm", 10)] == [2]
+
+    copy = MessageHistory(room_limit=2, indexed=True)
+    copy.restore(history.export())
+    assert [entry.to_dict() for entry in copy.recent("oda", 5)] == [entry.to_dict() for entry in history.recent("oda", 5)]
+    assert copy.append_entry("oda", "ali", "yeni", 4.0, MessageType.TEXT).id == 4
+    assert copy.bytes == copy.get("oda").bytes
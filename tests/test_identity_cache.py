@@ -0,0 +1,85 @@
+import asyncio
+
+from adapters.identity_cache import IdentityCache
+from adapters.repositories import PostgresRoomRepository, PostgresUserRepository
+
+
+class _Result:
+    def __init__(self, row):
+        self.row = row
+
+    def scalar_one_or_none(self):
+        return self.row
+
+
+class FakeSession:
+    """Tek satır döndüren, commit'i isteğe bağlı başarısız olan oturum"""
+
+    def __init__(self, row=object(), fail_commit=False):
+        self.row = row
+        self.fail_commit = fail_commit
+        self.deleted = []
+
+    async def execute(self, statement):
+        return _Result(self.row)
+
+    async def delete(self, row):
+        self.deleted.append(row)
+
+    async def flush(self):
+        pass
+
+    async def commit(self):
+        if self.fail_commit:
+            raise RuntimeError("commit başarısız")
+
+
+def test_cache_expires_and_evicts(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("adapters.identity_cache.time.monotonic", lambda: now[0])
+    cache = IdentityCache(max_size=2, ttl=10)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    # En az yakın zamanda kullanılan düşer
+    assert cache.get("b") is None and cache.evictions == 1
+    now[0] += 11
+    assert cache.get("a") is None
+    assert len(cache) == 1
+
+
+def test_delete_invalidates_only_after_commit():
+    async def scenario():
+        user_ids, room_ids = IdentityCache(), IdentityCache()
+        user_ids.put("c1", 7)
+        room_ids.put("oda", 3)
+
+        failing = PostgresUserRepository(FakeSession(fail_commit=True), user_ids, room_ids)
+        try:
+            await failing.delete_user("c1")
+        except RuntimeError:
+            pass
+        # Silme geri alındı; satır hâlâ var, kimlik geçerli
+        assert user_ids.get("c1") == 7
+
+        await PostgresUserRepository(FakeSession(), user_ids, room_ids).delete_user("c1")
+        assert user_ids.get("c1") is None
+
+        await PostgresRoomRepository(FakeSession(), user_ids, room_ids).delete_room("oda")
+        assert room_ids.get("oda") is None
+
+    asyncio.run(scenario())
+
+
+def test_unit_of_work_delete_waits_for_commit():
+    async def scenario():
+        user_ids, room_ids = IdentityCache(), IdentityCache()
+        room_ids.put("oda", 3)
+        staged = []
+        repository = PostgresRoomRepository(FakeSession(), user_ids, room_ids, autocommit=False, staged=staged)
+        await repository.delete_room("oda")
+        assert room_ids.get("oda") == 3
+        assert staged == [(room_ids, "oda", None)]
+
+    asyncio.run(scenario())
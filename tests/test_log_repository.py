@@ -0,0 +1,158 @@
+import asyncio
+import os
+from datetime import datetime
+
+from adapters.log_repository import LogMessageRepository, RoomLog
+from domain.entities import User, Message, MessageType
+from domain.use_cases import ChatUseCase
+
+
+def _message(content: str, room_id: str = "oda", entry_id: int = None) -> Message:
+    return Message(
+        content=content,
+        sender=User(username="ayşe", connection_id="c1", joined_at=datetime(2024, 1, 1)),
+        message_type=MessageType.TEXT,
+        timestamp=datetime(2024, 1, 1, 12),
+        room_id=room_id,
+        id=entry_id
+    )
+
+
+def _row(content: str) -> list:
+    return ["ayşe", "c1", 0.0, content, 0.0, MessageType.TEXT.value]
+
+
+def _fill(directory: str, count: int, segment_bytes: int = 1 << 20) -> RoomLog:
+    log = RoomLog(directory, segment_bytes)
+    for i in range(count):
+        log.append(_row(f"mesaj {i}"))
+    return log
+
+
+def _files(directory: str, suffix: str) -> list:
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(suffix))
+
+
+def test_truncated_tail_is_cut_on_reopen(tmp_path):
+    log = _fill(str(tmp_path), 5)
+    log.close()
+    log_path = _files(str(tmp_path), ".log")[-1]
+    size = os.path.getsize(log_path)
+    # Son kaydın yarısı yazılmışken çökme
+    with open(log_path, "r+b") as handle:
+        handle.truncate(size - 3)
+
+    reopened = RoomLog(str(tmp_path), 1 << 20)
+    assert reopened.next_id == 5
+    assert [row[4] for row in reopened.before(None, 10)] == [f"mesaj {i}" for i in range(4)]
+    assert reopened.append(_row("yeni")) == 5
+    assert reopened.before(None, 1)[0][4] == "yeni"
+    reopened.close()
+
+
+def test_missing_index_is_rebuilt_from_log(tmp_path):
+    log = _fill(str(tmp_path), 7)
+    log.close()
+    index_path = _files(str(tmp_path), ".idx")[-1]
+    with open(index_path, "rb") as handle:
+        original = handle.read()
+    os.remove(index_path)
+
+    reopened = RoomLog(str(tmp_path), 1 << 20)
+    assert reopened.next_id == 8
+    assert [row[0] for row in reopened.before(None, 3)] == [5, 6, 7]
+    reopened.close()
+    with open(index_path, "rb") as handle:
+        assert handle.read() == original
+
+
+def test_unindexed_tail_records_are_recovered(tmp_path):
+    log = _fill(str(tmp_path), 4)
+    log.close()
+    # Kayıt log'a yazılmış ama indekse yazılamadan çökülmüş
+    index_path = _files(str(tmp_path), ".idx")[-1]
+    with open(index_path, "r+b") as handle:
+        handle.truncate(8 * 3)
+
+    reopened = RoomLog(str(tmp_path), 1 << 20)
+    assert reopened.next_id == 5
+    assert reopened.before(None, 1)[0][4] == "mesaj 3"
+    reopened.close()
+
+
+def test_clean_reopen_trusts_index(tmp_path, monkeypatch):
+    _fill(str(tmp_path), 10).close()
+    index_path = _files(str(tmp_path), ".idx")[-1]
+    modified = os.stat(index_path).st_mtime_ns
+
+    def fail(self):
+        raise AssertionError("temiz kapanmış segment taranmamalı")
+    monkeypatch.setattr("adapters.log_repository._Segment.recover", fail)
+
+    reopened = RoomLog(str(tmp_path), 1 << 20)
+    assert reopened.next_id == 11
+    reopened.close()
+    assert os.stat(index_path).st_mtime_ns == modified
+
+
+def test_id_gaps_start_new_segments(tmp_path):
+    log = RoomLog(str(tmp_path), 1 << 20)
+    assert log.append(_row("a"), 1) == 1
+    assert log.append(_row("b"), 2) == 2
+    # Bütçe yüzünden atlanan kimlikler: indeks ardışık kalsın diye yeni segment
+    assert log.append(_row("c"), 10) == 10
+    assert log.append(_row("d")) == 11
+    # Geriye giden kimlik yok sayılır
+    assert log.append(_row("e"), 5) == 12
+    log.close()
+    assert len(_files(str(tmp_path), ".log")) == 2
+
+    reopened = RoomLog(str(tmp_path), 1 << 20)
+    assert [row[0] for row in reopened.before(None, 10)] == [1, 2, 10, 11, 12]
+    assert [row[0] for row in reopened.before(10, 10)] == [1, 2]
+    assert [row[0] for row in reopened.before(None, 2)] == [11, 12]
+    reopened.close()
+
+
+def test_repository_opens_rooms_off_loop_and_keeps_order(tmp_path):
+    async def scenario():
+        repository = LogMessageRepository(str(tmp_path), max_open_rooms=1)
+        # Açılış sürerken gelen mesajlar sırayla bekletilir
+        for i in range(1, 4):
+            assert repository.enqueue(_message(f"m{i}", entry_id=i))
+        assert repository.stats()["opening_rooms"] == 1
+        messages = await repository.get_room_messages("oda")
+        assert [(message.id, message.content) for message in messages] == [(1, "m1"), (2, "m2"), (3, "m3")]
+
+        # LRU'dan düşen oda yeniden açıldığında kaldığı yerden devam eder
+        repository.enqueue(_message("başka", room_id="diğer", entry_id=1))
+        await repository.get_room_messages("diğer")
+        assert "oda" not in repository.rooms
+        repository.enqueue(_message("m4", entry_id=4))
+        messages = await repository.get_room_messages_before("oda", None, 2)
+        assert [message.id for message in messages] == [3, 4]
+        repository.close()
+
+    asyncio.run(scenario())
+
+
+def test_has_more_asks_the_store_not_the_id(tmp_path):
+    async def scenario():
+        repository = LogMessageRepository(str(tmp_path))
+        node = ChatUseCase(history_limit=2, history_replay=2, history_store=repository)
+        room = await node.join_room("ayşe", "a", "oda")
+        key = node._history_key(room)
+        # Günlük 5'ten başlıyor (örn. eski segmentler silinmiş)
+        for entry_id in (5, 6, 7):
+            repository.enqueue(_message(f"m{entry_id}", room_id=key, entry_id=entry_id))
+        older = await repository.get_room_messages_before(key, None, 3)
+        entries = [node._history_entry(message) for message in older]
+
+        assert (await node._history_frame("oda", entries[1:], "older"))["has_more"]
+        assert not (await node._history_frame("oda", entries, "older"))["has_more"]
+        assert await repository.has_messages_before(key, 6)
+        assert not await repository.has_messages_before(key, 5)
+        assert not await repository.has_messages_before("yok", 5)
+        repository.close()
+
+    asyncio.run(scenario())
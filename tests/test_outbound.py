@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+from domain.codec import get_codec
+from domain.outbound import ConnectionWriter, OverflowPolicy
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+        self.closed_with = None
+
+    async def send_text(self, frame):
+        self.sent.append(frame)
+
+    async def send_bytes(self, frame):
+        self.sent.append(frame)
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+
+
+def _fill(policy: OverflowPolicy, **kwargs) -> ConnectionWriter:
+    # Görev başlatılmadan kuyruk yalnızca dolar
+    writer = ConnectionWriter("c1", FakeWebSocket(), max_queue=2, policy=policy, **kwargs)
+    for frame in ("a", "b"):
+        assert writer.offer(frame)
+    return writer
+
+
+def test_drop_oldest_keeps_newest_frames():
+    async def scenario():
+        writer = _fill(OverflowPolicy.DROP_OLDEST)
+        assert writer.offer("c")
+        assert list(writer.queue) == ["b", "c"]
+        assert writer.stats()["dropped"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_drop_newest_rejects_incoming_frame():
+    async def scenario():
+        writer = _fill(OverflowPolicy.DROP_NEWEST)
+        assert not writer.offer("c")
+        assert list(writer.queue) == ["a", "b"]
+        assert writer.dropped == 1
+
+    asyncio.run(scenario())
+
+
+def test_disconnect_policy_reports_slow_client():
+    async def scenario():
+        failed = []
+        writer = _fill(OverflowPolicy.DISCONNECT, on_failure=failed.append)
+        assert not writer.offer("c")
+        assert failed == ["c1"]
+        assert writer.closed and not writer.queue
+        assert not writer.offer("d")
+
+    asyncio.run(scenario())
+
+
+def test_batch_window_joins_frames_and_finish_flushes_before_close():
+    async def scenario():
+        codec = get_codec("json")
+        websocket = FakeWebSocket()
+        writer = ConnectionWriter("c1", websocket, codec=codec, batch_window=0.05, max_batch=3)
+        writer.start()
+        for i in range(4):
+            writer.offer(codec.encode({"i": i}))
+        writer.finish(code=1012)
+        for _ in range(100):
+            if websocket.closed_with is not None:
+                break
+            await asyncio.sleep(0.01)
+
+        assert [json.loads(frame) for frame in websocket.sent] == [[{"i": 0}, {"i": 1}, {"i": 2}], {"i": 3}]
+        assert writer.sent == 4 and writer.batches == 1
+        assert websocket.closed_with == 1012
+
+    asyncio.run(scenario())
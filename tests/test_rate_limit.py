@@ -0,0 +1,55 @@
+from domain.rate_limit import RateLimiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_connection_bucket_refills_over_time():
+    clock = Clock()
+    limiter = RateLimiter(connection_rate=2, connection_burst=3, room_rate=0, clock=clock)
+    assert [limiter.allow("c1") for _ in range(4)] == [True, True, True, False]
+    assert limiter.retry_after("c1") == 0.5
+
+    clock.now += 0.5
+    assert limiter.allow("c1")
+    assert not limiter.allow("c1")
+    # Kova kapasitenin üstüne dolmaz
+    clock.now += 60
+    assert [limiter.allow("c1") for _ in range(4)] == [True, True, True, False]
+
+
+def test_rejected_frame_does_not_spend_room_tokens():
+    clock = Clock()
+    limiter = RateLimiter(connection_rate=1, connection_burst=1, room_rate=1, room_burst=2, clock=clock)
+    assert limiter.allow("c1", "oda")
+    assert not limiter.allow("c1", "oda")
+    assert limiter.rejected_connection == 1
+    # Oda kovasında hâlâ bir token var
+    assert limiter.allow("c2", "oda")
+    assert not limiter.allow("c3", "oda")
+    assert limiter.rejected_room == 1
+
+
+def test_zero_rate_disables_a_level():
+    limiter = RateLimiter(connection_rate=0, room_rate=0, clock=Clock())
+    assert all(limiter.allow("c1", "oda") for _ in range(1000))
+
+
+def test_notices_are_throttled_and_full_buckets_pruned():
+    clock = Clock()
+    limiter = RateLimiter(connection_rate=1, connection_burst=2, room_rate=0, notice_interval=2, clock=clock)
+    assert limiter.should_notify("c1")
+    assert not limiter.should_notify("c1")
+    clock.now += 2
+    assert limiter.should_notify("c1")
+
+    limiter.allow("c1")
+    assert limiter.prune() == 0
+    clock.now += 1
+    assert limiter.prune() == 1
+    assert limiter.stats()["tracked_connections"] == 0
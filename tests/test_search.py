@@ -0,0 +1,28 @@
+from domain.search import RoomIndex, fold, tokenize
+
+
+def test_turkish_case_folding():
+    assert fold("IŞIK") == "ışık"
+    assert fold("İSTANBUL") == "istanbul"
+    assert fold("Iğdır") == "ığdır"
+    assert tokenize("KIRMIZI İğne, ışık!") == ["kırmızı", "iğne", "ışık"]
+
+
+def test_search_matches_turkish_prefixes_newest_first():
+    index = RoomIndex()
+    index.add(1, "Işıklar yandı")
+    index.add(2, "İstanbul'da ışık var")
+    index.add(3, "istasyon")
+    assert index.search("IŞIK", 10) == [2, 1]
+    assert index.search("İST", 10) == [3, 2]
+    assert index.search("ist ışık", 10) == [2]
+    # "I" noktasız ı'ya katlanır; noktalı i ile eşleşmez
+    assert index.search("IST", 10) == []
+
+
+def test_remove_returns_memory_to_zero():
+    index = RoomIndex()
+    grown = index.add(1, "elma armut elma")
+    assert grown == index.bytes > 0
+    assert index.remove(1, "elma armut elma") == -grown
+    assert index.bytes == 0 and len(index) == 0
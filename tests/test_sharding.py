@@ -0,0 +1,39 @@
+import asyncio
+
+from domain.use_cases import ChatUseCase
+from infrastructure.backplane import InMemoryBackplane
+from infrastructure.sharding import HashRing, ShardRouter, announce
+
+SHARDS = {"a": "ws://a", "b": "ws://b"}
+
+
+def test_ring_moves_only_removed_nodes_keys():
+    ring = HashRing(["a", "b", "c"])
+    before = {f"oda-{i}": ring.node_for(f"oda-{i}") for i in range(500)}
+    ring.remove("c")
+    for key, node in before.items():
+        if node != "c":
+            assert ring.node_for(key) == node
+
+
+def test_empty_ring_serves_locally():
+    router = ShardRouter("a", SHARDS)
+    router.ring.remove("a")
+    router.ring.remove("b")
+    assert router.is_local("oda")
+
+
+def test_announced_map_survives_restart_and_empty_map_is_ignored():
+    async def scenario():
+        backplane = InMemoryBackplane()
+        await announce(backplane, {"a": "ws://a"})
+
+        # Ortamda iki shard var ama son duyuru yalnızca "a"
+        router = ShardRouter("a", SHARDS)
+        await router.attach(backplane, ChatUseCase())
+        assert router.ring.nodes == ["a"]
+
+        await backplane.publish("chat:shards", "{}")
+        assert router.ring.nodes == ["a"]
+
+    asyncio.run(scenario())
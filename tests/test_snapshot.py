@@ -0,0 +1,53 @@
+import asyncio
+import os
+
+from domain.use_cases import ChatUseCase
+from infrastructure.snapshot import MAGIC, load_snapshot, save_snapshot
+
+
+async def _populated() -> ChatUseCase:
+    node = ChatUseCase()
+    await node.join_room("ayşe", "c1", "oda", "gizli")
+    await node.join_room("ali", "c2", "oda", "gizli")
+    for i in range(3):
+        await node.send_message("c1", "oda", f"mesaj {i}")
+    return node
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "snap" / "state.bin")
+
+    async def scenario():
+        node = await _populated()
+        state = node.export_state()
+        assert save_snapshot(path, state) > len(MAGIC)
+        loaded = load_snapshot(path)
+        assert loaded == state
+        # Yüklenen dosya kenara alınır; ikinci açılış onu tekrar yüklemez
+        assert not os.path.exists(path) and os.path.exists(path + ".loaded")
+        assert load_snapshot(path) is None
+
+        restored = ChatUseCase()
+        assert await restored.restore_state(loaded, grace=60) == 1
+        room = restored.rooms["oda"]
+        assert room.user_count == 0 and room.password == "gizli"
+        assert [entry.content for entry in restored.messages.recent("oda", 10)] == ["mesaj 0", "mesaj 1", "mesaj 2"]
+        # Geri dönen kullanıcı parolayla katılır, kimlikler kaldığı yerden sürer
+        await restored.join_room("ayşe", "c9", "oda", "gizli")
+        assert (await restored.send_message("c9", "oda", "yeni")).id == 4
+
+    asyncio.run(scenario())
+
+
+def test_stale_or_corrupt_snapshots_are_ignored(tmp_path):
+    path = str(tmp_path / "state.bin")
+    save_snapshot(path, {"saved_at": 0, "rooms": []})
+    assert load_snapshot(path, max_age=60) is None
+
+    with open(path, "wb") as handle:
+        handle.write(MAGIC + b"bozuk")
+    assert load_snapshot(path) is None
+
+    with open(path, "wb") as handle:
+        handle.write(b"ESKIBICIM")
+    assert load_snapshot(path) is None
@@ -0,0 +1,62 @@
+import asyncio
+
+from infrastructure.backplane import InMemoryBackplane
+from infrastructure.token_cache import TokenCache
+
+
+def _clock(monkeypatch, start: float = 1000.0):
+    now = [start]
+    monkeypatch.setattr("infrastructure.token_cache.time.time", lambda: now[0])
+    return now
+
+
+def test_positive_entries_are_capped_without_revocation_channel(monkeypatch):
+    now = _clock(monkeypatch)
+    cache = TokenCache(local_ttl=60)
+    cache.put("t", "oturum", now[0] + 86_400)
+    now[0] += 59
+    assert cache.get("t") == "oturum"
+    now[0] += 2
+    assert TokenCache.is_miss(cache.get("t"))
+
+
+def test_attached_cache_keeps_entries_until_exp(monkeypatch):
+    now = _clock(monkeypatch)
+
+    async def scenario():
+        cache = TokenCache(local_ttl=60)
+        await cache.attach(InMemoryBackplane())
+        cache.put("t", "oturum", now[0] + 3600)
+        now[0] += 600
+        assert cache.get("t") == "oturum"
+
+    asyncio.run(scenario())
+
+
+def test_revocation_reaches_other_workers_and_wins_over_late_put(monkeypatch):
+    now = _clock(monkeypatch)
+
+    async def scenario():
+        backplane = InMemoryBackplane()
+        first, second = TokenCache(), TokenCache()
+        await first.attach(backplane)
+        await second.attach(backplane)
+        second.put("t", "oturum", now[0] + 3600)
+
+        await first.revoke("t")
+        assert second.get("t") is None
+        # İptalden sonra biten eşzamanlı doğrulama iptali ezemez
+        second.put("t", "oturum", now[0] + 3600)
+        assert second.get("t") is None
+        assert second.stats()["revocations"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_negative_entries_expire(monkeypatch):
+    now = _clock(monkeypatch)
+    cache = TokenCache(negative_ttl=5)
+    cache.put_negative("t")
+    assert cache.get("t") is None
+    now[0] += 5
+    assert TokenCache.is_miss(cache.get("t"))
@@ -0,0 +1,112 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy.exc import DBAPIError, OperationalError, TimeoutError as PoolTimeoutError
+
+from adapters.write_behind import WriteBehindMessageWriter, _is_transient
+from domain.entities import User, Message, MessageType
+
+
+class _PostgresError(Exception):
+    """asyncpg hatasının SQLAlchemy tarafından sarılmış hali gibi sqlstate taşır"""
+
+    def __init__(self, sqlstate: str):
+        super().__init__(sqlstate)
+        self.sqlstate = sqlstate
+
+
+class FakeWriter(WriteBehindMessageWriter):
+    """Veritabanı yerine ``failures`` listesindeki hataları sırayla yükselten yazıcı"""
+
+    def __init__(self, failures=(), poison=None, **kwargs):
+        kwargs.setdefault("flush_interval", 0.001)
+        kwargs.setdefault("retry_delay", 0.001)
+        kwargs.setdefault("max_retry_delay", 0.004)
+        super().__init__(None, **kwargs)
+        self.failures = list(failures)
+        self.poison = poison
+        self.rows = []
+
+    async def flush(self, batch):
+        if self.failures:
+            raise self.failures.pop(0)
+        if self.poison is not None and any(message.content == self.poison for message in batch):
+            raise ValueError("bozuk satır")
+        self.rows.extend(message.content for message in batch)
+        self.written += len(batch)
+
+
+def _message(content: str) -> Message:
+    return Message(
+        content=content,
+        sender=User(username="ali", connection_id="c1", joined_at=datetime(2024, 1, 1)),
+        message_type=MessageType.TEXT,
+        timestamp=datetime(2024, 1, 1),
+        room_id="oda"
+    )
+
+
+async def _drain(writer: FakeWriter, count: int) -> None:
+    for i in range(count):
+        writer.enqueue(_message(f"m{i}"))
+    writer.start()
+    for _ in range(2000):
+        if not writer.queue:
+            break
+        await asyncio.sleep(0.001)
+    await writer.stop()
+
+
+@pytest.mark.parametrize("error", [
+    PoolTimeoutError("QueuePool limit of size 10 overflow 10 reached"),
+    OperationalError("INSERT", {}, Exception("server closed the connection")),
+    DBAPIError("INSERT", {}, _PostgresError("57P03")),  # CannotConnectNowError
+    DBAPIError("INSERT", {}, _PostgresError("53300")),  # TooManyConnectionsError
+    OSError("bağlantı reddedildi"),
+])
+def test_infrastructure_errors_are_transient(error):
+    assert _is_transient(error)
+
+
+def test_data_errors_are_not_transient():
+    assert not _is_transient(DBAPIError("INSERT", {}, _PostgresError("22021")))  # NUL karakter
+    assert not _is_transient(ValueError("bozuk"))
+
+
+def test_pool_timeout_never_dead_letters():
+    # Deneme sınırını defalarca aşacak kadar art arda havuz zaman aşımı
+    writer = FakeWriter(failures=[PoolTimeoutError("pool") for _ in range(12)], batch_size=8, max_attempts=2)
+    asyncio.run(_drain(writer, 20))
+
+    assert writer.dead_lettered == 0
+    assert writer.transient_failures == 12
+    assert writer.rows == [f"m{i}" for i in range(20)]
+    # Altyapı hatası grubu bölmez
+    assert writer.stats()["split_size"] == 8
+
+
+def test_poison_row_is_split_out_and_dead_lettered():
+    writer = FakeWriter(poison="m5", batch_size=8, max_attempts=2)
+    asyncio.run(_drain(writer, 12))
+
+    assert writer.dead_lettered == 1
+    assert [message.content for message in writer.dead_letters] == ["m5"]
+    assert writer.rows == [f"m{i}" for i in range(12) if i != 5]
+    assert writer.transient_failures == 0
+    # Bozuk satır ayıklandıktan sonra grup boyutu eski haline döner
+    assert writer.stats()["split_size"] == 8
+
+
+def test_queue_limit_drops_and_stop_reports_unwritten():
+    async def scenario():
+        writer = FakeWriter(failures=[PoolTimeoutError("pool") for _ in range(100)], max_queue=3)
+        assert all(writer.enqueue(_message(f"m{i}")) for i in range(3))
+        assert not writer.enqueue(_message("fazla"))
+        writer.start()
+        await asyncio.sleep(0.01)
+        await writer.stop(timeout=0.05)
+        assert writer.dropped == 1
+        assert writer.lost_on_stop == 3 and not writer.queue
+
+    asyncio.run(scenario())